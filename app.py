@@ -1,17 +1,15 @@
 import streamlit as st
-import pandas as pd
-from scraper import FacturaParkScraper
-from scraper_bulevar import FacturaBulevarScraper
-from scraper_fontanar import FacturaFontanarScraper
-from scraper_arkadia import FacturaArkadiaScraper
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from http_pool import prewarm, GOPASS_HOSTS
+from request_metrics import METRICS, METRICS_PORT, start_metrics_server
+from resilience import breaker_states
+from snapshots import load_snapshot
+from tenants import TENANTS, tenant_names, get_tenant, credentials
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-import time
-import re
+import threading
+
+# Streamlit re-ejecuta este archivo en cada interacción: pandas, los scrapers y la
+# extracción de Power BI se importan dentro de las funciones que los usan, solo
+# cuando de verdad se scrapea o se genera el mensaje.
 
 
 # ===========================
@@ -82,562 +80,140 @@ st.markdown("""
 
 st.title("🧾 Generador de informe de Facturación")
 
-# Credenciales
-USERNAME = st.secrets["credentials"]["USERNAME"]
-PASSWORD = st.secrets["credentials"]["PASSWORD"]
-ARKADIA_USER = st.secrets["arkadia"]["USERNAME"]
-ARKADIA_PASS = st.secrets["arkadia"]["PASSWORD"]
-FONTANAR_USER = st.secrets["Fontanar"]["USERNAME"]
-FONTANAR_PASS = st.secrets["Fontanar"]["PASSWORD"]
+# Centros comerciales: tenants.toml (credenciales en la sección `secrets` de cada uno)
 
 # Inicializar session_state
-for key in ["andino", "bulevar", "fontanar", "arkadia"]:
+for key in tenant_names():
     if key not in st.session_state:
         st.session_state[key] = {"ok": False, "data": None, "jobs": None, "invoices": None}
 
-# ===========================
-# FUNCIONES DE SELENIUM
-# ===========================
+# Pre-calentar conexiones a GoPass una sola vez por proceso (en segundo plano)
+@st.cache_resource(show_spinner=False)
+def precalentar_conexiones():
+    hilo = threading.Thread(target=prewarm, args=(GOPASS_HOSTS,), daemon=True)
+    hilo.start()
+    return hilo
 
-def setup_driver():
-    """Configurar ChromeDriver para Selenium - Compatible con Streamlit Cloud"""
-    try:
-        from webdriver_manager.chrome import ChromeDriverManager
-        from webdriver_manager.core.os_manager import ChromeType
-        
-        chrome_options = Options()
-        
-        # Opciones críticas para Streamlit Cloud
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--disable-software-rasterizer")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--disable-setuid-sandbox")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--remote-debugging-port=9222")
-        chrome_options.add_argument("--single-process")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # User agent real
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        # MÉTODO 1: Usar webdriver-manager con CHROMIUM
-        try:
-            # Instalar chromedriver compatible con chromium
-            service = Service(ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install())
-            
-            # Especificar la ubicación de chromium
-            chrome_options.binary_location = "/usr/bin/chromium"
-            
-            driver = webdriver.Chrome(service=service, options=chrome_options)
-            driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            
-            return driver
-            
-        except Exception as e1:
-            # MÉTODO 2: Sin especificar chrome_type
-            try:
-                service = Service(ChromeDriverManager().install())
-                chrome_options.binary_location = "/usr/bin/chromium"
-                
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                
-                return driver
-                
-            except Exception as e2:
-                # MÉTODO 3: Usar chromedriver del sistema directamente
-                try:
-                    import subprocess
-                    import os
-                    
-                    # Buscar chromedriver en el sistema
-                    result = subprocess.run(['which', 'chromedriver'], 
-                                          capture_output=True, text=True)
-                    chromedriver_path = result.stdout.strip()
-                    
-                    if chromedriver_path and os.path.exists(chromedriver_path):
-                        # Hacer ejecutable
-                        os.chmod(chromedriver_path, 0o755)
-                        
-                        service = Service(executable_path=chromedriver_path)
-                        chrome_options.binary_location = "/usr/bin/chromium"
-                        
-                        driver = webdriver.Chrome(service=service, options=chrome_options)
-                        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                        
-                        return driver
-                    else:
-                        return None
-                        
-                except Exception as e3:
-                    return None
-        
-    except Exception as e:
-        return None
+precalentar_conexiones()
 
-def extract_number_from_text(text):
-    """Extrae un número del texto, manejando formatos con comas"""
-    try:
-        # Buscar números con comas (formato: 1,234 o 12,345)
-        match = re.search(r'\b\d{1,3}(?:,\d{3})+\b', text)
-        if match:
-            return match.group(0)
-        
-        # Buscar números simples
-        match = re.search(r'\b\d+\b', text)
-        if match:
-            return match.group(0)
-        
-        return None
-    except:
-        return None
+# Endpoint Prometheus /metrics con las métricas de las solicitudes (solo si se define METRICS_PORT)
+@st.cache_resource(show_spinner=False)
+def iniciar_endpoint_metricas():
+    return start_metrics_server(METRICS_PORT) if METRICS_PORT else None
 
-def limpiar_tabla_asociados(tabla_asociados):
-    """Limpia y ordena la tabla de asociados, eliminando encabezados y duplicados"""
-    if not tabla_asociados:
-        return []
-    
-    # Filtrar elementos que no sean encabezados
-    elementos_limpios = []
-    for item in tabla_asociados:
-        asociado = item.get('asociado', '')
-        peaje = item.get('peaje', '')
-        porcentaje = item.get('porcentaje', '')
-        
-        # Eliminar elementos que sean claramente encabezados
-        if (asociado.upper() in ['ASOCIADO', 'PEAJE', 'PORCENTAJE', 'CONSECUTIVO'] or
-            peaje.upper() in ['ASOCIADO', 'PEAJE', 'PORCENTAJE', 'CONSECUTIVO']):
-            continue
-            
-        # Verificar que tengamos datos válidos
-        if (asociado and len(asociado) > 3 and 
-            peaje and 'peaje' in peaje.lower() and
-            porcentaje and re.match(r'\d{1,3}%', porcentaje)):
-            
-            # Verificar que no sea duplicado
-            duplicado = any(
-                elem['asociado'] == asociado and elem['peaje'] == peaje
-                for elem in elementos_limpios
-            )
-            if not duplicado:
-                elementos_limpios.append(item)
-    
-    return elementos_limpios
-
-def find_parqueaderos_peajes_values(driver):
-    """
-    Buscar los valores de Parqueaderos y Peajes en el Power BI
-    Y también extraer la fecha analizada, los servicios y la tabla de asociados
-    """
-    try:
-        # Esperar a que la página cargue completamente
-        time.sleep(12)
-        
-        # Obtener todo el texto visible de la página
-        page_text = driver.find_element(By.TAG_NAME, "body").text
-        
-        # Dividir en líneas para análisis
-        lines = [line.strip() for line in page_text.split('\n') if line.strip()]
-        
-        parqueaderos = None
-        peajes = None
-        fecha_analizada = None
-        servicios_data = {}
-        tabla_asociados = []
-        
-        # DEBUG: Mostrar líneas para análisis
-        print("=== LÍNEAS ENCONTRADAS EN EL BI ===")
-        for i, line in enumerate(lines):
-            print(f"{i}: {line}")
-        
-        # Buscar valores principales
-        for i, line in enumerate(lines):
-            line_clean = line.strip()
-            
-            # Buscar "Parqueaderos"
-            if 'parqueaderos' in line_clean.lower() and parqueaderos is None:
-                num = extract_number_from_text(line_clean)
-                if num:
-                    parqueaderos = num
-                else:
-                    for offset in range(1, 6):
-                        if i + offset < len(lines):
-                            next_line = lines[i + offset].strip()
-                            num = extract_number_from_text(next_line)
-                            if num:
-                                parqueaderos = num
-                                break
-            
-            # Buscar "Peajes"
-            if 'peajes' in line_clean.lower() and peajes is None:
-                num = extract_number_from_text(line_clean)
-                if num:
-                    peajes = num
-                else:
-                    for offset in range(1, 6):
-                        if i + offset < len(lines):
-                            next_line = lines[i + offset].strip()
-                            num = extract_number_from_text(next_line)
-                            if num:
-                                peajes = num
-                                break
-            
-            # Buscar fecha
-            if fecha_analizada is None:
-                fecha_match = re.search(r'\b(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/(202[4-9])\b', line_clean)
-                if fecha_match:
-                    try:
-                        mes, dia, año = fecha_match.groups()
-                        fecha_analizada = f"{int(dia):02d}/{int(mes):02d}/{año}"
-                    except:
-                        pass
-
-        # NUEVO MÉTODO MEJORADO PARA TABLA DE ASOCIADOS
-        try:
-            # Buscar la sección de la tabla por patrones específicos
-            # Primero encontramos dónde está la tabla buscando palabras clave
-            secciones_tabla = []
-            
-            for i, line in enumerate(lines):
-                if any(keyword in line.lower() for keyword in ['asociado', 'peaje', 'porcentaje', 'consecutivo', 'consumo']):
-                    secciones_tabla.append(i)
-            
-            # Si encontramos secciones, procesar cada una
-            for seccion_idx in secciones_tabla:
-                # Buscar en un rango alrededor de la sección identificada
-                start_idx = max(0, seccion_idx - 2)
-                end_idx = min(len(lines), seccion_idx + 20)
-                
-                # Procesar esta sección
-                i = start_idx
-                while i < end_idx - 2:
-                    line1 = lines[i]
-                    line2 = lines[i + 1] if i + 1 < len(lines) else ""
-                    line3 = lines[i + 2] if i + 2 < len(lines) else ""
-                    
-                    # PATRÓN 1: Asociado conocido + Peaje + Porcentaje
-                    asociados_conocidos = [
-                        'UNION VIAL RIO PAMPLONITA',
-                        'PACIFICO TRES',
-                        'VIA 40 EXPRESS',
-                        'AUTOPISTA MAGDALENA MEDIO',
-                        'AUTOPISTAS DEL CAFÉ',
-                        'AUTOPISTA VILLAVICENCIO YOPAL',
-                        'RUTA DEL SOL',
-                        'AUTOPISTA ALTO DE VINAS',
-                        'AUTOPISTA CONCESION LA GUAJIRA'
-                    ]
-                    
-                    peajes_conocidos = [
-                        'PEAJE LOS ACACIOS',
-                        'PEAJE IRRA',
-                        'PEAJE CHUSACA',
-                        'PEAJE ZAMBITO',
-                        'PEAJE LA SELVA',
-                        'PEAJE GUARINOCITO'
-                    ]
-                    
-                    # Verificar si line1 es un asociado conocido
-                    es_asociado_conocido = any(asociado in line1 for asociado in asociados_conocidos)
-                    
-                    # Verificar si line2 es un peaje
-                    es_peaje = 'peaje' in line2.lower()
-                    
-                    # Verificar si line3 es un porcentaje
-                    porcentaje_match = re.search(r'(\d{1,3})%', line3)
-                    
-                    if es_asociado_conocido and es_peaje and porcentaje_match:
-                        porcentaje_val = int(porcentaje_match.group(1))
-                        if 1 <= porcentaje_val <= 100:
-                            # Verificar que no sea duplicado
-                            duplicado = any(
-                                item['asociado'] == line1 and item['peaje'] == line2
-                                for item in tabla_asociados
-                            )
-                            if not duplicado:
-                                tabla_asociados.append({
-                                    "asociado": line1,
-                                    "peaje": line2,
-                                    "porcentaje": f"{porcentaje_val}%"
-                                })
-                                i += 3  # Saltar las 3 líneas procesadas
-                                continue
-                    
-                    # PATRÓN 2: Cualquier texto largo (posible asociado) + Peaje + Porcentaje
-                    if (len(line1) > 8 and 
-                        not any(keyword in line1.lower() for keyword in ['peaje', 'porcentaje', 'scroll', 'select', 'row']) and
-                        'peaje' in line2.lower() and 
-                        porcentaje_match):
-                        
-                        porcentaje_val = int(porcentaje_match.group(1))
-                        if 1 <= porcentaje_val <= 100:
-                            duplicado = any(
-                                item['asociado'] == line1 and item['peaje'] == line2
-                                for item in tabla_asociados
-                            )
-                            if not duplicado:
-                                tabla_asociados.append({
-                                    "asociado": line1,
-                                    "peaje": line2,
-                                    "porcentaje": f"{porcentaje_val}%"
-                                })
-                                i += 3
-                                continue
-                    
-                    i += 1
-            
-            # Si aún no encontramos suficientes, buscar por porcentajes y reconstruir
-            if len(tabla_asociados) < 4:
-                # Buscar todos los porcentajes en el texto
-                porcentajes_encontrados = []
-                for i, line in enumerate(lines):
-                    porcentaje_match = re.search(r'(\d{1,3})%', line)
-                    if porcentaje_match:
-                        porcentaje_val = int(porcentaje_match.group(1))
-                        if 1 <= porcentaje_val <= 100:
-                            porcentajes_encontrados.append((i, porcentaje_val))
-                
-                # Para cada porcentaje, buscar su peaje y asociado
-                for idx_porcentaje, porcentaje_val in porcentajes_encontrados:
-                    # Buscar peaje (línea anterior al porcentaje)
-                    peaje_encontrado = None
-                    if idx_porcentaje - 1 >= 0 and 'peaje' in lines[idx_porcentaje - 1].lower():
-                        peaje_encontrado = lines[idx_porcentaje - 1]
-                    
-                    # Buscar asociado (línea anterior al peaje)
-                    asociado_encontrado = None
-                    if peaje_encontrado and idx_porcentaje - 2 >= 0:
-                        asociado_encontrado = lines[idx_porcentaje - 2]
-                        # Verificar que sea un asociado válido
-                        if (len(asociado_encontrado) < 5 or 
-                            any(keyword in asociado_encontrado.lower() for keyword in ['peaje', 'porcentaje', 'scroll'])):
-                            asociado_encontrado = None
-                    
-                    if asociado_encontrado and peaje_encontrado:
-                        duplicado = any(
-                            item['asociado'] == asociado_encontrado and item['peaje'] == peaje_encontrado
-                            for item in tabla_asociados
-                        )
-                        if not duplicado:
-                            tabla_asociados.append({
-                                "asociado": asociado_encontrado,
-                                "peaje": peaje_encontrado,
-                                "porcentaje": f"{porcentaje_val}%"
-                            })
-                
-        except Exception as e:
-            print(f"Error extrayendo tabla de asociados: {e}")
-
-        # Búsqueda por patrones regex en todo el texto como fallback
-        if parqueaderos is None:
-            match = re.search(r'[Pp]arqueaderos[^\d]*(\d{1,3}(?:,\d{3})*)', page_text)
-            if match:
-                parqueaderos = match.group(1)
-        
-        if peajes is None:
-            match = re.search(r'[Pp]eajes[^\d]*(\d{1,3}(?:,\d{3})*)', page_text)
-            if match:
-                peajes = match.group(1)
-        
-        if fecha_analizada is None:
-            fecha_match = re.search(r'\b(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/(202[4-9])\b', page_text)
-            if fecha_match:
-                try:
-                    mes, dia, año = fecha_match.groups()
-                    fecha_analizada = f"{int(dia):02d}/{int(mes):02d}/{año}"
-                except:
-                    pass
-        
-        # DEBUG: Mostrar lo que encontramos
-        print(f"=== RESULTADOS ENCONTRADOS ===")
-        print(f"Parqueaderos: {parqueaderos}")
-        print(f"Peajes: {peajes}")
-        print(f"Fecha: {fecha_analizada}")
-        print(f"Tabla asociados: {len(tabla_asociados)} registros")
-        for item in tabla_asociados:
-            print(f"  - {item}")
-        
-        # Verificación final
-        if parqueaderos is None:
-            st.error("❌ No se pudo encontrar el valor de Parqueaderos")
-        
-        if peajes is None:
-            st.error("❌ No se pudo encontrar el valor de Peajes")
-        
-        if fecha_analizada is None:
-            fecha_analizada = datetime.now().strftime('%d/%m/%Y')
-        
-        return parqueaderos, peajes, fecha_analizada, servicios_data, tabla_asociados
-        
-    except Exception as e:
-        print(f"Error en find_parqueaderos_peajes_values: {e}")
-        return None, None, None, {}, []
-
-def get_powerbi_data():
-    """
-    Obtiene los datos de facturas sin CUFE del reporte de Power BI usando Selenium
-    """
-    try:
-        POWERBI_URL = "https://app.powerbi.com/view?r=eyJrIjoiMjUyNTBjMTItOWZlNy00YTY2LWIzMTQtNmM3OGU4ZWM1ZmQxIiwidCI6ImY5MTdlZDFiLWI0MDMtNDljNS1iODBiLWJhYWUzY2UwMzc1YSJ9"
-        
-        # Configurar el driver
-        driver = setup_driver()
-        if not driver:
-            st.error("❌ No se pudo inicializar el driver de Selenium")
-            return None
-        
-        try:
-            # Navegar al reporte
-            driver.get(POWERBI_URL)
-            
-            # Esperar a que cargue la página
-            time.sleep(15)
-            
-            # Buscar los valores de Parqueaderos, Peajes, Fecha, Servicios y Tabla de Asociados
-            parqueaderos, peajes, fecha_analizada, servicios_data, tabla_asociados = find_parqueaderos_peajes_values(driver)
-            
-            if parqueaderos is None or peajes is None:
-                st.error("❌ No se pudieron extraer los valores del dashboard")
-                return None
-            
-            # Limpiar la tabla de asociados
-            tabla_asociados_limpia = limpiar_tabla_asociados(tabla_asociados)
-            
-            # Convertir a enteros
-            try:
-                parqueaderos_num = int(parqueaderos.replace(',', ''))
-                peajes_num = int(peajes.replace(',', ''))
-                
-                return {
-                    "parqueaderos": parqueaderos_num,
-                    "peajes": peajes_num,
-                    "fecha_analizada": fecha_analizada,
-                    "servicios": servicios_data,
-                    "tabla_asociados": tabla_asociados_limpia
-                }
-            except ValueError as e:
-                st.error(f"❌ Error convirtiendo valores a números: {e}")
-                return None
-            
-        finally:
-            driver.quit()
-        
-    except Exception as e:
-        st.error(f"❌ Error crítico al obtener datos de Power BI: {str(e)}")
-        return None
+iniciar_endpoint_metricas()
 
-# ===========================
-# FUNCIONES DE SCRAPING
-# ===========================
+# Worker de Power BI con Chromium caliente, arrancado una vez por proceso en segundo plano
+@st.cache_resource(show_spinner=False)
+def precalentar_powerbi():
+    def arrancar():
+        from powerbi_report import get_powerbi_worker
+        get_powerbi_worker()
 
-def run_scraper(name, scraper_class, username, password):
-    scraper = scraper_class()
-    ok = scraper.login(username, password)
-    result = {"ok": ok, "data": None, "jobs": None, "invoices": None}
-    if ok:
-        # Obtenemos datos según cada scraper
-        data = scraper.get_pending_invoices()
-        # Convertir listas a DataFrame para que la UI las muestre
-        if isinstance(data, list):
-            try:
-                result["data"] = pd.DataFrame(data) if len(data) > 0 else pd.DataFrame()
-            except Exception:
-                try:
-                    result["data"] = pd.DataFrame([data])
-                except Exception:
-                    result["data"] = pd.DataFrame()
-        elif isinstance(data, pd.DataFrame):
-            result["data"] = data
-        else:
-            try:
-                result["data"] = pd.DataFrame(data) if data else pd.DataFrame()
-            except Exception:
-                result["data"] = pd.DataFrame()
+    hilo = threading.Thread(target=arrancar, daemon=True)
+    hilo.start()
+    return hilo
 
-        jobs = scraper.get_jobs_config()
-        # Convertimos jobs a DataFrame si es lista
-        if isinstance(jobs, list):
-            try:
-                jobs = pd.DataFrame(jobs) if len(jobs) > 0 else pd.DataFrame()
-            except Exception:
-                jobs = pd.DataFrame()
-
-        # Filtro especial SOLO para Arkadia
-        if name == "arkadia" and isinstance(jobs, pd.DataFrame) and not jobs.empty:
-            jobs = jobs.rename(columns={
-                "jobname": "NOMBRE",
-                "raiseevents": "AUMENTO DE EVENTOS",
-                "enabled": "HABILITADO",
-                "updatedat": "FECHA DE ACTUALIZACIÓN"
-            })
-            jobs = jobs[["NOMBRE", "AUMENTO DE EVENTOS", "HABILITADO", "FECHA DE ACTUALIZACIÓN"]]
-
-        result["jobs"] = jobs
-        result["invoices"] = scraper.get_invoices()
-    return name, result
+precalentar_powerbi()
 
 # ===========================
-# FORMATO DE FECHA
+# FUNCIONES DE SCRAPING
 # ===========================
 
-def format_fecha(fecha):
-    """Convierte la fecha a formato dd/mm/yyyy HH:MM"""
-    try:
-        return pd.to_datetime(fecha).strftime("%d/%m/%Y %H:%M")
-    except:
-        return str(fecha)
+# Snapshots publicados por daemon.py: más viejos que esto se ignoran
+SNAPSHOT_MAX_AGE = 30 * 60
+
+# st.fragment (o experimental_fragment en versiones anteriores); sin él cada pestaña se dibuja
+# en el rerun completo como antes, sin auto-actualización
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+def load_daemon_snapshot(name):
+    """Carga en session_state el snapshot del daemon si es más nuevo que lo que ya se muestra"""
+    snap = load_snapshot(name, max_age=SNAPSHOT_MAX_AGE)
+    if snap and snap["updated_at"] > st.session_state[name].get("updated_at", 0):
+        from scrape_results import build_result
+        result = build_result(name, snap["result"])
+        result["updated_at"] = snap["updated_at"]
+        st.session_state[name] = result
+        st.session_state["scraping_done"] = True
+        return True
+    return False
+
+def refresh_tenant(tenant, force=False):
+    """
+    Pone al día un solo centro: primero el snapshot del daemon y, si sigue con más de
+    refresh_seconds (o si se pidió a mano), una consulta compartida vía SCRAPE_CACHE.
+    """
+    if load_daemon_snapshot(tenant.name) and not force:
+        return
+    from gopass_scraper import scrape_targets
+    from scrape_results import refresh_if_stale
+
+    target = scrape_targets(st.secrets, [tenant])[0]
+    with st.spinner(f"🔑 Actualizando {tenant.display_name}..."):
+        result = refresh_if_stale(target, st.session_state[tenant.name], tenant.refresh_seconds, force)
+    if result is not None:
+        st.session_state[tenant.name] = result
+        st.session_state["scraping_done"] = True
 
 # ===========================
 # INTERFAZ PRINCIPAL
 # ===========================
 
 if st.button("Ejecutar scraping de todos los centros comerciales"):
+    # Power BI se extrae mientras corren los scrapers; el botón del mensaje solo espera
+    # lo que ya está en curso (tiempo total = max(centros, Power BI) y no la suma)
+    from powerbi_report import prefetch_powerbi_data
+    # Se guarda el Future: si la extracción anticipada falla, el botón del mensaje lo informa
+    st.session_state["powerbi_prefetch"] = prefetch_powerbi_data()
+
     with st.spinner("🔑 Ejecutando scrapers en paralelo..."):
-        futures = []
-        with ThreadPoolExecutor() as executor:
-            futures.append(executor.submit(run_scraper, "andino", FacturaParkScraper, USERNAME, PASSWORD))
-            futures.append(executor.submit(run_scraper, "bulevar", FacturaBulevarScraper, USERNAME, PASSWORD))
-            futures.append(executor.submit(run_scraper, "fontanar", FacturaFontanarScraper, FONTANAR_USER, FONTANAR_PASS))
-            futures.append(executor.submit(run_scraper, "arkadia", FacturaArkadiaScraper, ARKADIA_USER, ARKADIA_PASS))
+        from gopass_scraper import scrape_targets
+        from scrape_results import scrape_all_cached
 
-            for future in as_completed(futures):
-                name, result = future.result()
-                st.session_state[name] = result
+        # Compartido entre sesiones: dentro de SCRAPE_CACHE_TTL se reutiliza el último
+        # resultado y los clics simultáneos esperan una sola consulta por centro
+        resultados = scrape_all_cached(scrape_targets(st.secrets))
+        for name, result in resultados.items():
+            st.session_state[name] = result
 
     st.session_state["scraping_done"] = True
 
 # ===========================
 # TAB PESTAÑAS
 # ===========================
-tab_andino, tab_bulevar, tab_fontanar, tab_arkadia = st.tabs([
-    "🏢 Centro Comercial Andino", 
-    "🏢 Centro Comercial Bulevar",
-    "🏢 Centro Comercial Fontanar",
-    "🏢 Centro Comercial Arkadia"
-])
+tabs = st.tabs([f"🏢 {tenant.display_name}" for tenant in TENANTS])
 
 def display_tab(name, display_name):
     st.header(f"🏢 {display_name}")
     state = st.session_state[name]
+    if state.get("updated_at"):
+        st.caption(f"Datos actualizados: {datetime.fromtimestamp(state['updated_at']).strftime('%d/%m/%Y %H:%M:%S')}")
     if state["ok"]:
+        import pandas as pd  # ya cargado por build_result cuando hay datos
+        from gopass_scraper import scraper_for
+        from paged_table import paged_table
+        from scrape_results import fetch_page
+
+        tenant = get_tenant(name)
+        username, password = credentials(tenant, st.secrets)
+        totals = state.get("totals") or {}
+
+        def fetch(table, scraped):
+            # Las páginas que caben en lo ya scrapeado (o en el snapshot) no tocan la API
+            def page(top, skip, sort, search):
+                return fetch_page(name, scraper_for(tenant), username, password, table, top, skip, sort,
+                                  search, local_rows=scraped, local_total=totals.get(table))
+            return page
+
         st.subheader("📦 Facturas Pendientes")
-        if isinstance(state["data"], pd.DataFrame) and not state["data"].empty:
-            st.table(state["data"])
-        else:
-            st.warning("⚠️ No se encontraron facturas pendientes")
+        paged_table(f"{name}_pending", fetch("pending", state["data"]), list(tenant.pending_fields),
+                    searchable=True, server_search=bool(tenant.pending_search),
+                    empty_message="⚠️ No se encontraron facturas pendientes")
 
         st.subheader("🕒 ULTIMA ACTUALIZACIÓN DE JOBS")
-        jobs = state["jobs"]
-        if isinstance(jobs, pd.DataFrame) and not jobs.empty:
-            st.table(jobs)
-        else:
-            st.warning("⚠️ No se encontraron jobs")
+        paged_table(f"{name}_jobs", fetch("jobs", state["jobs"]), list(tenant.jobs_fields),
+                    empty_message="⚠️ No se encontraron jobs")
 
         st.subheader("🧾 FACTURAS")
         invoices = state["invoices"]
@@ -665,17 +241,32 @@ def display_tab(name, display_name):
     else:
         st.info("Presiona 'Ejecutar scraping de todos los centros comerciales' para cargar datos.")
 
-with tab_andino:
-    display_tab("andino", "Centro Comercial Andino")
-
-with tab_bulevar:
-    display_tab("bulevar", "Centro Comercial Bulevar")
-
-with tab_fontanar:
-    display_tab("fontanar", "Centro Comercial Fontanar")
-
-with tab_arkadia:
-    display_tab("arkadia", "Centro Comercial Arkadia")
+def tenant_tab(tenant):
+    """
+    Pestaña de un centro como fragmento independiente: su botón, sus tablas y su
+    auto-actualización (cada refresh_seconds) re-ejecutan solo esta pestaña.
+    """
+    def body():
+        tenia_datos = st.session_state[tenant.name]["ok"]
+        forzar = st.button("🔄 Actualizar", key=f"{tenant.name}_refresh")
+        if forzar or tenia_datos:
+            refresh_tenant(tenant, force=forzar)
+        else:
+            load_daemon_snapshot(tenant.name)
+        display_tab(tenant.name, tenant.display_name)
+        if tenant.refresh_seconds and _fragment:
+            st.caption(f"Se actualiza sola cada {tenant.refresh_seconds / 60:g} min")
+        if not tenia_datos and st.session_state[tenant.name]["ok"] and forzar:
+            # Primer dato de la sesión: rerun completo para mostrar el botón del mensaje
+            st.rerun()
+
+    if _fragment is None:
+        return body
+    return _fragment(run_every=tenant.refresh_seconds or None)(body)
+
+for tab, tenant in zip(tabs, TENANTS):
+    with tab:
+        tenant_tab(tenant)()
 
 # ===========================
 # BOTÓN GENERAR MENSAJE WHATSAPP
@@ -683,81 +274,72 @@ with tab_arkadia:
 
 if st.session_state.get("scraping_done", False):
     if st.button("📩 Generar mensaje de WhatsApp"):
+        from powerbi_report import get_powerbi_data_cached
+        from message_builder import build_whatsapp_message
+
+        prefetch = st.session_state.pop("powerbi_prefetch", None)
+        if prefetch is not None and prefetch.done() and prefetch.exception() is not None:
+            st.warning(f"⚠️ La extracción de Power BI lanzada con el scraping falló: {prefetch.exception()}. Reintentando...")
+
         with st.spinner("🌐 Obteniendo datos de Power BI..."):
-            powerbi_data = get_powerbi_data()
-        
-        if powerbi_data is None:
-            st.error("❌ No se pudieron obtener los datos de Power BI. No se puede generar el mensaje.")
-            st.stop()
-        
-        mensaje = (
-            "Buen día, se realiza informe de facturación electrónica, al momento no contamos con facturación pendiente.\n\n"
-            "Se realiza de igual forma revisión de motores FE:\n\n"
-        )
-        for name, display_name in {
-            "andino": "Motor Andino",
-            "bulevar": "Motor Bulevar",
-            "fontanar": "Motor Fontanar",
-            "arkadia": "Motor Arkadia"
-        }.items():
-            state = st.session_state[name]
-            if state["ok"]:
-                pendientes = 0
-                data = state["data"]
-
-                # Diferenciamos Arkadia vs los demás
-                if name == "arkadia":
-                    if isinstance(data, pd.DataFrame) and not data.empty:
-                        if "pending" in data.columns:
-                            pendientes = data.iloc[0]["pending"]
-                        elif "total_pendientes" in data.columns:
-                            pendientes = data.iloc[0]["total_pendientes"]
-                    elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                        pendientes = data[0].get("pending") or data[0].get("total_pendientes", 0)
-                else:  # Andino, Bulevar y Fontanar usan "total_pendientes"
-                    if isinstance(data, pd.DataFrame) and not data.empty and "total_pendientes" in data.columns:
-                        pendientes = data.iloc[0]["total_pendientes"]
-                    elif isinstance(data, list) and len(data) > 0 and isinstance(data[0], dict):
-                        pendientes = data[0].get("total_pendientes", 0)
-
-                # Facturas hoy
-                total_hoy = state["invoices"]["total_facturas"] if state["invoices"] else 0
-
-                # Fecha jobs
-                fecha_jobs = "Sin fecha"
-                if isinstance(state["jobs"], pd.DataFrame) and not state["jobs"].empty:
-                    if name == "arkadia" and "FECHA DE ACTUALIZACIÓN" in state["jobs"].columns:
-                        fecha_jobs = format_fecha(state["jobs"].iloc[0]["FECHA DE ACTUALIZACIÓN"])
-                    elif "ultima_actualizacion" in state["jobs"].columns:
-                        fecha_jobs = format_fecha(state["jobs"].iloc[0]["ultima_actualizacion"])
-
-                mensaje += (
-                    f"* {display_name} {'con ' + str(pendientes) + ' facturas pendientes' if int(pendientes) else 'sin facturas pendientes'}, "
-                    f"con {total_hoy} facturas del día de hoy, con sus Jobs actualizados ({fecha_jobs})\n\n"
-                )
-        
-        # Añadir los datos de Power BI al mensaje
-        mensaje += f"\nFacturas sin CUFE: (BI actualizado: {powerbi_data['fecha_analizada']})\n\nParqueaderos: {powerbi_data['parqueaderos']:,}\nPeajes: {powerbi_data['peajes']:,}"
-        
-        # Añadir los servicios al mensaje
-        if powerbi_data.get('servicios'):
-            mensaje += f"\n\nTransacciones Sin Factura por servicio: (BI actualizado: {powerbi_data['fecha_analizada']})\n\n"
-            
-            # Calcular total de servicios
-            total_servicios = 0
-            for servicio, cantidad in powerbi_data['servicios'].items():
-                try:
-                    total_servicios += int(cantidad.replace(',', ''))
-                except:
-                    pass
-                
-                mensaje += f"{servicio}: {cantidad}\n"
-            
-        # Añadir la tabla de consumo de consecutivos al mensaje
-        if powerbi_data.get('tabla_asociados'):
-            mensaje += f"\n\nSe realiza revisión de consumo de consecutivos:\n\n"
-            
-            for item in powerbi_data['tabla_asociados']:
-                mensaje += f"Asociado {item['asociado']}, {item['peaje']} al {item['porcentaje']}\n"
+            try:
+                powerbi_data = get_powerbi_data_cached()
+            except Exception as e:
+                st.error(f"❌ {e}")
+                st.error("❌ No se pudieron obtener los datos de Power BI. No se puede generar el mensaje.")
+                st.stop()
+
+        st.caption(f"Datos de Power BI extraídos: {powerbi_data['extraido_at'].strftime('%d/%m/%Y %H:%M:%S')}")
+        mensaje = build_whatsapp_message(st.session_state, powerbi_data)
 
         st.text_area("Mensaje generado", mensaje, height=400)
+
+# ===========================
+# TENDENCIA
+# ===========================
+
+# La tabla daily cambia a lo sumo una vez por corrida: la consulta y los pivots se reutilizan
+# entre reruns durante TREND_CACHE_TTL segundos
+TREND_CACHE_TTL = 300
+
+@st.cache_data(ttl=TREND_CACHE_TTL, show_spinner=False)
+def tendencia_diaria(dias=90):
+    """(total de facturas, pendientes) por día y centro, listos para st.line_chart; None sin historial"""
+    from history import daily_trend
+
+    filas = daily_trend(dias)
+    if not filas:
+        return None
+    import pandas as pd
+
+    tendencia = pd.DataFrame(filas)
+    return (tendencia.pivot(index="day", columns="tenant", values="total_facturas"),
+            tendencia.pivot(index="day", columns="tenant", values="pendientes_max"))
+
+with st.expander("📈 Tendencia (últimos 90 días)"):
+    graficos = tendencia_diaria(90)
+    if graficos is not None:
+        totales, pendientes = graficos
+        st.caption("Total de facturas por día (el mayor visto en el día)")
+        st.line_chart(totales)
+        st.caption("Facturas pendientes por día (máximo del día)")
+        st.line_chart(pendientes)
+    else:
+        st.info("Aún no hay historial: se guarda una fila por centro en cada scraping.")
+
+# ===========================
+# DIAGNÓSTICO
+# ===========================
+
+with st.expander("🩺 Diagnóstico de solicitudes"):
+    filas = METRICS.summary()
+    if filas:
+        st.caption("Por centro y endpoint, ordenado por tiempo total (el primero es el que más pesa en la corrida)")
+        st.dataframe(filas, use_container_width=True, hide_index=True)
+    else:
+        st.info("Aún no hay solicitudes registradas en este proceso.")
+    circuitos = breaker_states()
+    if circuitos:
+        st.caption("Circuit breakers: " + ", ".join(f"{centro} {estado}" for centro, estado in sorted(circuitos.items())))
+    if METRICS_PORT:
+        st.caption(f"Formato Prometheus: http://localhost:{METRICS_PORT}/metrics")
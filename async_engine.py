@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from resilience import start_run, end_run, RUN_DEADLINE
+
+# Hilos para I/O bloqueante por proceso: hasta 4 por centro (login + 3 endpoints),
+# con un tope para que decenas de centros no abran cientos de hilos (SCRAPE_MAX_WORKERS)
+MAX_WORKERS = int(os.environ.get("SCRAPE_MAX_WORKERS", 64))
+WORKERS_PER_TENANT = 4
+
+# Procesos para repartir los centros cuando son muchos (SCRAPE_SHARDS; 1 = todo en este proceso)
+SCRAPE_SHARDS = int(os.environ.get("SCRAPE_SHARDS", 1))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _invoice_count_only(scraper) -> Dict[str, Any]:
+    """Mismo formato que get_invoices pero solo con el total (sin factura reciente)."""
+    total = scraper.get_invoice_count()
+    if total is None:
+        return {}
+    return {"total_facturas": total, "factura_reciente": {}}
+
+
+async def scrape_tenant_async(scraper, username: str, password: str,
+                              count_only: bool = False, deadline: float = RUN_DEADLINE,
+                              incremental: bool = False) -> Dict[str, Any]:
+    """
+    Hace login y luego consulta pendientes, jobs y facturas de forma concurrente.
+    Devuelve los datos crudos tal como los entrega el scraper:
+    {"ok": bool, "data": ..., "jobs": ..., "invoices": ..., "totals": {"pending": n, "jobs": n}}
+    (totals: totalItems de pendientes y jobs si el scraper los informa, si no None).
+    Con count_only=True solo se pide el total de facturas (sin la más reciente); con
+    incremental=True las facturas salen de scraper.sync_invoices (solo las nuevas desde la
+    última marca de agua en SQLite, mismo formato más "nuevas").
+    Toda la corrida comparte un presupuesto de `deadline` segundos (ver resilience.py).
+    """
+    start_run(scraper.session, deadline)
+    try:
+        ok = await asyncio.to_thread(scraper.login, username, password)
+        result = {"ok": ok, "data": None, "jobs": None, "invoices": None}
+        if not ok:
+            return result
+
+        fetch_invoices = scraper.get_invoices
+        if count_only:
+            fetch_invoices = functools.partial(_invoice_count_only, scraper)
+        elif incremental:
+            fetch_invoices = scraper.sync_invoices
+
+        data, jobs, invoices = await asyncio.gather(
+            asyncio.to_thread(scraper.get_pending_invoices),
+            asyncio.to_thread(scraper.get_jobs_config),
+            asyncio.to_thread(fetch_invoices),
+        )
+        result.update({"data": data, "jobs": jobs, "invoices": invoices, "totals": {
+            "pending": getattr(scraper, "pending_total", None),
+            "jobs": getattr(scraper, "jobs_total", None),
+        }})
+        return result
+    finally:
+        end_run(scraper.session)
+
+
+async def scrape_all_async(tenants: Iterable[Tuple[str, Any, str, str]],
+                           count_only: bool = False, incremental: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Ejecuta todos los centros comerciales en paralelo.
+    tenants: iterable de (nombre, clase_scraper, usuario, contraseña).
+    """
+    tenants = list(tenants)
+    loop = asyncio.get_running_loop()
+    # Pool de hilos de esta corrida: los asyncio.to_thread de scrape_tenant_async usan el
+    # executor por defecto del loop; el with lo cierra al terminar aunque el loop siga vivo
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(MAX_WORKERS, WORKERS_PER_TENANT * len(tenants)))
+    ) as executor:
+        loop.set_default_executor(executor)
+        resultados = await asyncio.gather(*(
+            scrape_tenant_async(scraper_class(), username, password, count_only=count_only, incremental=incremental)
+            for _, scraper_class, username, password in tenants
+        ))
+    return {name: result for (name, *_), result in zip(tenants, resultados)}
+
+
+def scrape_tenant(scraper, username: str, password: str, count_only: bool = False,
+                  incremental: bool = False) -> Dict[str, Any]:
+    """Envoltorio síncrono de scrape_tenant_async."""
+    return asyncio.run(scrape_tenant_async(scraper, username, password, count_only=count_only,
+                                           incremental=incremental))
+
+
+def scrape_all(tenants: Iterable[Tuple[str, Any, str, str]], count_only: bool = False,
+               shards: int = SCRAPE_SHARDS, incremental: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Envoltorio síncrono de scrape_all_async (para usar desde Streamlit).
+    Con shards > 1 los centros se reparten entre varios procesos (ver scrape_sharded).
+    """
+    tenants = list(tenants)
+    if shards > 1 and len(tenants) > 1:
+        return scrape_sharded(tenants, shards, count_only=count_only, incremental=incremental)
+    return asyncio.run(scrape_all_async(tenants, count_only=count_only, incremental=incremental))
+
+
+def shard(tenants: List[Any], shards: int) -> List[List[Any]]:
+    """Reparte los centros en `shards` grupos (round-robin), sin grupos vacíos."""
+    return [group for group in (tenants[i::shards] for i in range(shards)) if group]
+
+
+def _scrape_shard(tenants: List[Tuple[str, Any, str, str]], count_only: bool,
+                  incremental: bool = False) -> Dict[str, Dict[str, Any]]:
+    return asyncio.run(scrape_all_async(tenants, count_only=count_only, incremental=incremental))
+
+
+def _get_process_pool(shards: int) -> ProcessPoolExecutor:
+    """
+    Pool de procesos reutilizado entre corridas (arrancar intérpretes cuesta más que una corrida).
+    Se usa "spawn": el proceso padre tiene hilos (Streamlit, pools HTTP) y un fork podría
+    heredar locks tomados.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool._max_workers < shards:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(max_workers=shards,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def scrape_sharded(tenants: Iterable[Tuple[str, Any, str, str]], shards: int,
+                   count_only: bool = False, incremental: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Reparte los centros entre `shards` procesos; cada uno corre scrape_all_async sobre su grupo
+    con su propio event loop, pool de hilos y conexiones. Las fábricas de scraper deben poder
+    enviarse a otro proceso (clases del módulo o gopass_scraper.scraper_for(tenant)).
+    El pool de procesos se reutiliza, así que cada hijo conserva sus tokens entre corridas;
+    las métricas HTTP (request_metrics) de esas solicitudes quedan en el hijo.
+    """
+    tenants = list(tenants)
+    groups = shard(tenants, shards)
+    if len(groups) <= 1:
+        return asyncio.run(scrape_all_async(tenants, count_only=count_only, incremental=incremental))
+    pool = _get_process_pool(len(groups))
+    resultados = {}
+    for parcial in pool.map(_scrape_shard, groups, [count_only] * len(groups), [incremental] * len(groups)):
+        resultados.update(parcial)
+    # Mismo orden que `tenants`, como scrape_all en un solo proceso
+    return {name: resultados[name] for name, *_ in tenants}
@@ -0,0 +1,286 @@
+"""
+Carga histórica (backfill) de facturas por centro comercial y rango de fechas.
+
+Para cada centro se decide cómo partir el rango según los conteos medidos:
+- Un conteo del rango completo ($top=1). Si cabe en pocas páginas, se baja con una
+  sola consulta `between`.
+- Si no, un conteo por día y se agrupan días consecutivos en consultas de hasta
+  `max_pages` páginas, que se descargan en paralelo (a lo sumo `per_host`
+  solicitudes en vuelo por host).
+
+Las filas quedan en la base de incremental_sync (tabla invoices, con el mismo `tenant`
+= nombre del centro en el registro que usa sync_invoices). Un tramo se marca terminado en backfill_days solo si
+llegaron todas las facturas que informó el conteo; si faltan, sus días quedan pendientes
+y la próxima corrida los vuelve a pedir (una corrida interrumpida retoma donde quedó).
+
+Uso:
+    python backfill.py --start 2025-09-01 --end 2025-09-30
+    python backfill.py --start 2025-09-01 --end 2025-09-30 --tenants andino arkadia --per-host 6
+"""
+import argparse
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from gopass_scraper import scraper_for
+from incremental_sync import connect, DB_PATH
+from invoices import INVOICE_FIELDS, PAGE_SIZE, count_invoices, iter_invoice_pages, normalize_invoice
+from run_log import log
+from tenants import TENANTS, SECRETS_PATH, load_credentials, credentials
+
+# Solicitudes simultáneas por host (conteos y páginas)
+PER_HOST = 4
+# Páginas máximas por consulta antes de partir el rango entre varios workers
+MAX_CHUNK_PAGES = 8
+
+BOGOTA = timezone(timedelta(hours=-5))
+
+_CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backfill_days (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    facturas INTEGER,
+    completed_at TEXT,
+    PRIMARY KEY (tenant, day)
+);
+"""
+
+# SQLite admite un solo escritor: los workers escriben por turnos
+_write_lock = threading.Lock()
+
+
+class HostLimiter:
+    """Sesión del scraper con a lo sumo `limit` GET en vuelo (incluye el prefetch de páginas)."""
+
+    def __init__(self, session, limit: int = PER_HOST):
+        self.session = session
+        self._slots = threading.BoundedSemaphore(limit)
+
+    def get(self, *args, **kwargs):
+        with self._slots:
+            return self.session.get(*args, **kwargs)
+
+
+def date_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+def _runs(days: List[date]) -> List[List[date]]:
+    """Agrupa días ordenados en tramos consecutivos (tras retomar puede haber huecos)."""
+    runs = []
+    for day in days:
+        if runs and day - runs[-1][-1] == timedelta(days=1):
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def _pages(total: Optional[int], page_size: int) -> int:
+    return math.ceil(total / page_size) if total else 0
+
+
+def _day_of(row: Dict[str, Any], default: date) -> date:
+    """Día (hora Bogotá) de una factura normalizada, según fecha_factura."""
+    value = row.get("fecha_factura")
+    if not value:
+        return default
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return default
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(BOGOTA)
+    return parsed.date()
+
+
+def completed_days(conn, tenant: str) -> set:
+    rows = conn.execute("SELECT day FROM backfill_days WHERE tenant = ?", (tenant,)).fetchall()
+    return {row["day"] for row in rows}
+
+
+def plan_chunks(session, api_base: str, days: List[date], page_size: int = PAGE_SIZE,
+                max_pages: int = MAX_CHUNK_PAGES, workers: int = PER_HOST,
+                select: Optional[str] = None) -> List[Tuple[date, date, Optional[int]]]:
+    """
+    Parte los días pendientes en consultas (inicio, fin, facturas esperadas); las esperadas
+    son None si algún día del tramo no se pudo contar.
+    Un tramo que cabe en `max_pages` páginas va en una sola consulta; si no, se cuenta
+    día por día y se agrupan días hasta un tamaño que reparta el trabajo entre `workers`.
+    """
+    chunks = []
+    for run in _runs(days):
+        total = count_invoices(session, api_base, run[0], end_date=run[-1], select=select)
+        if total is not None and _pages(total, page_size) <= max_pages:
+            chunks.append((run[0], run[-1], total))
+            continue
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            counts = list(executor.map(lambda day: count_invoices(session, api_base, day, select=select), run))
+        # Un día que no se pudo contar va solo, como si estuviera lleno
+        pages = [max_pages if count is None else _pages(count, page_size) for count in counts]
+        target = min(max_pages, max(1, math.ceil(sum(pages) / workers)))
+
+        start, expected, acumuladas = run[0], 0, 0
+        for day, count, day_pages in zip(run, counts, pages):
+            if acumuladas and acumuladas + day_pages > target:
+                chunks.append((start, day - timedelta(days=1), expected))
+                start, expected, acumuladas = day, 0, 0
+            expected = None if expected is None or count is None else expected + count
+            acumuladas += day_pages
+        chunks.append((start, run[-1], expected))
+    return chunks
+
+
+def fetch_chunk(session, tenant: str, api_base: str, start: date, end: date, expected: Optional[int],
+                page_size: int = PAGE_SIZE, db_path: str = DB_PATH, select: Optional[str] = None) -> int:
+    """
+    Descarga start..end y guarda las facturas. Los días se marcan terminados solo si llegaron
+    al menos `expected` filas (el conteo del plan); con menos, o sin conteo (None), quedan
+    pendientes para la próxima corrida. Devuelve las filas recibidas.
+    """
+    columns = ", ".join(["tenant", "day"] + INVOICE_FIELDS)
+    placeholders = ", ".join("?" for _ in range(len(INVOICE_FIELDS) + 2))
+    por_dia = {day.isoformat(): 0 for day in date_range(start, end)}
+    recibidas = 0
+    conn = connect(db_path)
+    try:
+        for rows in iter_invoice_pages(session, api_base, start, end, page_size=page_size, select=select):
+            recibidas += len(rows)
+            values = []
+            for raw in rows:
+                row = normalize_invoice(raw)
+                if row.get("idinvoice") is None:
+                    continue
+                day = _day_of(row, start).isoformat()
+                por_dia[day] = por_dia.get(day, 0) + 1
+                values.append([tenant, day] + [row.get(field) for field in INVOICE_FIELDS])
+            with _write_lock, conn:
+                conn.executemany(f"INSERT OR IGNORE INTO invoices ({columns}) VALUES ({placeholders})", values)
+
+        if expected is None or recibidas < expected:
+            return recibidas
+        completed_at = datetime.now().isoformat(timespec="seconds")
+        with _write_lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO backfill_days (tenant, day, facturas, completed_at) VALUES (?, ?, ?, ?)",
+                [(tenant, day.isoformat(), por_dia.get(day.isoformat(), 0), completed_at)
+                 for day in date_range(start, end)],
+            )
+        return recibidas
+    finally:
+        conn.close()
+
+
+def backfill_tenant(name: str, scraper, start: date, end: date, db_path: str = DB_PATH,
+                    per_host: int = PER_HOST, page_size: int = PAGE_SIZE,
+                    max_pages: int = MAX_CHUNK_PAGES) -> Dict[str, Any]:
+    """Backfill de un centro ya autenticado. Los días ya marcados en backfill_days se saltan."""
+    began = time.perf_counter()
+    api_base = scraper.api_base
+    conn = connect(db_path)
+    try:
+        conn.executescript(_CHECKPOINT_SCHEMA)
+        done = completed_days(conn, name)
+    finally:
+        conn.close()
+
+    rango = date_range(start, end)
+    days = [day for day in rango if day.isoformat() not in done]
+    resumen = {"dias": len(days), "omitidos": len(rango) - len(days), "consultas": 0, "facturas": 0,
+               "fallidas": 0, "incompletas": 0}
+    if not days:
+        log(f"{name}: nada pendiente entre {start} y {end}")
+        resumen["segundos"] = time.perf_counter() - began
+        return resumen
+
+    session = HostLimiter(scraper.session, per_host)
+    chunks = plan_chunks(session, api_base, days, page_size, max_pages, per_host, scraper.count_select)
+    resumen["consultas"] = len(chunks)
+    log(f"{name}: {len(days)} días pendientes en {len(chunks)} consultas")
+
+    with ThreadPoolExecutor(max_workers=per_host, thread_name_prefix=f"backfill-{name}") as executor:
+        futures = {
+            executor.submit(fetch_chunk, session, name, api_base, chunk_start, chunk_end, expected, page_size,
+                            db_path, scraper.invoice_select):
+                (chunk_start, chunk_end, expected)
+            for chunk_start, chunk_end, expected in chunks
+        }
+        terminadas = 0
+        for future in as_completed(futures):
+            chunk_start, chunk_end, expected = futures[future]
+            terminadas += 1
+            try:
+                filas = future.result()
+                resumen["facturas"] += filas
+                log(f"{name}: {chunk_start}..{chunk_end} {filas}/{expected} facturas "
+                    f"({terminadas}/{len(chunks)} consultas)")
+                if expected is None or filas < expected:
+                    resumen["incompletas"] += 1
+                    faltan = "sin conteo" if expected is None else f"faltan {expected - filas}"
+                    log(f"{name}: {chunk_start}..{chunk_end} incompleto ({faltan}), "
+                        f"sus días quedan pendientes para la próxima corrida")
+            except Exception as e:
+                resumen["fallidas"] += 1
+                log(f"{name}: {chunk_start}..{chunk_end} error {e} (se reintenta en la próxima corrida)")
+
+    resumen["segundos"] = time.perf_counter() - began
+    return resumen
+
+
+def backfill(tenants: Iterable[Tuple[str, Any, str, str]], start: date, end: date,
+             db_path: str = DB_PATH, per_host: int = PER_HOST, page_size: int = PAGE_SIZE,
+             max_pages: int = MAX_CHUNK_PAGES) -> Dict[str, Dict[str, Any]]:
+    """
+    Backfill de varios centros a la vez (cada uno en su host, con su propio límite).
+    `tenants` son tuplas (nombre, scraper, usuario, contraseña), como en scrape_all.
+    """
+    def run(name, scraper, username, password):
+        if not scraper.login(username, password):
+            log(f"{name}: login fallido, se omite")
+            return name, {"error": "login"}
+        return name, backfill_tenant(name, scraper, start, end, db_path, per_host, page_size, max_pages)
+
+    tenants = list(tenants)
+    if not tenants:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(tenants)) as executor:
+        return dict(executor.map(lambda args: run(*args), tenants))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga histórica de facturas de GoPass a SQLite")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="primer día (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="último día (por defecto --start)")
+    parser.add_argument("--tenants", nargs="*", help="centros a cargar (por defecto todos)")
+    parser.add_argument("--per-host", type=int, default=PER_HOST)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--max-chunk-pages", type=int, default=MAX_CHUNK_PAGES)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--secrets", default=SECRETS_PATH)
+    args = parser.parse_args()
+
+    end = args.end or args.start
+    if end < args.start:
+        parser.error("--end no puede ser anterior a --start")
+    nombres = [tenant.name for tenant in TENANTS]
+    desconocidos = set(args.tenants or []) - set(nombres)
+    if desconocidos:
+        parser.error(f"centros desconocidos: {', '.join(sorted(desconocidos))} (opciones: {', '.join(nombres)})")
+
+    secrets = load_credentials(args.secrets)
+    tenants = [
+        (tenant.name, scraper_for(tenant)(), *credentials(tenant, secrets))
+        for tenant in TENANTS
+        if not args.tenants or tenant.name in args.tenants
+    ]
+    resultados = backfill(tenants, args.start, end, args.db, args.per_host, args.page_size, args.max_chunk_pages)
+    for name, resumen in resultados.items():
+        log(f"{name}: {resumen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,757 @@
+"""
+Benchmarks locales contra un servidor stub (sin credenciales ni red externa).
+
+Escenarios comparativos (antes/después) que imprimen sus propias métricas. Los benchmarks
+de run_scraper, del parser de Power BI y del mensaje están en tests/benchmarks
+(pytest-benchmark, con --benchmark-autosave / --benchmark-compare).
+
+Uso:
+    python benchmark.py                     # todos
+    python benchmark.py count columnar      # solo algunos
+
+    python benchmark.py pool        # latencia de corridas en frío vs. con pool caliente
+    python benchmark.py engine      # corrida secuencial vs. motor asyncio (4 centros)
+    python benchmark.py stream      # filas/seg y RSS pico exportando un día de 100k facturas
+    python benchmark.py count       # bytes por poll: get_invoices vs. get_invoice_count
+    python benchmark.py startup     # import en frío de app.py y latencia por rerun de Streamlit
+    python benchmark.py sessions    # N sesiones pulsando "Ejecutar scraping" a la vez, con y sin caché
+    python benchmark.py resilience  # cola de latencia con y sin hedging, y fallo rápido del circuit breaker
+    python benchmark.py columnar    # memoria y tiempo de construcción con 1M filas: DataFrame de dicts vs. tabla columnar
+    python benchmark.py decode      # filas/seg decodificando getcustom: response.json() vs. decoders por backend
+    python benchmark.py projection  # bytes y ms por consulta: esquema completo vs. $select de la vista declarada
+    python benchmark.py tables      # pestaña con miles de pendientes: lista completa + st.table vs. una página del servidor
+    python benchmark.py backfill    # un mes de facturas: una consulta `between` vs. plan adaptativo en paralelo, y reanudación
+    python benchmark.py history     # lectura de la tendencia de 90 días: tabla daily vs. GROUP BY sobre todas las corridas
+    python benchmark.py pipeline    # scraping + mensaje: Power BI después de los centros vs. en paralelo con ellos
+    python benchmark.py refresh     # 30 min de pestañas abiertas: auto-actualizar la página completa vs. un fragmento por pestaña
+    python benchmark.py tenants     # scrape_all con 4, 12, 25 y 50 centros del registro, y 50 repartidos en 2 procesos
+"""
+import argparse
+import ast
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from statistics import mean, median
+from urllib.parse import urlparse
+
+import requests
+
+# Los scrapings de los benchmarks no deben quedar en el historial real del dashboard
+os.environ["FACTURAS_HISTORY_DB"] = os.path.join(tempfile.gettempdir(), "benchmark_historial.db")
+
+from http_pool import new_session
+from invoices import export_csv, normalize_invoice, PAGE_SIZE, invoice_select
+from async_engine import scrape_all
+from scrape_results import run_scraper, scrape_all_cached, refresh_if_stale, SCRAPE_CACHE
+from result_cache import SingleFlightCache
+from request_metrics import METRICS
+import resilience
+from stub_server import start_stub_server, stub_class, fake_invoice
+from columnar import TableBuilder, INVOICE_SCHEMA
+import decoders
+import backfill
+import history
+from tenants import TenantConfig, get_tenant
+from gopass_scraper import GoPassScraper, scrape_targets
+from scraper import FacturaParkScraper
+from scraper_bulevar import FacturaBulevarScraper
+from scraper_fontanar import FacturaFontanarScraper
+from scraper_arkadia import FacturaArkadiaScraper
+
+TENANTS = [
+    ("andino", FacturaParkScraper),
+    ("bulevar", FacturaBulevarScraper),
+    ("fontanar", FacturaFontanarScraper),
+    ("arkadia", FacturaArkadiaScraper),
+]
+
+
+# ===========================
+# BENCHMARKS
+# ===========================
+
+def _timed_run(session, base_url, requests_per_run):
+    start = time.perf_counter()
+    session.post(f"{base_url}/api/accc_auth/login", json={"email": "u", "password": "p"}, timeout=5)
+    for _ in range(requests_per_run):
+        session.get(f"{base_url}/api/trns_invoices/pendingEmit", timeout=5)
+    return time.perf_counter() - start
+
+
+def bench_pool(runs=30, requests_per_run=3):
+    """Compara una sesión nueva por corrida (frío) contra sesiones sobre el pool compartido."""
+    server, base_url = start_stub_server()
+    try:
+        cold = [_timed_run(requests.Session(), base_url, requests_per_run) for _ in range(runs)]
+        new_session().head(base_url, timeout=5)  # pre-calentar
+        warm = [_timed_run(new_session(), base_url, requests_per_run) for _ in range(runs)]
+    finally:
+        server.shutdown()
+
+    print(f"pool: {runs} corridas x {requests_per_run + 1} requests")
+    print(f"  frío     mediana={median(cold) * 1000:.2f} ms  media={mean(cold) * 1000:.2f} ms")
+    print(f"  caliente mediana={median(warm) * 1000:.2f} ms  media={mean(warm) * 1000:.2f} ms")
+    return {"frio_ms": median(cold) * 1000, "caliente_ms": median(warm) * 1000}
+
+
+def bench_engine(runs=5, latency=0.05):
+    """Corrida secuencial (login + 3 endpoints x 4 centros) vs. motor asyncio."""
+    server, base_url = start_stub_server(latency=latency)
+    try:
+        clases = [(name, stub_class(cls, base_url)) for name, cls in TENANTS]
+
+        def secuencial():
+            for _, cls in clases:
+                scraper = cls()
+                if scraper.login("u", "p"):
+                    scraper.get_pending_invoices()
+                    scraper.get_jobs_config()
+                    scraper.get_invoices()
+
+        def concurrente():
+            scrape_all([(name, cls, "u", "p") for name, cls in clases])
+
+        resultados = {}
+        for nombre, fn in [("secuencial", secuencial), ("asyncio", concurrente)]:
+            tiempos = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                fn()
+                tiempos.append(time.perf_counter() - start)
+            resultados[nombre] = median(tiempos)
+    finally:
+        server.shutdown()
+
+    print(f"engine: latencia stub={latency * 1000:.0f} ms por request, {runs} corridas")
+    for nombre, valor in resultados.items():
+        print(f"  {nombre:<10} mediana={valor * 1000:.1f} ms")
+    return {f"{nombre}_ms": valor * 1000 for nombre, valor in resultados.items()}
+
+
+def bench_stream(total=100_000, page_size=500):
+    """Exporta un día de `total` facturas a CSV vía iter_invoices y mide filas/seg y RSS pico."""
+    server, base_url = start_stub_server(invoice_rows=total)
+    try:
+        scraper = stub_class(FacturaParkScraper, base_url)()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            count = export_csv(scraper.iter_invoices(date(2025, 1, 1), page_size=page_size),
+                               os.path.join(tmp, "facturas.csv"))
+            elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    finally:
+        server.shutdown()
+
+    print(f"stream: {count} filas, páginas de {page_size}")
+    print(f"  {count / elapsed:,.0f} filas/seg ({elapsed:.2f} s)")
+    print(f"  RSS pico {rss_after / 1024:.1f} MB (+{(rss_after - rss_before) / 1024:.1f} MB durante la exportación)")
+    return {"filas_por_seg": count / elapsed, "rss_delta_mb": (rss_after - rss_before) / 1024}
+
+
+def bench_count(total=5_000):
+    """Bytes transferidos por poll con la consulta completa vs. la de solo conteo."""
+    server, base_url = start_stub_server(invoice_rows=total)
+    try:
+        scraper = stub_class(FacturaParkScraper, base_url)()
+        scraper.login("u", "p")
+        scraper.get_invoices()
+        scraper.get_invoice_count()
+    finally:
+        server.shutdown()
+
+    row = next(row for row in METRICS.summary() if row["centro"] == urlparse(base_url).netloc
+               and row["endpoint"] == "getcustom")
+    print(f"count: día de {total} facturas")
+    print(f"  ahorro por poll   {row['ahorro_conteo_bytes']:>7} bytes")
+    return {"bytes_saved": row["ahorro_conteo_bytes"]}
+
+
+def bench_sessions(sessions=8, latency=0.05):
+    """Solicitudes upstream y tiempo total con `sessions` clics simultáneos, sin y con SCRAPE_CACHE."""
+    server, base_url = start_stub_server(latency=latency)
+    tenants = [(name, stub_class(cls, base_url, tenant=name), "u", "p") for name, cls in TENANTS]
+    modos = {
+        "sin caché": lambda: [run_scraper(*tenant) for tenant in tenants],
+        "con caché": lambda: scrape_all_cached(tenants),
+    }
+    metricas = {}
+    try:
+        print(f"sessions: {sessions} sesiones simultáneas, latencia stub={latency * 1000:.0f} ms")
+        for modo, fn in modos.items():
+            SCRAPE_CACHE.clear()
+            METRICS.reset()
+            hilos = [threading.Thread(target=fn) for _ in range(sessions)]
+            start = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            elapsed = time.perf_counter() - start
+            upstream = sum(fila["solicitudes"] for fila in METRICS.summary())
+            print(f"  {modo:<10} {upstream:>4} solicitudes upstream  {elapsed * 1000:8.1f} ms")
+            clave = modo.replace(" ", "_").replace("é", "e")
+            metricas[f"{clave}_solicitudes"] = upstream
+            metricas[f"{clave}_ms"] = elapsed * 1000
+    finally:
+        server.shutdown()
+    return metricas
+
+
+def bench_refresh(minutes=30, tick=60, intervals=(60, 120, 300, 600), latency=0.02):
+    """
+    `minutes` de pestañas abiertas con reloj simulado (un tick cada `tick` s): auto-actualizar
+    la página completa (todos los centros en cada tick, al ritmo del intervalo más corto)
+    vs. un fragmento por pestaña que re-consulta solo su centro cuando vence su intervalo
+    (refresh_if_stale). Cuenta solicitudes upstream y tiempo real de scraping.
+    """
+    server, base_url = start_stub_server(latency=latency)
+    targets = [(name, stub_class(cls, base_url, tenant=name), "u", "p") for name, cls in TENANTS]
+    ticks = range(0, minutes * 60 + 1, tick)
+
+    def pagina_completa():
+        for _ in ticks:
+            SCRAPE_CACHE.clear()  # cada tick llega después del TTL del caché
+            scrape_all_cached(targets)
+
+    def fragmentos():
+        states = {name: {} for name, *_ in targets}
+        for ahora in ticks:
+            SCRAPE_CACHE.clear()
+            for target, intervalo in zip(targets, intervals):
+                result = refresh_if_stale(target, states[target[0]], intervalo, now=ahora)
+                if result is not None:
+                    states[target[0]] = {**result, "updated_at": ahora}
+
+    metricas = {}
+    try:
+        print(f"refresh: {minutes} min con las 4 pestañas abiertas, intervalos {intervals} s, "
+              f"latencia stub={latency * 1000:.0f} ms")
+        for modo, fn in (("pagina", pagina_completa), ("fragmentos", fragmentos)):
+            METRICS.reset()
+            start = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - start
+            upstream = sum(fila["solicitudes"] for fila in METRICS.summary())
+            print(f"  {modo:<11} {upstream:>5} solicitudes upstream  {elapsed:6.2f} s de scraping")
+            metricas[f"{modo}_solicitudes"] = upstream
+            metricas[f"{modo}_s"] = elapsed
+    finally:
+        server.shutdown()
+    return metricas
+
+
+def bench_pipeline(latency=0.5, powerbi_seconds=1.5, runs=3):
+    """
+    Clic en "Ejecutar scraping" y luego en "Generar mensaje", con los 4 centros contra el
+    stub y una extracción de Power BI simulada de `powerbi_seconds` s (el worker real
+    necesita Chromium). En serie, Power BI empieza al pedir el mensaje; en paralelo se
+    lanza con el scraping y el mensaje solo espera el Future (como prefetch_powerbi_data).
+    """
+    server, base_url = start_stub_server(latency=latency)
+    tenants = [(name, stub_class(cls, base_url, tenant=name), "u", "p") for name, cls in TENANTS]
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def extraer_powerbi():
+        time.sleep(powerbi_seconds)
+        return {"parqueaderos": 1, "peajes": 1}
+
+    def serie(cache):
+        scrape_all_cached(tenants)
+        return cache.get_or_fetch("powerbi", extraer_powerbi)
+
+    def paralelo(cache):
+        executor.submit(cache.get_or_fetch, "powerbi", extraer_powerbi)
+        scrape_all_cached(tenants)
+        return cache.get_or_fetch("powerbi", extraer_powerbi)
+
+    metricas = {}
+    try:
+        print(f"pipeline: latencia stub={latency * 1000:.0f} ms, Power BI simulado {powerbi_seconds:.1f} s, "
+              f"mediana de {runs}")
+        for modo, fn in (("serie", serie), ("paralelo", paralelo)):
+            tiempos = []
+            for _ in range(runs):
+                SCRAPE_CACHE.clear()
+                start = time.perf_counter()
+                fn(SingleFlightCache(60))
+                tiempos.append(time.perf_counter() - start)
+            metricas[f"{modo}_s"] = median(tiempos)
+            print(f"  {modo:<9} {median(tiempos):6.2f} s")
+    finally:
+        executor.shutdown()
+        server.shutdown()
+    return metricas
+
+
+def _percentil(valores, q):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(round(q * (len(valores) - 1))))]
+
+
+def bench_resilience(runs=60, latency=0.02, tail_ratio=0.02, tail_latency=1.0):
+    """
+    Corridas de los 4 centros contra un stub donde `tail_ratio` de los GET tardan
+    `tail_latency` s extra: p50/p99 por corrida sin y con hedging. Luego un stub que
+    siempre responde 503, para medir cuánto tarda en fallar con el circuito abierto.
+    """
+    server, base_url = start_stub_server(latency=latency, tail_ratio=tail_ratio, tail_latency=tail_latency)
+    tenants = [(name, stub_class(cls, base_url, tenant=name), "u", "p") for name, cls in TENANTS]
+    metricas = {}
+    hedge_original = resilience.HEDGE_ENABLED
+    try:
+        print(f"resilience: {runs} corridas, {tail_ratio:.0%} de GET con +{tail_latency:.1f} s")
+        for modo, hedge in [("sin hedging", False), ("con hedging", True)]:
+            resilience.HEDGE_ENABLED = hedge
+            METRICS.reset()
+            tiempos = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                scrape_all(tenants)
+                tiempos.append(time.perf_counter() - start)
+            p50, p99 = median(tiempos), _percentil(tiempos, 0.99)
+            print(f"  {modo:<12} p50={p50 * 1000:7.1f} ms  p99={p99 * 1000:7.1f} ms")
+            clave = modo.replace(" ", "_")
+            metricas[f"{clave}_p50_ms"] = p50 * 1000
+            metricas[f"{clave}_p99_ms"] = p99 * 1000
+    finally:
+        resilience.HEDGE_ENABLED = hedge_original
+        server.shutdown()
+
+    server, base_url = start_stub_server(latency=latency, error_ratio=1.0)
+    try:
+        scraper_class = stub_class(FacturaParkScraper, base_url, tenant="andino")
+        tiempos = []
+        for _ in range(resilience.FAILURE_THRESHOLD + 3):
+            scraper = scraper_class()
+            scraper.login("u", "p")
+            start = time.perf_counter()
+            scraper.get_pending_invoices()
+            tiempos.append(time.perf_counter() - start)
+        estado = resilience.breaker_states().get(base_url.split("//", 1)[1])
+    finally:
+        server.shutdown()
+    print(f"  503 continuo: primera llamada {tiempos[0] * 1000:.1f} ms (con reintentos), "
+          f"última {tiempos[-1] * 1000:.2f} ms, circuito {estado}")
+    metricas["circuito_abierto_ms"] = tiempos[-1] * 1000
+    return metricas
+
+
+def bench_columnar(total=1_000_000, page_size=PAGE_SIZE):
+    """
+    Construye `total` facturas (en páginas, como llegan de getcustom) de dos formas:
+    normalize_invoice + pd.DataFrame(lista de dicts) vs. TableBuilder + to_pandas().
+    Mide tiempo de construcción y memoria del resultado.
+    """
+    import pandas as pd
+
+    def paginas():
+        for inicio in range(0, total, page_size):
+            yield [fake_invoice(i) for i in range(inicio, min(total, inicio + page_size))]
+
+    # Generar las páginas sintéticas tiene su propio costo; se descuenta de ambos caminos
+    start = time.perf_counter()
+    for pagina in paginas():
+        pass
+    t_gen = time.perf_counter() - start
+
+    start = time.perf_counter()
+    filas = []
+    for pagina in paginas():
+        filas.extend(normalize_invoice(row) for row in pagina)
+    df_dicts = pd.DataFrame(filas)
+    t_dicts = time.perf_counter() - start - t_gen
+    mem_dicts = df_dicts.memory_usage(deep=True).sum()
+    del filas, df_dicts
+
+    start = time.perf_counter()
+    builder = TableBuilder(INVOICE_SCHEMA)
+    for pagina in paginas():
+        builder.extend(pagina)
+    tabla = builder.build()
+    t_build = time.perf_counter() - start - t_gen
+    start = time.perf_counter()
+    df_tabla = tabla.to_pandas()
+    t_pandas = time.perf_counter() - start
+    mem_tabla = df_tabla.memory_usage(deep=True).sum()
+
+    print(f"columnar: {total:,} facturas en páginas de {page_size} (sin contar {t_gen:.2f} s de generarlas)")
+    print(f"  dicts + DataFrame   {t_dicts:7.2f} s  {mem_dicts / 2**20:8.1f} MB")
+    print(f"  TableBuilder        {t_build:7.2f} s  {tabla.nbytes / 2**20:8.1f} MB (buffers)")
+    print(f"  .to_pandas()        {t_pandas:7.2f} s  {mem_tabla / 2**20:8.1f} MB")
+    return {"dicts_s": t_dicts, "dicts_mb": mem_dicts / 2**20, "builder_s": t_build,
+            "to_pandas_s": t_pandas, "tabla_mb": mem_tabla / 2**20}
+
+
+def bench_decode(rows=PAGE_SIZE, pages=200, extra_columns=30):
+    """
+    Decodifica `pages` veces una página de getcustom de `rows` facturas con response.json()
+    (lo que hacían los scrapers) y con EndpointDecoder en cada backend disponible. Se mide
+    con las filas del stub (14 campos) y con filas anchas (+`extra_columns` campos que el
+    esquema no usa, como las 28 columnas de genc_jobsconfig).
+    """
+    def fila_ancha(i):
+        fila = fake_invoice(i)
+        fila.update({f"extra{k}": f"valor {k} {i}" for k in range(extra_columns)})
+        return fila
+
+    def medir(decode):
+        start = time.perf_counter()
+        for _ in range(pages):
+            decode()
+        return rows * pages / (time.perf_counter() - start)
+
+    metricas = {}
+    for caso, fila in (("stub", fake_invoice), ("ancha", fila_ancha)):
+        cuerpo = json.dumps({"data": {"totalItems": rows, "rows": [fila(i) for i in range(rows)]}}).encode()
+        response = requests.models.Response()
+        response._content = cuerpo
+        response.encoding = "utf-8"
+
+        print(f"decode ({caso}): página de {rows} facturas ({len(cuerpo) / 1024:.0f} KB) x {pages}")
+        base = medir(response.json)
+        print(f"  response.json()     {base:12,.0f} filas/s")
+        metricas[f"{caso}_response_json_rows_s"] = base
+        for backend in ("json", "orjson", "msgspec"):
+            if getattr(decoders, backend) is None:
+                print(f"  {backend:<19} no instalado")
+                continue
+            decoder = decoders.EndpointDecoder("getcustom", decoders.GETCUSTOM.fields, backend)
+            velocidad = medir(lambda: decoder.decode(cuerpo))
+            print(f"  {backend:<19} {velocidad:12,.0f} filas/s  x{velocidad / base:.1f}")
+            metricas[f"{caso}_{backend}_rows_s"] = velocidad
+    return metricas
+
+
+def bench_projection(runs=50, rows=PAGE_SIZE):
+    """
+    Bytes y tiempo (GET + decodificación + proyección) por consulta pidiendo todo el esquema
+    vs. solo el $select que arma la vista declarada: genc_jobsconfig de Arkadia (28 columnas
+    en el fixture, el dashboard muestra 4) y una página de getcustom de `rows` facturas del stub.
+    """
+    server, base_url = start_stub_server(invoice_rows=rows)
+    session = new_session()
+    arkadia = GoPassScraper(get_tenant("arkadia"))
+    jobs_full = ("idjob,jobname,scheduletype,repeatinterval,maxconcurrent,startdate,enddate,restartable,"
+                 "eventqueuename,jobpriority,runcount,maxruns,failurecount,maxfailures,retrycount,laststartdate,"
+                 "lastrunduration,nextrundate,maxrunduration,logginglevel,raiseevents,enabled,email,sms,"
+                 "createduser,createdat,updateduser,updatedat")
+    jobs_api = f"{base_url}/arkadia/api/genc_jobsconfig?$top=10&$skip=0"
+    invoices_api = f"{base_url}/api/trns_transparking/getcustom?$top={rows}&$skip=0"
+
+    def medir(url, decoder, proyectar):
+        session.get(url, timeout=5)  # calentar conexión
+        tiempos = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            r = session.get(url, timeout=5)
+            _, filas = decoder.decode_response(r)
+            proyectar(filas)
+            tiempos.append(time.perf_counter() - start)
+        return len(r.content), median(tiempos) * 1000
+
+    casos = (
+        ("jobs arkadia", jobs_api, f"&$select={jobs_full}&$orderby=idjob%20asc", arkadia.jobs_view.query(),
+         arkadia.jobs_view.decoder, arkadia.jobs_view.project),
+        # Como un centro que declara en tenants.toml los nombres de su motor (los del stub)
+        ("getcustom", invoices_api, "",
+         f"&$select={invoice_select({column.name: column.sources[:1] for column in INVOICE_SCHEMA})}",
+         decoders.GETCUSTOM, lambda filas: [normalize_invoice(fila) for fila in filas]),
+    )
+    metricas = {}
+    try:
+        print(f"projection: mediana de {runs} consultas contra el stub")
+        for caso, url, completo, vista, decoder, proyectar in casos:
+            bytes_completo, ms_completo = medir(url + completo, decoder, proyectar)
+            bytes_vista, ms_vista = medir(url + vista, decoder, proyectar)
+            print(f"  {caso:<13} todo   {bytes_completo:8,} bytes {ms_completo:7.2f} ms")
+            print(f"  {'':<13} vista  {bytes_vista:8,} bytes {ms_vista:7.2f} ms  "
+                  f"({(1 - bytes_vista / bytes_completo) * 100:.0f}% menos bytes)")
+            clave = caso.replace(" ", "_")
+            metricas.update({f"{clave}_todo_bytes": bytes_completo, f"{clave}_vista_bytes": bytes_vista,
+                             f"{clave}_todo_ms": ms_completo, f"{clave}_vista_ms": ms_vista})
+    finally:
+        server.shutdown()
+    return metricas
+
+
+def bench_tables(commerces=5000, page_size=25, runs=20, latency=0.02):
+    """
+    Pestaña con `commerces` comercios pendientes: traer la lista completa y convertirla en
+    tabla HTML (lo que hace st.table) vs. pedir solo la página visible ($top/$skip/$orderby)
+    y armar su DataFrame (lo que recibe st.dataframe).
+    """
+    import pandas as pd
+
+    server, base_url = start_stub_server(latency=latency, pending_rows=commerces)
+    tenant = TenantConfig("sitio", f"{base_url}/sitio", "credentials")
+    scraper = GoPassScraper(tenant)
+    columnas = list(tenant.pending_fields)
+
+    def completa():
+        total, rows = scraper.get_pending_page(commerces)
+        return len(pd.DataFrame(rows, columns=columnas).to_html())
+
+    def pagina():
+        total, rows = scraper.get_pending_page(page_size, 40 * page_size, ("total_pendientes", True))
+        return len(pd.DataFrame(rows, columns=columnas))
+
+    def medir(fn):
+        fn()
+        tiempos = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            tiempos.append(time.perf_counter() - start)
+        return median(tiempos) * 1000
+
+    try:
+        bytes_completa = len(scraper.session.get(scraper.pending_url(commerces), timeout=10).content)
+        bytes_pagina = len(scraper.session.get(scraper.pending_url(page_size, 40 * page_size), timeout=10).content)
+        ms_completa = medir(completa)
+        ms_pagina = medir(pagina)
+    finally:
+        server.shutdown()
+
+    print(f"tables: {commerces:,} comercios pendientes, página de {page_size}, latencia stub={latency * 1000:.0f} ms")
+    print(f"  lista completa + st.table   {bytes_completa:9,} bytes {ms_completa:8.1f} ms")
+    print(f"  página ($top/$skip/$orderby) {bytes_pagina:8,} bytes {ms_pagina:8.1f} ms")
+    return {"completa_bytes": bytes_completa, "pagina_bytes": bytes_pagina,
+            "completa_ms": ms_completa, "pagina_ms": ms_pagina}
+
+
+def bench_backfill(days=30, per_day=1200, latency=0.1, per_host=4):
+    """
+    Backfill de `days` días con `per_day` facturas cada uno contra el stub: una sola
+    consulta `between` paginada en serie vs. el plan adaptativo con `per_host` en vuelo.
+    Luego repite la corrida adaptativa para medir la reanudación desde el checkpoint.
+    """
+    server, base_url = start_stub_server(latency=latency, invoice_rows=per_day)
+    start = date(2025, 9, 1)
+    end = date.fromordinal(start.toordinal() + days - 1)
+    metricas = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for caso, hosts, max_pages in (("between", 1, 10**9), ("adaptativo", per_host, backfill.MAX_CHUNK_PAGES)):
+                scraper = stub_class(FacturaParkScraper, base_url)()
+                scraper.login("u", "p")
+                db_path = os.path.join(tmp, f"{caso}.db")
+                resumen = backfill.backfill_tenant("andino", scraper, start, end, db_path, hosts, PAGE_SIZE, max_pages)
+                metricas[f"{caso}_s"] = resumen["segundos"]
+                metricas[f"{caso}_consultas"] = resumen["consultas"]
+            reanudado = backfill.backfill_tenant("andino", scraper, start, end, db_path, per_host)
+            metricas["reanudar_s"] = reanudado["segundos"]
+    finally:
+        server.shutdown()
+
+    print(f"backfill: {days} días x {per_day} facturas, latencia stub={latency * 1000:.0f} ms")
+    print(f"  una consulta between     {metricas['between_s']:7.2f} s")
+    print(f"  adaptativo ({per_host} por host)  {metricas['adaptativo_s']:7.2f} s  "
+          f"{metricas['adaptativo_consultas']} consultas")
+    print(f"  reanudar (todo hecho)    {metricas['reanudar_s']:7.3f} s")
+    return metricas
+
+
+def bench_history(days=90, every_minutes=5, repeat=20):
+    """
+    Llena un historial con `days` días de corridas cada `every_minutes` minutos para los
+    4 centros y mide la tendencia de 90 días leída de la tabla daily contra el mismo
+    resumen calculado con GROUP BY sobre todas las corridas, y un rango de 24 h.
+    """
+    por_dia = 24 * 60 // every_minutes
+    fin = time.time()
+    inicio = fin - days * 86400
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "historial.db")
+        conn = history.connect(db_path)
+        start = time.perf_counter()
+        with conn:
+            for i in range(days * por_dia):
+                ts = inicio + i * every_minutes * 60
+                for name, _ in TENANTS:
+                    history._insert(conn, name, {
+                        "ok": True,
+                        "data": [{"comercio": "PARQUEADERO", "total_pendientes": i % 7},
+                                 {"comercio": "MOTOS", "total_pendientes": i % 3}],
+                        "jobs": [{"nombre_job": f"JOB {j}", "ultima_actualizacion": "2025-10-16T23:55:03"}
+                                 for j in range(3)],
+                        "invoices": {"total_facturas": i % por_dia * 4,
+                                     "factura_reciente": {"idinvoice": i, "valor_factura": 10000}},
+                    }, ts)
+        t_insert = time.perf_counter() - start
+        corridas = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+        def agrupado():
+            return conn.execute(
+                "SELECT tenant, date(ts, 'unixepoch', '-5 hours') AS day, COUNT(*), MAX(total_facturas),"
+                " MAX(pendientes) FROM runs WHERE ts >= ? AND ok = 1 GROUP BY tenant, day", (inicio,)
+            ).fetchall()
+
+        def medir(fn):
+            tiempos = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fn()
+                tiempos.append(time.perf_counter() - start)
+            return median(tiempos) * 1000
+
+        t_daily = medir(lambda: history.daily_trend(days, db_path=db_path))
+        t_group = medir(agrupado)
+        t_rango = medir(lambda: history.runs_between("andino", fin - 86400, fin, db_path=db_path))
+        conn.close()
+
+    print(f"history: {corridas:,} corridas ({days} días, cada {every_minutes} min, 4 centros), "
+          f"insertadas en {t_insert:.1f} s")
+    print(f"  tendencia (tabla daily)      {t_daily:8.2f} ms")
+    print(f"  tendencia (GROUP BY runs)    {t_group:8.2f} ms")
+    print(f"  runs_between 24 h (1 centro) {t_rango:8.2f} ms")
+    return {"insert_s": t_insert, "daily_ms": t_daily, "group_by_ms": t_group, "rango_24h_ms": t_rango}
+
+
+def bench_tenants(latency=0.05, runs=5, sizes=(4, 12, 25, 50), shards=2):
+    """
+    scrape_all con N centros sintéticos del registro (TenantConfig apuntando al stub,
+    un prefijo de ruta por centro): mediana por corrida al crecer de 4 a 50 centros,
+    y los 50 repartidos en `shards` procesos.
+    """
+    server, base_url = start_stub_server(latency=latency)
+
+    def targets(n):
+        configs = [TenantConfig(f"sitio{i:02d}", f"{base_url}/sitio{i:02d}", "credentials") for i in range(n)]
+        return scrape_targets({"credentials": {"USERNAME": "u", "PASSWORD": "p"}}, configs)
+
+    def medir(tenants, shards=1):
+        scrape_all(tenants, shards=shards)  # calentar tokens, conexiones y procesos
+        tiempos = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            resultados = scrape_all(tenants, shards=shards)
+            tiempos.append(time.perf_counter() - start)
+        fallidos = sum(1 for result in resultados.values() if not result["ok"])
+        return median(tiempos) * 1000, fallidos
+
+    metricas = {}
+    try:
+        print(f"tenants: latencia stub={latency * 1000:.0f} ms, mediana de {runs} corridas")
+        casos = [(n, 1) for n in sizes] + [(max(sizes), shards)]
+        for n, procesos in casos:
+            ms, fallidos = medir(targets(n), procesos)
+            etiqueta = f"{n} centros" + (f" / {procesos} procesos" if procesos > 1 else "")
+            print(f"  {etiqueta:<22} {ms:8.1f} ms  ({ms / n:6.2f} ms por centro, {fallidos} fallidos)")
+            metricas[f"n{n}" + (f"_shards{procesos}" if procesos > 1 else "") + "_ms"] = ms
+    finally:
+        server.shutdown()
+    return metricas
+
+
+# Se importan uno por uno en un intérprete limpio; los que no estén instalados se omiten
+_IMPORT_SCRIPT = """
+import importlib, json, sys, time
+faltantes = []
+start = time.perf_counter()
+for nombre in sys.argv[1:]:
+    try:
+        importlib.import_module(nombre)
+    except ImportError:
+        faltantes.append(nombre)
+elapsed = time.perf_counter() - start
+pesados = [m for m in ("pandas", "selenium", "requests", "streamlit") if m in sys.modules]
+print(json.dumps({"elapsed": elapsed, "faltantes": faltantes, "pesados": pesados}))
+"""
+
+
+def top_level_imports(path="app.py"):
+    """Módulos que un script importa a nivel de módulo (lo que paga cada arranque en frío)."""
+    with open(path, encoding="utf-8") as fh:
+        tree = ast.parse(fh.read())
+    modulos = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modulos += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modulos.append(node.module)
+    return list(dict.fromkeys(modulos))
+
+
+def bench_startup(runs=5, reruns=10):
+    """
+    Tiempo de importar en frío los módulos de nivel superior de app.py y, si streamlit
+    está instalado, la latencia del primer run y de cada rerun con AppTest.
+    """
+    modulos = top_level_imports("app.py")
+    tiempos = []
+    for _ in range(runs):
+        salida = subprocess.run([sys.executable, "-c", _IMPORT_SCRIPT, *modulos],
+                                capture_output=True, text=True, check=True).stdout
+        medicion = json.loads(salida)
+        tiempos.append(medicion["elapsed"])
+
+    print(f"startup: {len(modulos)} imports de nivel superior en app.py, mediana de {runs} intérpretes")
+    print(f"  import en frío {median(tiempos) * 1000:8.1f} ms  (cargados: {', '.join(medicion['pesados']) or 'ninguno pesado'})")
+    if medicion["faltantes"]:
+        print(f"  no instalados (omitidos): {', '.join(medicion['faltantes'])}")
+    metricas = {"import_ms": median(tiempos) * 1000}
+
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        print("  streamlit no instalado: se omite la medición por rerun")
+        return metricas
+
+    secretos = {"credentials": {"USERNAME": "u", "PASSWORD": "p"},
+                "arkadia": {"USERNAME": "u", "PASSWORD": "p"},
+                "Fontanar": {"USERNAME": "u", "PASSWORD": "p"}}
+    at = AppTest.from_file("app.py", default_timeout=60)
+    at.secrets.update(secretos)
+    start = time.perf_counter()
+    at.run()
+    primer = time.perf_counter() - start
+    rerun = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        rerun.append(time.perf_counter() - start)
+    print(f"  primer run     {primer * 1000:8.1f} ms")
+    print(f"  rerun          {median(rerun) * 1000:8.1f} ms  (mediana de {reruns})")
+    metricas.update({"primer_run_ms": primer * 1000, "rerun_ms": median(rerun) * 1000})
+    return metricas
+
+
+BENCHMARKS = {
+    "pool": bench_pool,
+    "engine": bench_engine,
+    "stream": bench_stream,
+    "count": bench_count,
+    "startup": bench_startup,
+    "sessions": bench_sessions,
+    "resilience": bench_resilience,
+    "columnar": bench_columnar,
+    "decode": bench_decode,
+    "projection": bench_projection,
+    "tables": bench_tables,
+    "backfill": bench_backfill,
+    "history": bench_history,
+    "pipeline": bench_pipeline,
+    "refresh": bench_refresh,
+    "tenants": bench_tenants,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks locales contra el stub de GoPass")
+    parser.add_argument("benchmarks", nargs="*", metavar="BENCHMARK",
+                        help=f"uno o varios de: {', '.join(BENCHMARKS)} (por defecto todos)")
+    args = parser.parse_args()
+    desconocidos = set(args.benchmarks) - set(BENCHMARKS)
+    if desconocidos:
+        parser.error(f"benchmarks desconocidos: {', '.join(sorted(desconocidos))}")
+
+    for nombre in args.benchmarks or list(BENCHMARKS):
+        BENCHMARKS[nombre]()
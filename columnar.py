@@ -0,0 +1,268 @@
+"""
+Representación columnar compacta y tipada para las filas que devuelven los scrapers.
+
+En vez de listas de dicts (o DataFrames de objetos Python) cada columna se guarda
+en un buffer tipado que se llena directo desde las filas JSON:
+
+- "int": enteros de 64 bits (array('q')) + máscara de nulos.
+- "money": centavos en enteros de 64 bits (valor × MONEY_SCALE) + máscara de nulos; al
+  leer (row/to_records, to_pandas, to_arrow) se devuelven pesos con sus decimales.
+- "category": códigos int32 + diccionario de valores (nombres de comercios, jobs, estados).
+- "bool": bytes 0/1 + máscara de nulos.
+- "str": lista de strings (cufe, fechas, identificadores de texto).
+
+to_pandas() arma el DataFrame sobre esos mismos buffers (IntegerArray / BooleanArray /
+Categorical sin copiar los valores; el dinero se divide por MONEY_SCALE en una columna
+Float64); to_arrow() hace lo mismo si pyarrow está instalado.
+"""
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from projection import first_alias
+
+# numpy/pandas/pyarrow se importan solo al convertir (to_pandas / to_arrow):
+# construir la tabla no los necesita.
+
+KINDS = ("int", "money", "category", "bool", "str")
+
+# Las columnas "money" guardan centavos: 1234.56 -> 123456
+MONEY_SCALE = 100
+
+
+class Column:
+    """Una columna del esquema: nombre de salida, llaves de origen (alias en orden) y tipo."""
+    __slots__ = ("name", "sources", "kind")
+
+    def __init__(self, name: str, kind: str, sources: Optional[Sequence[str]] = None):
+        if kind not in KINDS:
+            raise ValueError(f"Tipo de columna desconocido: {kind}")
+        self.name = name
+        self.kind = kind
+        self.sources = tuple(sources or (name,))
+
+
+def _to_int(value: Any, scale: int = 1) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return int(value) * scale
+    try:
+        return int(round(float(str(value).replace(",", "")) * scale))
+    except ValueError:
+        return None
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "1", "si", "sí", "s", "t")
+    return bool(value)
+
+
+class _ColumnBuilder:
+    __slots__ = ("column", "values", "mask", "codes")
+
+    def __init__(self, column: Column):
+        self.column = column
+        self.mask = bytearray()
+        self.codes: Dict[Any, int] = {}  # categoría -> código, en orden de aparición
+        if column.kind in ("int", "money"):
+            self.values = array("q")
+        elif column.kind == "category":
+            self.values = array("i")
+        elif column.kind == "bool":
+            self.values = bytearray()
+        else:
+            self.values = []
+
+    @property
+    def categories(self) -> List[Any]:
+        return list(self.codes)
+
+    def extend(self, values: List[Any]) -> None:
+        """Agrega una página de valores crudos; cada tipo se convierte en bloque."""
+        kind = self.column.kind
+        if kind in ("int", "money"):
+            scale = MONEY_SCALE if kind == "money" else 1
+            try:
+                # Camino rápido: todos enteros, sin nulos (array() falla sin dejar nada a medias)
+                chunk = array("q", values)
+                if scale != 1:
+                    chunk = array("q", [value * scale for value in chunk])
+                self.mask.extend(bytes(len(values)))
+            except (TypeError, OverflowError):
+                numbers = [_to_int(value, scale) for value in values]
+                chunk = array("q", [0 if number is None else number for number in numbers])
+                self.mask.extend([number is None for number in numbers])
+            self.values.extend(chunk)
+        elif kind == "category":
+            codes = self.codes
+            self.values.extend(array("i", [
+                -1 if value is None or value == "" else codes.setdefault(value, len(codes))
+                for value in values
+            ]))
+        elif kind == "bool":
+            flags = [_to_bool(value) for value in values]
+            self.values.extend([bool(flag) for flag in flags])
+            self.mask.extend([flag is None for flag in flags])
+        else:
+            self.values.extend([value if value is None or type(value) is str else str(value)
+                                for value in values])
+
+    def nbytes(self) -> int:
+        if self.column.kind == "str":
+            return sum(len(v) for v in self.values if v is not None) + 8 * len(self.values)
+        size = len(self.values) * getattr(self.values, "itemsize", 1) + len(self.mask)
+        return size + sum(len(str(c)) for c in self.categories)
+
+    def to_pandas(self):
+        import numpy as np
+        import pandas as pd
+
+        kind = self.column.kind
+        if kind == "money":
+            return pd.arrays.FloatingArray(np.frombuffer(self.values, dtype=np.int64) / MONEY_SCALE,
+                                           np.frombuffer(self.mask, dtype=np.bool_).copy())
+        if kind == "int":
+            return pd.arrays.IntegerArray(np.frombuffer(self.values, dtype=np.int64),
+                                          np.frombuffer(self.mask, dtype=np.bool_), copy=False)
+        if kind == "bool":
+            return pd.arrays.BooleanArray(np.frombuffer(self.values, dtype=np.bool_),
+                                          np.frombuffer(self.mask, dtype=np.bool_), copy=False)
+        if kind == "category":
+            return pd.Categorical.from_codes(np.frombuffer(self.values, dtype=np.int32),
+                                             categories=pd.Index(self.categories, dtype=object))
+        return np.array(self.values, dtype=object)
+
+    def to_arrow(self):
+        import numpy as np
+        import pyarrow as pa
+
+        kind = self.column.kind
+        if kind == "money":
+            return pa.array(np.frombuffer(self.values, dtype=np.int64) / MONEY_SCALE,
+                            mask=np.frombuffer(self.mask, dtype=np.bool_))
+        if kind == "int":
+            return pa.array(np.frombuffer(self.values, dtype=np.int64),
+                            mask=np.frombuffer(self.mask, dtype=np.bool_))
+        if kind == "bool":
+            return pa.array(np.frombuffer(self.values, dtype=np.bool_),
+                            mask=np.frombuffer(self.mask, dtype=np.bool_))
+        if kind == "category":
+            codes = np.frombuffer(self.values, dtype=np.int32)
+            return pa.DictionaryArray.from_arrays(pa.array(codes, mask=codes < 0),
+                                                  pa.array(self.categories, type=pa.string()))
+        return pa.array(self.values, type=pa.string())
+
+    def value(self, i: int) -> Any:
+        kind = self.column.kind
+        if kind in ("int", "money", "bool"):
+            if self.mask[i]:
+                return None
+            if kind == "money":
+                return self.values[i] / MONEY_SCALE
+            return bool(self.values[i]) if kind == "bool" else self.values[i]
+        if kind == "category":
+            code = self.values[i]
+            return None if code < 0 else self.categories[code]
+        return self.values[i]
+
+
+class ColumnarTable:
+    """Tabla inmutable producida por TableBuilder.build()."""
+    __slots__ = ("schema", "_columns", "num_rows")
+
+    def __init__(self, schema: Sequence[Column], columns: Dict[str, _ColumnBuilder], num_rows: int):
+        self.schema = tuple(schema)
+        self._columns = columns
+        self.num_rows = num_rows
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column.name for column in self.schema]
+
+    @property
+    def nbytes(self) -> int:
+        """Tamaño aproximado de los buffers (sin contar el overhead de los objetos str)."""
+        return sum(builder.nbytes() for builder in self._columns.values())
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return {name: builder.value(i) for name, builder in self._columns.items()}
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Lista de dicts con valores Python (None para nulos), apta para JSON."""
+        return [self.row(i) for i in range(self.num_rows)]
+
+    def to_pandas(self):
+        import pandas as pd
+
+        return pd.DataFrame({name: builder.to_pandas() for name, builder in self._columns.items()},
+                            copy=False)
+
+    def to_arrow(self):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("pyarrow no está instalado; usa to_pandas")
+        return pa.table({name: builder.to_arrow() for name, builder in self._columns.items()})
+
+
+class TableBuilder:
+    """Llena una ColumnarTable fila por fila (o página por página) desde dicts JSON."""
+
+    def __init__(self, schema: Sequence[Column]):
+        self.schema = tuple(schema)
+        self._columns = {column.name: _ColumnBuilder(column) for column in self.schema}
+        self.num_rows = 0
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.extend([row])
+
+    def extend(self, rows: Iterable[Dict[str, Any]]) -> "TableBuilder":
+        """Agrega un lote de filas (p. ej. una página de getcustom) columna por columna."""
+        rows = rows if isinstance(rows, list) else list(rows)
+        for builder in self._columns.values():
+            sources = builder.column.sources
+            if len(sources) == 1:
+                key = sources[0]
+                builder.extend([row.get(key) for row in rows])
+            else:
+                builder.extend([first_alias(row, sources) for row in rows])
+        self.num_rows += len(rows)
+        return self
+
+    def build(self) -> ColumnarTable:
+        table = ColumnarTable(self.schema, self._columns, self.num_rows)
+        self._columns = {column.name: _ColumnBuilder(column) for column in self.schema}
+        self.num_rows = 0
+        return table
+
+
+def build_table(schema: Sequence[Column], rows: Iterable[Dict[str, Any]]) -> ColumnarTable:
+    return TableBuilder(schema).extend(rows).build()
+
+
+# ===========================
+# ESQUEMAS
+# ===========================
+
+# Fila de getcustom -> campos de INVOICE_FIELDS (mismos alias que normalize_invoice).
+# valor_neto_factura y valor_factura son "money": se conservan los centavos (valorneto
+# suele traer decimales por el IVA descontado).
+INVOICE_SCHEMA = (
+    Column("idinvoice", "int", ("idinvoice", "id")),
+    Column("idtransaction", "int"),
+    Column("idtransparking", "int"),
+    Column("fecha_factura", "str", ("transdate", "fecha_factura", "transdateformat")),
+    Column("valor_neto_factura", "money", ("valorneto", "valor_neto_factura", "netvalue")),
+    Column("valor_factura", "money", ("valortotal", "valor_factura", "totalvalue")),
+    Column("nombretercero", "category", ("tercero", "nombretercero", "name")),
+    Column("outdate", "str"),
+    Column("invoicestatus", "category"),
+    Column("cufe", "str"),
+    Column("id_unico", "str", ("id_unico", "idinvoice", "id")),
+)
@@ -0,0 +1,200 @@
+"""
+Daemon de polling en segundo plano para los centros comerciales del registro (tenants.toml).
+
+Ejecuta los scrapers con intervalos adaptativos por centro (más seguido cuando cambian
+las facturas o los pendientes, más espaciado cuando todo está quieto) y publica
+un snapshot por centro en SNAPSHOT_DIR. Los centros a los que les toca a la vez se
+scrapean juntos con scrape_all (SCRAPE_SHARDS procesos); después de la primera vuelta
+las facturas se consultan solo con el conteo mientras el total no cambie.
+El dashboard lee esos snapshots al instante.
+
+Uso:
+    python daemon.py                 # polling continuo
+    python daemon.py --once          # una sola pasada (útil para cron)
+
+Las credenciales se leen de .streamlit/secrets.toml (mismas secciones que app.py).
+"""
+import argparse
+import random
+import threading
+import time
+
+from async_engine import scrape_all, SCRAPE_SHARDS
+from snapshots import publish_snapshot, SNAPSHOT_DIR
+from history import record_run
+from request_metrics import start_metrics_server, DAEMON_METRICS_PORT, DAEMON_METRICS_DEFAULT_PORT
+from gopass_scraper import scraper_for
+from run_log import log
+from tenants import TENANTS as REGISTRY, SECRETS_PATH, load_credentials, role_keys
+
+# (nombre, fábrica del scraper, sección de secrets.toml)
+TENANTS = [(tenant.name, scraper_for(tenant), tenant.secrets) for tenant in REGISTRY]
+
+MIN_INTERVAL = 60
+MAX_INTERVAL = 15 * 60
+JITTER = 0.1
+
+
+def activity_signature(result, name=None):
+    """Resume lo que se mira para adaptar el intervalo: total de facturas y pendientes."""
+    invoices = result.get("invoices") or {}
+    data = result.get("data")
+    keys = role_keys(name, "pending_count")
+    pendientes = 0
+    for row in data or []:
+        try:
+            pendientes += int(next((row[key] for key in keys if row.get(key) is not None), 0))
+        except (TypeError, ValueError):
+            pass
+    return invoices.get("total_facturas"), pendientes
+
+
+class AdaptiveInterval:
+    """Mitad del intervalo si hubo cambios, x1.5 si no; siempre dentro de [minimum, maximum]."""
+
+    def __init__(self, minimum=MIN_INTERVAL, maximum=MAX_INTERVAL, jitter=JITTER):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.jitter = jitter
+        self.current = minimum
+        self.last_signature = None
+
+    def update(self, signature, ok=True):
+        if not ok:
+            self.current = min(self.maximum, self.current * 2)
+        elif self.last_signature is not None and signature != self.last_signature:
+            self.current = max(self.minimum, self.current / 2)
+        else:
+            self.current = min(self.maximum, self.current * 1.5)
+        if ok:
+            self.last_signature = signature
+        return self.next_delay()
+
+    def next_delay(self):
+        return self.current * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+def _handle(name, result, snapshot_dir, interval, elapsed):
+    """Publica y registra el resultado de un centro; devuelve la espera hasta su próxima consulta."""
+    try:
+        if result is None:
+            raise RuntimeError("sin resultado")
+        publish_snapshot(name, result, snapshot_dir)
+        record_run(name, result)
+        signature = activity_signature(result, name)
+        delay = interval.update(signature, ok=result["ok"])
+        log(f"{name}: ok={result['ok']} {signature} en {elapsed:.1f}s, próximo en {delay:.0f}s")
+    except Exception as e:
+        delay = interval.update(None, ok=False)
+        log(f"{name}: error {e}, próximo en {delay:.0f}s")
+    return delay
+
+
+def _scrape(targets, shards, count_only=False, incremental=False):
+    try:
+        return scrape_all(targets, count_only=count_only, shards=shards, incremental=incremental)
+    except Exception as e:
+        log(f"error en la corrida de {len(targets)} centros: {e}")
+        return {}
+
+
+def poll_round(ready, snapshot_dir, intervals, last, shards=SCRAPE_SHARDS, incremental=True):
+    """
+    Una vuelta de polling sobre los centros `ready`; devuelve {nombre: espera}.
+    `last` guarda el último resultado bueno de cada centro entre vueltas. Los centros que ya
+    tienen factura reciente se consultan primero solo con el conteo (count_invoices): si el
+    total no cambió se reutiliza la factura reciente anterior, y si cambió se vuelven a
+    scrapear completos en esta misma vuelta. Con incremental=True las vueltas completas
+    sincronizan las facturas con sync_invoices (solo las nuevas desde la última marca de agua
+    en FACTURAS_SYNC_DB) en vez de volver a pedir las del día.
+    """
+    start = time.perf_counter()
+    conteo = [target for target in ready
+              if ((last.get(target[0]) or {}).get("invoices") or {}).get("factura_reciente")]
+    completos = [target for target in ready if target not in conteo]
+    resultados = {}
+    if conteo:
+        parciales = _scrape(conteo, shards, count_only=True)
+        for target in conteo:
+            name = target[0]
+            result = parciales.get(name)
+            previas = last[name]["invoices"]
+            if result is not None and result["ok"]:
+                invoices = result.get("invoices") or {}
+                if invoices.get("total_facturas") is None or invoices["total_facturas"] != previas["total_facturas"]:
+                    completos.append(target)
+                    continue
+                result = {**result, "invoices": {**invoices, "factura_reciente": previas["factura_reciente"]}}
+            resultados[name] = result
+    if completos:
+        resultados.update(_scrape(completos, shards, incremental=incremental))
+    elapsed = time.perf_counter() - start
+
+    delays = {}
+    for name, *_ in ready:
+        result = resultados.get(name)
+        delays[name] = _handle(name, result, snapshot_dir, intervals[name], elapsed)
+        if result is not None and result["ok"]:
+            last[name] = result
+    return delays
+
+
+def poll(targets, snapshot_dir, stop, intervals, once=False, shards=SCRAPE_SHARDS, incremental=True):
+    """
+    Bucle de polling de todos los centros. targets: (nombre, fábrica, usuario, contraseña);
+    intervals: {nombre: AdaptiveInterval}. En cada vuelta los centros a los que ya les toca
+    se scrapean juntos con scrape_all (repartidos en `shards` procesos, ver poll_round) y
+    cada uno queda programado según su propio intervalo.
+    """
+    # Arranque escalonado para no golpear todos los hosts en el mismo instante
+    now = time.monotonic()
+    due = {name: now if once else now + random.uniform(0, intervals[name].jitter * intervals[name].minimum)
+           for name, *_ in targets}
+    last = {}
+    while not stop.is_set():
+        ready = [target for target in targets if due[target[0]] <= time.monotonic()]
+        if ready:
+            for name, delay in poll_round(ready, snapshot_dir, intervals, last, shards, incremental).items():
+                due[name] = time.monotonic() + delay
+        if once:
+            return
+        stop.wait(max(0.0, min(due.values()) - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polling en segundo plano de los scrapers de GoPass")
+    parser.add_argument("--once", action="store_true", help="una sola pasada y salir")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--secrets", default=SECRETS_PATH)
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL)
+    parser.add_argument("--max-interval", type=float, default=MAX_INTERVAL)
+    parser.add_argument("--sync", action=argparse.BooleanOptionalAction, default=True,
+                        help="sincroniza las facturas de forma incremental en FACTURAS_SYNC_DB "
+                             "(--no-sync: pide las del día en cada vuelta completa)")
+    parser.add_argument("--metrics-port", type=int, nargs="?", const=DAEMON_METRICS_DEFAULT_PORT,
+                        default=DAEMON_METRICS_PORT,
+                        help=f"sirve /metrics de Prometheus en este puerto (sin número: "
+                             f"{DAEMON_METRICS_DEFAULT_PORT}; por defecto DAEMON_METRICS_PORT o apagado)")
+    args = parser.parse_args()
+
+    if args.metrics_port and start_metrics_server(args.metrics_port):
+        log(f"métricas en http://localhost:{args.metrics_port}/metrics")
+
+    secrets = load_credentials(args.secrets)
+    targets = [(name, scraper_class, secrets[section]["USERNAME"], secrets[section]["PASSWORD"])
+               for name, scraper_class, section in TENANTS]
+    intervals = {name: AdaptiveInterval(args.min_interval, args.max_interval) for name, *_ in targets}
+    stop = threading.Event()
+    t = threading.Thread(target=poll, args=(targets, args.snapshot_dir, stop, intervals),
+                         kwargs={"once": args.once, "incremental": args.sync}, name="poll", daemon=True)
+    t.start()
+
+    try:
+        while t.is_alive():
+            t.join(timeout=1)
+    except KeyboardInterrupt:
+        log("deteniendo...")
+        stop.set()
+
+if __name__ == "__main__":
+    main()
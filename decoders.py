@@ -0,0 +1,102 @@
+"""
+Decodificadores por endpoint de GoPass que leen directo de los bytes de la respuesta
+y conservan solo los campos que usan el dashboard y los exportadores.
+
+Backends, del más rápido al más lento (msgspec y orjson son opcionales):
+- msgspec: structs tipados por endpoint; los campos que no están en el esquema se
+  saltan durante el parseo, sin crear objetos Python para ellos. Las filas traen
+  solo los campos del esquema (los ausentes o nulos no aparecen).
+- orjson:  parseo completo en C; las filas se devuelven con todos sus campos.
+- json:    igual que orjson pero con la librería estándar.
+
+Todos devuelven (totalItems como int, filas como dicts); quien las consume debe
+leer los campos con .get(), como ya hacen normalize_invoice y columnar.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from columnar import INVOICE_SCHEMA
+from request_metrics import METRICS, label_for
+
+# msgspec y orjson son opcionales
+try:
+    import msgspec
+except Exception:
+    msgspec = None
+
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    orjson = None
+    _loads = json.loads
+
+BACKEND = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+
+
+def fields_for(*schemas) -> Tuple[str, ...]:
+    """Todas las llaves de origen (incluyendo alias) de uno o varios esquemas de columnar."""
+    fields = []
+    for schema in schemas:
+        for column in schema:
+            fields.extend(column.sources)
+    return tuple(dict.fromkeys(fields))
+
+
+def _as_total(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        try:
+            return int(float(str(value)))
+        except ValueError:
+            return 0
+
+
+class EndpointDecoder:
+    def __init__(self, name: str, fields: Sequence[str], backend: Optional[str] = None):
+        self.name = name
+        self.fields = tuple(fields)
+        self.backend = backend or BACKEND
+        if self.backend == "msgspec":
+            row = msgspec.defstruct(f"{name}_row", [(field, Any, None) for field in self.fields],
+                                    omit_defaults=True)
+            data = msgspec.defstruct(f"{name}_data", [("totalItems", Any, 0), ("rows", List[row], [])])
+            envelope = msgspec.defstruct(f"{name}_envelope", [("data", Optional[data], None)])
+            self._decoder = msgspec.json.Decoder(envelope)
+
+    def decode(self, content: bytes) -> Tuple[int, List[Dict[str, Any]]]:
+        """(totalItems, filas proyectadas) de un cuerpo {"data": {"totalItems", "rows"}}."""
+        if self.backend == "msgspec":
+            try:
+                envelope = self._decoder.decode(content)
+            except msgspec.DecodeError as e:
+                raise ValueError(str(e)) from e
+            if envelope.data is None:
+                return 0, []
+            return _as_total(envelope.data.totalItems), msgspec.to_builtins(envelope.data.rows)
+
+        # Sin msgspec las filas ya quedaron construidas completas: proyectarlas en Python
+        # cuesta tanto como el parseo, así que se devuelven tal cual
+        payload = _loads(content) if self.backend == "orjson" else json.loads(content)
+        data = payload.get("data") or {}
+        return _as_total(data.get("totalItems")), data.get("rows") or []
+
+    def decode_response(self, response) -> Tuple[int, List[Dict[str, Any]]]:
+        """Como decode(response.content), registrando en METRICS si el cuerpo no es JSON válido."""
+        try:
+            return self.decode(response.content)
+        except ValueError:
+            METRICS.json_error(*label_for(response.url))
+            raise
+
+
+# ===========================
+# DECODIFICADORES POR ENDPOINT
+# ===========================
+
+# trns_transparking/getcustom: campos de INVOICE_FIELDS con todos sus alias
+GETCUSTOM = EndpointDecoder("getcustom", fields_for(INVOICE_SCHEMA))
+# getcustom cuando solo interesa totalItems
+GETCUSTOM_COUNT = EndpointDecoder("getcustom_count", ())
+# pendingEmit y genc_jobsconfig se decodifican con los campos de cada centro (gopass_scraper)
@@ -0,0 +1,419 @@
+"""
+Pool de drivers de Chromium reutilizables para la extracción de Power BI.
+
+- La ruta de chromedriver se resuelve una sola vez (webdriver-manager o el del sistema).
+- Los drivers se mantienen vivos entre solicitudes, con health check antes de usarlos,
+  y se reciclan tras MAX_USES usos o si el árbol de procesos supera MAX_RSS_MB.
+- PowerBIWorker corre el pool en un proceso aparte, así la memoria de Chromium nunca
+  vive dentro del servidor de Streamlit. Selenium solo se importa dentro de ese
+  proceso (en las funciones que lo usan), no al importar este módulo.
+"""
+import base64
+import multiprocessing as mp
+import os
+import shutil
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from queue import Queue, Empty
+
+from readiness import wait_until_ready, DEADLINE, POLL_INTERVAL, QUIET_PERIOD
+from powerbi_querydata import QueryDataTracker
+
+CHROMIUM_BINARY = "/usr/bin/chromium"
+MAX_USES = 20
+MAX_RSS_MB = 1500
+REQUEST_TIMEOUT = 180
+# Espera máxima para que el worker cierre sus drivers (driver.quit()) antes de matarlo
+SHUTDOWN_TIMEOUT = 10
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+
+def resolve_chromedriver_path():
+    """Resuelve (y cachea) la ruta de chromedriver probando los mismos métodos que antes."""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path:
+            return _chromedriver_path
+
+        # MÉTODO 1: webdriver-manager con CHROMIUM
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            from webdriver_manager.core.os_manager import ChromeType
+            _chromedriver_path = ChromeDriverManager(chrome_type=ChromeType.CHROMIUM).install()
+            return _chromedriver_path
+        except Exception:
+            pass
+
+        # MÉTODO 2: webdriver-manager sin especificar chrome_type
+        try:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _chromedriver_path = ChromeDriverManager().install()
+            return _chromedriver_path
+        except Exception:
+            pass
+
+        # MÉTODO 3: chromedriver del sistema
+        path = shutil.which("chromedriver")
+        if path and os.path.exists(path):
+            os.chmod(path, 0o755)
+            _chromedriver_path = path
+        return _chromedriver_path
+
+
+def chrome_options():
+    """Opciones de Chromium compatibles con Streamlit Cloud"""
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+
+    # Opciones críticas para Streamlit Cloud
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-software-rasterizer")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-setuid-sandbox")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--start-maximized")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--remote-debugging-port=9222")
+    chrome_options.add_argument("--single-process")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    # User agent real
+    chrome_options.add_argument("--user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+    chrome_options.binary_location = CHROMIUM_BINARY
+
+    # Logs de rendimiento (eventos Network.*) para capturar las respuestas querydata
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return chrome_options
+
+
+def setup_driver():
+    """Configurar ChromeDriver para Selenium - Compatible con Streamlit Cloud"""
+    try:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+
+        path = resolve_chromedriver_path()
+        if not path:
+            return None
+        driver = webdriver.Chrome(service=Service(executable_path=path), options=chrome_options())
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+    except Exception:
+        return None
+
+
+def _process_tree_rss_mb(root_pid):
+    """RSS total (MB) de un proceso y sus descendientes, leyendo /proc (solo Linux)."""
+    if not root_pid or not os.path.isdir("/proc"):
+        return 0.0
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as fh:
+                total += int(fh.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(pid, []))
+    return total / (1024 * 1024)
+
+
+class PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+    def healthy(self):
+        try:
+            return self.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def rss_mb(self):
+        try:
+            return _process_tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            return 0.0
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """
+    Pool de hasta `size` drivers vivos. Con `size` > 1 hay que quitar el
+    --remote-debugging-port fijo de chrome_options() para que no choquen.
+    """
+
+    def __init__(self, size=1, max_uses=MAX_USES, max_rss_mb=MAX_RSS_MB):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle = Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def warm(self):
+        """Arranca los drivers de antemano para que la primera solicitud no pague el boot."""
+        resolve_chromedriver_path()
+        with self._lock:
+            while self._created < self.size:
+                driver = setup_driver()
+                if driver is None:
+                    break
+                self._created += 1
+                self._idle.put(PooledDriver(driver))
+
+    def _new(self):
+        driver = setup_driver()
+        if driver is None:
+            raise RuntimeError("No se pudo inicializar el driver de Selenium")
+        return PooledDriver(driver)
+
+    def _discard(self, pooled):
+        pooled.quit()
+        with self._lock:
+            self._created -= 1
+
+    def acquire(self, timeout=REQUEST_TIMEOUT):
+        with self._lock:
+            can_create = self._created < self.size and self._idle.empty()
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._new()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        pooled = self._idle.get(timeout=timeout)
+        if not pooled.healthy():
+            pooled.quit()
+            try:
+                return self._new()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return pooled
+
+    def release(self, pooled):
+        pooled.uses += 1
+        if pooled.uses >= self.max_uses or pooled.rss_mb() > self.max_rss_mb:
+            self._discard(pooled)
+            # Reponer el driver en segundo plano para que la próxima solicitud no pague el boot
+            threading.Thread(target=self.warm, daemon=True).start()
+            return
+        try:
+            # Liberar la memoria del reporte anterior sin matar el navegador
+            pooled.driver.get("about:blank")
+            pooled.driver.get_log("performance")
+        except Exception:
+            self._discard(pooled)
+            return
+        self._idle.put(pooled)
+
+    @contextmanager
+    def driver(self):
+        pooled = self.acquire()
+        try:
+            yield pooled.driver
+        except Exception:
+            # Un driver que falló a mitad de camino no vuelve al pool
+            self._discard(pooled)
+            raise
+        else:
+            self.release(pooled)
+
+    def close(self):
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except Empty:
+                break
+            self._discard(pooled)
+
+
+# ===========================
+# PROCESO WORKER
+# ===========================
+
+def page_text(pool, url, deadline=DEADLINE):
+    """
+    Navega al reporte con un driver del pool, espera a que esté listo (o a `deadline`)
+    y devuelve (texto visible del body, métricas de readiness).
+    """
+    from selenium.webdriver.common.by import By
+
+    with pool.driver() as driver:
+        driver.get(url)
+        metrics = wait_until_ready(driver, deadline=deadline)
+        return driver.find_element(By.TAG_NAME, "body").text, metrics
+
+
+def query_responses(pool, url, deadline=DEADLINE, quiet_period=QUIET_PERIOD):
+    """
+    Navega al reporte y captura los cuerpos de las respuestas querydata desde los logs
+    de rendimiento. Termina cuando no llegan respuestas nuevas durante `quiet_period`
+    (sin esperar el layout de los visuales) o al agotar `deadline`.
+    Devuelve (lista de cuerpos JSON en texto, métricas).
+    """
+    with pool.driver() as driver:
+        driver.get_log("performance")  # descartar eventos de solicitudes anteriores
+        start = time.monotonic()
+        driver.get(url)
+        tracker = QueryDataTracker()
+        bodies = []
+        last_new = time.monotonic()
+        while True:
+            for request_id in tracker.feed(driver.get_log("performance")):
+                try:
+                    response = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                except Exception:
+                    continue
+                body = response.get("body", "")
+                if response.get("base64Encoded"):
+                    body = base64.b64decode(body).decode("utf-8", errors="replace")
+                bodies.append(body)
+                last_new = time.monotonic()
+            now = time.monotonic()
+            if (bodies and now - last_new >= quiet_period) or now - start >= deadline:
+                break
+            time.sleep(POLL_INTERVAL)
+        metrics = {"ready": bool(bodies), "elapsed": round(time.monotonic() - start, 3), "responses": len(bodies)}
+        return bodies, metrics
+
+
+WORKER_OPS = {
+    "page_text": page_text,
+    "query_responses": query_responses,
+}
+
+
+def _worker_main(conn, size, max_uses, max_rss_mb):
+    # Grupo de procesos propio: chromedriver y Chromium lo heredan y se pueden matar juntos
+    try:
+        os.setsid()
+    except (AttributeError, OSError):
+        pass
+    pool = DriverPool(size, max_uses, max_rss_mb)
+    try:
+        pool.warm()
+    except Exception:
+        pass
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+            op, args = message
+            try:
+                conn.send((True, WORKER_OPS[op](pool, *args)))
+            except Exception as e:
+                conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        pool.close()
+
+
+class PowerBIWorker:
+    """
+    Proceso aislado que mantiene el DriverPool caliente.
+    Las solicitudes se serializan: el reporte es el mismo para todos los usuarios.
+    """
+
+    def __init__(self, size=1, max_uses=MAX_USES, max_rss_mb=MAX_RSS_MB):
+        self._args = (size, max_uses, max_rss_mb)
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        ctx = mp.get_context("spawn")
+        self._conn, child_conn = ctx.Pipe()
+        self._process = ctx.Process(target=_worker_main, args=(child_conn, *self._args), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    def _stop(self, timeout=SHUTDOWN_TIMEOUT):
+        """
+        Le pide al worker que cierre sus drivers y espera hasta `timeout`; después mata su
+        grupo de procesos (worker, chromedriver y Chromium), así un worker colgado en una
+        solicitud no deja navegadores huérfanos.
+        """
+        try:
+            self._conn.send(None)
+            self._process.join(timeout=timeout)
+        except Exception:
+            pass
+        try:
+            # El grupo solo existe si el worker llamó a setsid (su pid es el id del grupo)
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            pass
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join(timeout=1)
+        self._conn.close()
+
+    def _restart(self):
+        self._stop()
+        self._start()
+
+    def call(self, op, *args, timeout=REQUEST_TIMEOUT):
+        with self._lock:
+            if not self._process.is_alive():
+                self._restart()
+            try:
+                self._conn.send((op, args))
+            except (BrokenPipeError, OSError):
+                self._restart()
+                self._conn.send((op, args))
+            if not self._conn.poll(timeout):
+                self._restart()
+                raise TimeoutError(f"El worker de Power BI no respondió en {timeout}s")
+            ok, value = self._conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def page_text(self, url, deadline=DEADLINE):
+        """Devuelve (texto del body, métricas de readiness) del reporte en `url`."""
+        return self.call("page_text", url, deadline, timeout=deadline + REQUEST_TIMEOUT)
+
+    def query_responses(self, url, deadline=DEADLINE):
+        """Devuelve (cuerpos querydata capturados, métricas) del reporte en `url`."""
+        return self.call("query_responses", url, deadline, timeout=deadline + REQUEST_TIMEOUT)
+
+    def close(self):
+        with self._lock:
+            self._stop()
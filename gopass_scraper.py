@@ -0,0 +1,204 @@
+"""
+Scraper genérico de GoPass: el mismo código para cualquier centro del registro
+(tenants.toml). Lo que cambia entre centros (host, columnas que se muestran y de qué
+campos salen) viene de su TenantConfig; el $select y el $orderby de cada consulta
+se arman con projection.Projection a partir de esas columnas.
+"""
+from datetime import datetime, timedelta
+from functools import partial
+from urllib.parse import quote
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from http_pool import new_session
+from token_cache import authenticate
+from incremental_sync import sync_invoices, DB_PATH
+from columnar import ColumnarTable
+from decoders import GETCUSTOM
+from invoices import (
+    invoices_url, iter_invoices, invoices_table, normalize_invoice, count_invoices,
+    invoice_select, count_select, PAGE_SIZE
+)
+from projection import Projection
+from request_metrics import METRICS
+from tenants import TenantConfig, TENANTS, credentials
+
+# Intentar usar zoneinfo (py3.9+). Si no está, caerá a UTC-5 manual.
+try:
+    from zoneinfo import ZoneInfo
+    BOGOTA_TZ = ZoneInfo("America/Bogota")
+except Exception:
+    BOGOTA_TZ = None
+
+
+def today_bogota():
+    now = datetime.now(BOGOTA_TZ) if BOGOTA_TZ else datetime.utcnow() - timedelta(hours=5)
+    return now.date()
+
+
+class GoPassScraper:
+    def __init__(self, tenant: TenantConfig):
+        self.tenant = tenant
+        self.name = tenant.name
+        self.api_base = tenant.api_base
+        self.login_endpoint = f"{self.api_base}/accc_auth/login"
+        # Tablas del dashboard: columnas del registro -> $select/$orderby de cada endpoint
+        self.pending_view = Projection("pendingEmit", tenant.pending_fields, tenant.pending_orderby)
+        self.jobs_view = Projection("genc_jobsconfig", tenant.jobs_fields, tenant.jobs_orderby)
+        # getcustom: $select solo si el centro declara los nombres de campo de su motor
+        self.invoice_select = invoice_select(tenant.invoice_fields)
+        self.count_select = count_select(tenant.invoice_fields)
+        self.pending_api = self.pending_url()
+        self.jobs_api = self.jobs_url()
+        # totalItems de la última consulta general (las tablas paginan desde esas filas)
+        self.pending_total: Optional[int] = None
+        self.jobs_total: Optional[int] = None
+        self.session = new_session()
+
+    def pending_url(self, top: int = 10, skip: int = 0, orderby: Optional[str] = None,
+                    search: Optional[str] = None) -> str:
+        """
+        URL de pendingEmit para una página. `search` filtra en el servidor (additionalQuery)
+        por la columna pending_search del registro; sin esa columna no se filtra.
+        """
+        additional = ""
+        if search and self.tenant.pending_search:
+            texto = search.replace("'", "''")
+            additional = quote(f"{self.tenant.pending_search} ilike '%{texto}%'", safe="")
+        return (
+            f"{self.api_base}/trns_invoices/pendingEmit"
+            f"?$top={top}&$skip={skip}{self.pending_view.query(orderby)}&additionalQuery={additional}"
+        )
+
+    def jobs_url(self, top: int = 10, skip: int = 0, orderby: Optional[str] = None) -> str:
+        return f"{self.api_base}/genc_jobsconfig?$top={top}&$skip={skip}{self.jobs_view.query(orderby)}"
+
+    def _invoices_url_for_date(self, date_obj, top: int = 10, skip: int = 0) -> str:
+        return invoices_url(self.api_base, date_obj, top=top, skip=skip, select=self.invoice_select)
+
+    def iter_invoices(self, start_date, end_date=None, page_size: int = PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Recorre todas las facturas del día (o del rango start_date..end_date) página por página.
+        Entrega filas normalizadas; pensado para exportar días completos a CSV/Parquet.
+        """
+        return iter_invoices(self.session, self.api_base, start_date, end_date, page_size=page_size,
+                             select=self.invoice_select)
+
+    def invoices_table(self, start_date, end_date=None, page_size: int = PAGE_SIZE) -> ColumnarTable:
+        """
+        Igual que iter_invoices pero acumulando en una tabla columnar tipada
+        (columnar.INVOICE_SCHEMA), pensada para días completos o rangos de varios días.
+        """
+        return invoices_table(self.session, self.api_base, start_date, end_date, page_size=page_size,
+                              select=self.invoice_select)
+
+    def login(self, username: str, password: str) -> bool:
+        """Reutiliza el token cacheado si sigue vigente; si no, hace login contra la API."""
+        return authenticate(self.session, self.login_endpoint, username, password, self._request_token)
+
+    def _request_token(self, username: str, password: str) -> Optional[str]:
+        payload = {"email": username, "password": password}
+        headers = {"User-Agent": "Mozilla/5.0", "Content-Type": "application/json"}
+        try:
+            r = self.session.post(self.login_endpoint, json=payload, headers=headers, timeout=10)
+            if r.status_code != 200:
+                return None
+            return r.json().get("tokens", {}).get("access", {}).get("token")
+        except Exception as e:
+            print(f"Error login {self.name}: {e}")
+            return None
+
+    def _fetch_page(self, view: Projection, url: str, what: str) -> Optional[Tuple[int, List[Dict]]]:
+        """(totalItems, filas de la vista) de una página; None si la consulta falla."""
+        try:
+            r = self.session.get(url, timeout=10)
+            if r.status_code != 200:
+                return None
+            total, rows = view.decoder.decode_response(r)
+            return total, view.project(rows)
+        except Exception as e:
+            print(f"Error fetching {what} {self.name}: {e}")
+            return None
+
+    def _get_page(self, view: Projection, url: str, what: str) -> Tuple[int, List[Dict]]:
+        """Como _fetch_page pero (0, []) si la consulta falla."""
+        return self._fetch_page(view, url, what) or (0, [])
+
+    def get_pending_invoices(self) -> List[Dict]:
+        total, rows = self._get_page(self.pending_view, self.pending_api, "pending invoices")
+        self.pending_total = total if total or rows else None
+        return rows
+
+    def get_jobs_config(self) -> List[Dict]:
+        total, rows = self._get_page(self.jobs_view, self.jobs_api, "jobs")
+        self.jobs_total = total if total or rows else None
+        return rows
+
+    def get_pending_page(self, top: int, skip: int = 0, sort: Optional[Tuple[str, bool]] = None,
+                         search: Optional[str] = None) -> Optional[Tuple[int, List[Dict]]]:
+        """
+        Una página de pendientes para las tablas paginadas: `sort` es (columna, descendente)
+        y se resuelve en el servidor con $orderby; `search` ver pending_url.
+        None si la consulta falla ((0, []) es una página vacía de verdad).
+        """
+        orderby = self.pending_view.orderby_for(*sort) if sort else None
+        return self._fetch_page(self.pending_view, self.pending_url(top, skip, orderby, search), "pending invoices")
+
+    def get_jobs_page(self, top: int, skip: int = 0,
+                      sort: Optional[Tuple[str, bool]] = None) -> Optional[Tuple[int, List[Dict]]]:
+        """Una página de jobs (mismo `sort` y mismo None si falla que get_pending_page)."""
+        orderby = self.jobs_view.orderby_for(*sort) if sort else None
+        return self._fetch_page(self.jobs_view, self.jobs_url(top, skip, orderby), "jobs")
+
+    def get_invoice_count(self) -> Optional[int]:
+        """
+        Solo el total de facturas de HOY (Bogotá), sin descargar filas.
+        Usar cuando no se necesita la factura más reciente (p. ej. polling del dashboard).
+        """
+        return count_invoices(self.session, self.api_base, today_bogota(), select=self.count_select)
+
+    def sync_invoices(self, db_path: str = DB_PATH) -> Dict[str, Any]:
+        """
+        Variante incremental de get_invoices: solo pide facturas desde la última marca
+        de agua guardada en SQLite y fusiona las nuevas con el estado local del día.
+        total_facturas es el totalItems de la API, comparable con get_invoice_count.
+        """
+        try:
+            return sync_invoices(self.session, self.name, self.api_base, today_bogota(), db_path,
+                                 select=self.invoice_select, count_select=self.count_select)
+        except Exception as e:
+            print(f"Error syncing invoices {self.name}: {e}")
+            return {}
+
+    def get_invoices(self) -> Dict[str, Any]:
+        """
+        Devuelve la factura más reciente y el total de facturas para la FECHA ACTUAL (Bogotá).
+        Normaliza los nombres de campo esperados por app.py.
+        """
+        try:
+            r = self.session.get(self._invoices_url_for_date(today_bogota()), timeout=20)
+            if r.status_code != 200:
+                return {}
+            METRICS.record_payload(r.url, "full", len(r.content))
+
+            total, rows = GETCUSTOM.decode_response(r)
+            if not rows:
+                return {"total_facturas": total, "factura_reciente": {}}
+            # la factura más reciente (según la respuesta)
+            return {"total_facturas": total, "factura_reciente": normalize_invoice(rows[0])}
+        except Exception as e:
+            print(f"Error fetching invoices {self.name}: {e}")
+            return {}
+
+
+def scraper_for(tenant: TenantConfig) -> Callable[[], GoPassScraper]:
+    """Fábrica sin argumentos (lo que esperan scrape_all / scrape_all_cached); se puede enviar a otro proceso."""
+    return partial(GoPassScraper, tenant)
+
+
+def scrape_targets(secrets, tenants: Optional[Iterable[TenantConfig]] = None) -> List[Tuple[str, Any, str, str]]:
+    """(nombre, fábrica de scraper, usuario, contraseña) de cada centro del registro."""
+    targets = []
+    for tenant in TENANTS if tenants is None else tenants:
+        username, password = credentials(tenant, secrets)
+        targets.append((tenant.name, scraper_for(tenant), username, password))
+    return targets
@@ -0,0 +1,256 @@
+"""
+Historial local (SQLite) de cada corrida de scraping, para graficar tendencias y
+comparar contra días anteriores.
+
+Por corrida y centro se guarda: total de facturas del día, factura más reciente,
+pendientes por comercio y la fecha de cada job (columnas según los roles de tenants.toml).
+En jobs, `actualizado` es la fecha que elige el rol job_date; además se guardan tal cual
+los campos crudos updatedat y laststartdate cuando la fila los trae (NULL si no).
+Todas las tablas tienen índice por (tenant, ts). Además se mantiene una tabla `daily`
+con el resumen por centro y día, actualizada en cada inserción, para que la tendencia
+de 90 días lea 90 filas por centro y no todas las corridas.
+"""
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from snapshots import to_jsonable
+from tenants import role_keys
+
+# Archivo SQLite del historial (FACTURAS_HISTORY_DB en el entorno)
+HISTORY_DB = os.environ.get("FACTURAS_HISTORY_DB", "facturas_historial.db")
+
+BOGOTA = timezone(timedelta(hours=-5))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    tenant TEXT NOT NULL,
+    ts REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    total_facturas INTEGER,
+    pendientes INTEGER,
+    factura_id TEXT,
+    factura_fecha TEXT,
+    factura_valor REAL
+);
+CREATE INDEX IF NOT EXISTS runs_tenant_ts ON runs (tenant, ts);
+
+CREATE TABLE IF NOT EXISTS pending (
+    tenant TEXT NOT NULL,
+    ts REAL NOT NULL,
+    comercio TEXT,
+    pendientes INTEGER
+);
+CREATE INDEX IF NOT EXISTS pending_tenant_ts ON pending (tenant, ts);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    tenant TEXT NOT NULL,
+    ts REAL NOT NULL,
+    job TEXT,
+    actualizado TEXT,
+    updatedat TEXT,
+    laststartdate TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_tenant_ts ON jobs (tenant, ts);
+
+CREATE TABLE IF NOT EXISTS daily (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    corridas INTEGER NOT NULL,
+    total_facturas INTEGER,
+    pendientes_max INTEGER,
+    pendientes_ultimo INTEGER,
+    ultimo_ts REAL,
+    PRIMARY KEY (tenant, day)
+) WITHOUT ROWID;
+"""
+
+
+def connect(db_path: str = HISTORY_DB) -> sqlite3.Connection:
+    """Abre (y crea si hace falta) el historial. WAL: el dashboard lee mientras el daemon escribe."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    # Historiales creados antes de las columnas crudas de jobs
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column in ("updatedat", "laststartdate"):
+        if column not in columns:
+            with conn:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+    return conn
+
+
+def _pick(row: Dict[str, Any], keys) -> Any:
+    for key in keys:
+        if row.get(key) is not None:
+            return row[key]
+    return None
+
+
+def _as_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def day_of(ts: float) -> str:
+    """Día en hora Bogotá (YYYY-MM-DD) de un timestamp epoch."""
+    return datetime.fromtimestamp(ts, BOGOTA).date().isoformat()
+
+
+def _insert(conn: sqlite3.Connection, tenant: str, result: Dict[str, Any], ts: float) -> None:
+    """Inserta una corrida (sin commit). `result` puede ser el crudo del scraper o el de build_result."""
+    ok = bool(result.get("ok"))
+    pendientes_rows = []
+    job_rows = []
+    total = None
+    reciente = {}
+    if ok:
+        # Columnas según los roles del centro en tenants.toml (o los campos crudos de la API)
+        comercio_keys, pendientes_keys = role_keys(tenant, "pending_name"), role_keys(tenant, "pending_count")
+        job_keys, actualizado_keys = role_keys(tenant, "job_name"), role_keys(tenant, "job_date")
+        for row in to_jsonable(result.get("data")) or []:
+            if isinstance(row, dict):
+                pendientes_rows.append((tenant, ts, _pick(row, comercio_keys),
+                                        _as_int(_pick(row, pendientes_keys))))
+        for row in to_jsonable(result.get("jobs")) or []:
+            if isinstance(row, dict):
+                job_rows.append((tenant, ts, _pick(row, job_keys), _as_text(_pick(row, actualizado_keys)),
+                                 _as_text(row.get("updatedat")), _as_text(row.get("laststartdate"))))
+        invoices = result.get("invoices") or {}
+        total = _as_int(invoices.get("total_facturas"))
+        reciente = invoices.get("factura_reciente") or {}
+
+    pendientes = sum(row[3] or 0 for row in pendientes_rows) if pendientes_rows else None
+    conn.execute(
+        "INSERT INTO runs (tenant, ts, ok, total_facturas, pendientes, factura_id, factura_fecha, factura_valor)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (tenant, ts, int(ok), total, pendientes,
+         None if reciente.get("idinvoice") is None else str(reciente.get("idinvoice")),
+         reciente.get("fecha_factura") or reciente.get("transdate"),
+         _as_float(reciente.get("valor_factura") or reciente.get("valortotal"))),
+    )
+    if not ok:
+        return
+    conn.executemany("INSERT INTO pending (tenant, ts, comercio, pendientes) VALUES (?, ?, ?, ?)", pendientes_rows)
+    conn.executemany("INSERT INTO jobs (tenant, ts, job, actualizado, updatedat, laststartdate)"
+                     " VALUES (?, ?, ?, ?, ?, ?)", job_rows)
+    conn.execute(
+        """
+        INSERT INTO daily (tenant, day, corridas, total_facturas, pendientes_max, pendientes_ultimo, ultimo_ts)
+        VALUES (?, ?, 1, ?, ?, ?, ?)
+        ON CONFLICT (tenant, day) DO UPDATE SET
+            corridas = corridas + 1,
+            total_facturas = max(coalesce(total_facturas, excluded.total_facturas), coalesce(excluded.total_facturas, total_facturas)),
+            pendientes_max = max(coalesce(pendientes_max, excluded.pendientes_max), coalesce(excluded.pendientes_max, pendientes_max)),
+            pendientes_ultimo = CASE WHEN excluded.ultimo_ts >= ultimo_ts THEN excluded.pendientes_ultimo ELSE pendientes_ultimo END,
+            ultimo_ts = max(ultimo_ts, excluded.ultimo_ts)
+        """,
+        (tenant, day_of(ts), total, pendientes, pendientes, ts),
+    )
+
+
+def record_run(tenant: str, result: Dict[str, Any], ts: Optional[float] = None,
+               db_path: str = HISTORY_DB) -> bool:
+    """Guarda una corrida en el historial. Nunca interrumpe el scraping: devuelve False si falla."""
+    try:
+        conn = connect(db_path)
+        try:
+            with conn:
+                _insert(conn, tenant, result, time.time() if ts is None else ts)
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        print(f"No se pudo guardar el historial de {tenant}: {e}")
+        return False
+
+
+# ===========================
+# CONSULTAS
+# ===========================
+
+def runs_between(tenant: str, since: float, until: Optional[float] = None,
+                 db_path: str = HISTORY_DB) -> List[Dict[str, Any]]:
+    """Corridas de un centro entre dos timestamps (epoch), en orden cronológico."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT * FROM runs WHERE tenant = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (tenant, since, time.time() if until is None else until),
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def pending_between(tenant: str, since: float, until: Optional[float] = None,
+                    db_path: str = HISTORY_DB) -> List[Dict[str, Any]]:
+    """Pendientes por comercio de cada corrida de un centro entre dos timestamps."""
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT ts, comercio, pendientes FROM pending WHERE tenant = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (tenant, since, time.time() if until is None else until),
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def jobs_between(tenant: str, since: float, until: Optional[float] = None,
+                 db_path: str = HISTORY_DB) -> List[Dict[str, Any]]:
+    """
+    Fecha de actualización de cada job en cada corrida de un centro entre dos timestamps
+    (actualizado según el rol job_date, más los campos crudos updatedat y laststartdate).
+    """
+    conn = connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT ts, job, actualizado, updatedat, laststartdate FROM jobs WHERE tenant = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+            (tenant, since, time.time() if until is None else until),
+        ).fetchall()
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def daily_trend(days: int = 90, tenants: Optional[Iterable[str]] = None,
+                today: Optional[date] = None, db_path: str = HISTORY_DB) -> List[Dict[str, Any]]:
+    """
+    Resumen por centro y día de los últimos `days` días (tabla daily): corridas, total de
+    facturas del día (el mayor visto), pendientes máximos y los de la última corrida.
+    """
+    today = today or datetime.now(BOGOTA).date()
+    desde = (today - timedelta(days=days - 1)).isoformat()
+    conn = connect(db_path)
+    try:
+        if tenants is None:
+            rows = conn.execute(
+                "SELECT * FROM daily WHERE day >= ? ORDER BY tenant, day", (desde,)
+            ).fetchall()
+            return [dict(row) for row in rows]
+        result = []
+        for tenant in tenants:
+            rows = conn.execute(
+                "SELECT * FROM daily WHERE tenant = ? AND day >= ? ORDER BY day", (tenant, desde)
+            ).fetchall()
+            result.extend(dict(row) for row in rows)
+        return result
+    finally:
+        conn.close()
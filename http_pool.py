@@ -0,0 +1,57 @@
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Dict
+
+from resilience import ResilientSession
+from tenants import TENANTS
+
+# Hosts de GoPass de los centros del registro (tenants.toml), sin repetir
+GOPASS_HOSTS = list(dict.fromkeys(tenant.host for tenant in TENANTS))
+
+# Un pool por host (pool_connections) y hasta POOL_MAXSIZE conexiones keep-alive por host
+POOL_CONNECTIONS = max(8, len(GOPASS_HOSTS))
+POOL_MAXSIZE = 10
+
+# Adaptador compartido por todo el proceso: las sesiones de cada scraper mantienen
+# sus propios headers (token Bearer) pero reutilizan las mismas conexiones TCP/TLS.
+_SHARED_ADAPTER = HTTPAdapter(
+    pool_connections=POOL_CONNECTIONS,
+    pool_maxsize=POOL_MAXSIZE,
+    pool_block=False,
+)
+
+
+def new_session() -> requests.Session:
+    """
+    Crea una sesión nueva montada sobre el pool de conexiones compartido.
+    Cada scraper obtiene su propia sesión (headers independientes), pero
+    DNS/TLS se pagan una sola vez por host en todo el proceso.
+    Cada envío queda registrado en request_metrics.METRICS y pasa por la capa de
+    resiliencia (deadline, reintentos, hedging y circuit breaker por centro).
+    """
+    session = ResilientSession()
+    session.headers.update({"Connection": "keep-alive"})
+    session.mount("https://", _SHARED_ADAPTER)
+    session.mount("http://", _SHARED_ADAPTER)
+    return session
+
+
+def prewarm(hosts: Iterable[str] = GOPASS_HOSTS, timeout: float = 5) -> Dict[str, bool]:
+    """
+    Abre una conexión a cada host en paralelo para dejarla viva en el pool.
+    Devuelve {host: True/False} según si el host respondió (cualquier status sirve).
+    """
+    hosts = list(hosts)
+    if not hosts:
+        return {}
+
+    def _touch(host):
+        try:
+            new_session().head(host, timeout=timeout, allow_redirects=False)
+            return host, True
+        except Exception:
+            return host, False
+
+    with ThreadPoolExecutor(max_workers=min(16, len(hosts))) as executor:
+        return dict(executor.map(_touch, hosts))
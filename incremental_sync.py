@@ -0,0 +1,149 @@
+import os
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from invoices import INVOICE_FIELDS, count_invoices, iter_invoices
+
+# Archivo SQLite local con el estado del día por centro comercial
+DB_PATH = os.environ.get("FACTURAS_SYNC_DB", "facturas_sync.db")
+
+# Los transdate se comparan como hora de Bogotá sin zona ("YYYY-MM-DD HH:MM:SS")
+BOGOTA = timezone(timedelta(hours=-5))
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS watermarks (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    transdate TEXT,
+    idinvoice,
+    faltantes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant, day)
+);
+CREATE TABLE IF NOT EXISTS invoices (
+    tenant TEXT NOT NULL,
+    day TEXT NOT NULL,
+    {", ".join(INVOICE_FIELDS)},
+    PRIMARY KEY (tenant, day, idinvoice)
+);
+"""
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Abre (y crea si hace falta) la base de sincronización."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_SCHEMA)
+    # Bases creadas antes de la columna faltantes
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(watermarks)")}
+    if "faltantes" not in columns:
+        with conn:
+            conn.execute("ALTER TABLE watermarks ADD COLUMN faltantes INTEGER NOT NULL DEFAULT 0")
+    return conn
+
+
+def get_watermark(conn: sqlite3.Connection, tenant: str, day: date) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        "SELECT transdate, idinvoice, faltantes FROM watermarks WHERE tenant = ? AND day = ?",
+        (tenant, day.isoformat()),
+    ).fetchone()
+    if not row or not row["transdate"]:
+        return None
+    return {**dict(row), "transdate": normalize_transdate(row["transdate"])}
+
+
+def normalize_transdate(value: Any) -> Optional[str]:
+    """
+    transdate como "YYYY-MM-DD HH:MM:SS" en hora de Bogotá, para que la marca de agua ordene
+    igual sin importar el formato del centro ("T" o espacio, con o sin zona o fracciones).
+    Si no se puede interpretar se devuelve el texto tal cual.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return text
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(BOGOTA).replace(tzinfo=None)
+    return parsed.replace(microsecond=0).isoformat(sep=" ")
+
+
+def _local_count(conn: sqlite3.Connection, tenant: str, day: date) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM invoices WHERE tenant = ? AND day = ?", (tenant, day.isoformat())
+    ).fetchone()[0]
+
+
+def _merge(conn, session, tenant, api_base, day, since, latest, select):
+    """Inserta las filas desde `since` (None = el día completo); devuelve (nuevas, marca más reciente)."""
+    nuevas = 0
+    columns = ", ".join(["tenant", "day"] + INVOICE_FIELDS)
+    placeholders = ", ".join("?" for _ in range(len(INVOICE_FIELDS) + 2))
+    for row in iter_invoices(session, api_base, day, since=since, select=select):
+        if row.get("idinvoice") is None:
+            continue
+        cur = conn.execute(
+            f"INSERT OR IGNORE INTO invoices ({columns}) VALUES ({placeholders})",
+            [tenant, day.isoformat()] + [row.get(field) for field in INVOICE_FIELDS],
+        )
+        nuevas += cur.rowcount
+        transdate = normalize_transdate(row.get("fecha_factura"))
+        if transdate and (latest is None or transdate >= latest["transdate"]):
+            latest = {"transdate": transdate, "idinvoice": row.get("idinvoice")}
+    return nuevas, latest
+
+
+def sync_invoices(session, tenant: str, api_base: str, day: date, db_path: str = DB_PATH,
+                  select: Optional[str] = None, count_select: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Sincroniza las facturas del día de forma incremental.
+    La primera vez descarga el día completo; las siguientes solo pide
+    t.transdate >= marca de agua (vía additionalQuery) y fusiona las filas nuevas
+    en el estado local. Después compara con el totalItems del día (count_invoices): si la API
+    tiene más facturas que la base de las que ya faltaban en la última descarga completa
+    (p. ej. facturas emitidas tarde con un transdate anterior a la marca), se vuelve a
+    descargar el día completo. Las filas sin idinvoice no se guardan: quedan en `faltantes`
+    y no fuerzan otra descarga completa.
+    Devuelve el mismo formato que get_invoices (total_facturas es el totalItems de la API, o
+    el conteo local si el conteo falla) más "nuevas" y "locales" (facturas en la base).
+    """
+    conn = connect(db_path)
+    try:
+        watermark = get_watermark(conn, tenant, day)
+        faltantes = watermark["faltantes"] if watermark else 0
+        with conn:
+            since = watermark["transdate"] if watermark else None
+            nuevas, latest = _merge(conn, session, tenant, api_base, day, since, watermark, select)
+            locales = _local_count(conn, tenant, day)
+            total = count_invoices(session, api_base, day, select=count_select)
+            completo = since is None
+            if total is not None and not completo and total - locales > faltantes:
+                agregadas, latest = _merge(conn, session, tenant, api_base, day, None, latest, select)
+                nuevas += agregadas
+                locales = _local_count(conn, tenant, day)
+                completo = True
+            if total is not None:
+                brecha = max(0, total - locales)
+                faltantes = brecha if completo else min(faltantes, brecha)
+
+            if latest:
+                conn.execute(
+                    "INSERT OR REPLACE INTO watermarks (tenant, day, transdate, idinvoice, faltantes) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (tenant, day.isoformat(), latest["transdate"], latest["idinvoice"], faltantes),
+                )
+
+        factura_reciente = {}
+        if latest:
+            row = conn.execute(
+                "SELECT * FROM invoices WHERE tenant = ? AND day = ? AND idinvoice = ?",
+                (tenant, day.isoformat(), latest["idinvoice"]),
+            ).fetchone()
+            if row:
+                factura_reciente = {field: row[field] for field in INVOICE_FIELDS}
+        return {"total_facturas": locales if total is None else total, "factura_reciente": factura_reciente,
+                "nuevas": nuevas, "locales": locales}
+    finally:
+        conn.close()
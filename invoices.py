@@ -0,0 +1,222 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from columnar import ColumnarTable, TableBuilder, INVOICE_SCHEMA
+from decoders import GETCUSTOM, GETCUSTOM_COUNT
+from request_metrics import METRICS
+
+# pyarrow es opcional: solo se usa para exportar a Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pq = None
+
+# Tamaño de página por defecto al recorrer un día completo
+PAGE_SIZE = 500
+
+# Campos normalizados que espera app.py
+INVOICE_FIELDS = [
+    "idinvoice",
+    "idtransaction",
+    "idtransparking",
+    "fecha_factura",
+    "valor_neto_factura",
+    "valor_factura",
+    "nombretercero",
+    "outdate",
+    "invoicestatus",
+    "cufe",
+    "id_unico",
+]
+
+
+def invoice_select(fields: Optional[Dict[str, Tuple[str, ...]]]) -> Optional[str]:
+    """
+    $select de getcustom para un centro a partir de su invoice_fields (tenants.toml):
+    {columna de INVOICE_SCHEMA: (campo de su motor, ...)}. Los nombres de campo cambian
+    según el motor de GoPass (valorneto/netvalue, tercero/nombretercero...), así que sin
+    esa declaración no se manda $select y la API devuelve la fila completa.
+    Las columnas no declaradas se piden con su primer nombre en INVOICE_SCHEMA.
+    """
+    if not fields:
+        return None
+    columns = {column.name: column for column in INVOICE_SCHEMA}
+    for name, sources in fields.items():
+        if name not in columns:
+            raise ValueError(f"invoice_fields: columna desconocida {name!r} (opciones: {', '.join(columns)})")
+        desconocidos = [source for source in sources if source not in columns[name].sources]
+        if desconocidos:
+            # normalize_invoice y columnar solo leen los alias de INVOICE_SCHEMA
+            raise ValueError(f"invoice_fields: {name} = {desconocidos} no es un alias de INVOICE_SCHEMA "
+                             f"({', '.join(columns[name].sources)})")
+    select = []
+    for column in INVOICE_SCHEMA:
+        select.extend(fields.get(column.name, column.sources[:1]))
+    return ",".join(dict.fromkeys(select))
+
+
+def count_select(fields: Optional[Dict[str, Tuple[str, ...]]]) -> Optional[str]:
+    """Columna mínima para los conteos: el idinvoice declarado del centro (o ninguna)."""
+    if not fields:
+        return None
+    return fields.get("idinvoice", ("idinvoice",))[0]
+
+
+def invoices_url(api_base: str, start_date: date, end_date: Optional[date] = None,
+                 top: int = 10, skip: int = 0, select: Optional[str] = None,
+                 since: Optional[str] = None) -> str:
+    """
+    Construye la URL de trns_transparking/getcustom para un día (o un rango de días).
+    `api_base` es la raíz de la API, p. ej. "https://facturaandino.gopass.com.co/api".
+    `select` restringe las columnas devueltas ($select).
+    `since` (un transdate ya visto) limita la consulta a facturas desde esa marca.
+    """
+    end_date = end_date or start_date
+    start = f"{start_date.strftime('%Y-%m-%d')} 00:00:00 -5:00"
+    end = f"{end_date.strftime('%Y-%m-%d')} 23:59:59 -5:00"
+    if since:
+        # >= y no >: facturas con el mismo transdate que la marca se deduplican por idinvoice
+        query = f"t.transdate >= '{since}' and t.transdate <= '{end}'"
+    else:
+        query = f"t.transdate between '{start}' and '{end}'"
+    encoded = quote(query, safe="")
+    select_param = f"&$select={select}" if select else ""
+    return (
+        f"{api_base}/trns_transparking/getcustom"
+        f"?$top={top}&$skip={skip}{select_param}&additionalQuery={encoded}&headers=false"
+    )
+
+
+def normalize_invoice(f: Dict[str, Any]) -> Dict[str, Any]:
+    """Normaliza una fila de getcustom a los nombres de campo que usa app.py."""
+    return {
+        "idinvoice": f.get("idinvoice") or f.get("id"),
+        "idtransaction": f.get("idtransaction"),
+        "idtransparking": f.get("idtransparking"),
+        # transdate o fecha_factura dependiendo del payload
+        "fecha_factura": f.get("transdate") or f.get("fecha_factura") or f.get("transdateformat"),
+        # valores numéricos/strings en distintos keys según el motor
+        "valor_neto_factura": f.get("valorneto") or f.get("valor_neto_factura") or f.get("netvalue"),
+        "valor_factura": f.get("valortotal") or f.get("valor_factura") or f.get("totalvalue"),
+        "nombretercero": f.get("tercero") or f.get("nombretercero") or f.get("name"),
+        "outdate": f.get("outdate"),
+        "invoicestatus": f.get("invoicestatus"),
+        "cufe": f.get("cufe"),
+        # id_unico puede no venir; fallback a idinvoice
+        "id_unico": f.get("id_unico") or f.get("idinvoice") or f.get("id"),
+    }
+
+
+def count_invoices(session, api_base: str, day: date, timeout: float = 20,
+                   end_date: Optional[date] = None, select: Optional[str] = None) -> Optional[int]:
+    """
+    Devuelve solo data.totalItems de getcustom para el día (o el rango day..end_date),
+    pidiendo lo mínimo que permite la API ($top=1 y, si el centro la declara, una sola
+    columna; ver count_select). None si la consulta falla.
+    """
+    try:
+        r = session.get(invoices_url(api_base, day, end_date, top=1, select=select), timeout=timeout)
+        if r.status_code != 200:
+            return None
+        METRICS.record_payload(r.url, "count", len(r.content))
+        total, _ = GETCUSTOM_COUNT.decode_response(r)
+        return total
+    except Exception:
+        return None
+
+
+def iter_invoice_pages(session, api_base: str, start_date: date, end_date: Optional[date] = None,
+                       page_size: int = PAGE_SIZE, timeout: float = 20,
+                       since: Optional[str] = None, select: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre todas las páginas ($skip) de getcustom para el día/rango indicado y
+    entrega las filas crudas de cada página. La siguiente página se descarga en
+    segundo plano mientras se consume la actual, así que la memoria se mantiene
+    en una o dos páginas sin importar el tamaño del día.
+    Se avanza por las filas recibidas y no por page_size: si el servidor limita $top,
+    las páginas llegan más cortas sin saltarse filas; se termina con una página vacía
+    o al llegar a totalItems.
+    `select` es el $select del centro (invoice_select); None pide la fila completa.
+    """
+    def fetch(skip):
+        url = invoices_url(api_base, start_date, end_date, top=page_size, skip=skip,
+                           select=select, since=since)
+        r = session.get(url, timeout=timeout)
+        r.raise_for_status()
+        return GETCUSTOM.decode_response(r)
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        skip = 0
+        pending = executor.submit(fetch, skip)
+        while pending is not None:
+            total, rows = pending.result()
+            skip += len(rows)
+            # Prefetch de la siguiente página antes de entregar la actual
+            if rows and skip < total:
+                pending = executor.submit(fetch, skip)
+            else:
+                pending = None
+            yield rows
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_invoices(session, api_base: str, start_date: date, end_date: Optional[date] = None,
+                  page_size: int = PAGE_SIZE, timeout: float = 20,
+                  since: Optional[str] = None, select: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Como iter_invoice_pages, pero entrega filas normalizadas una a una."""
+    for rows in iter_invoice_pages(session, api_base, start_date, end_date, page_size, timeout, since, select):
+        for row in rows:
+            yield normalize_invoice(row)
+
+
+def invoices_table(session, api_base: str, start_date: date, end_date: Optional[date] = None,
+                   page_size: int = PAGE_SIZE, timeout: float = 20,
+                   select: Optional[str] = None) -> ColumnarTable:
+    """
+    Todas las facturas del día/rango en una ColumnarTable (INVOICE_SCHEMA), llenada
+    directo desde las filas JSON de cada página, sin pasar por dicts normalizados.
+    """
+    builder = TableBuilder(INVOICE_SCHEMA)
+    for rows in iter_invoice_pages(session, api_base, start_date, end_date, page_size, timeout, select=select):
+        builder.extend(rows)
+    return builder.build()
+
+
+def export_csv(rows: Iterable[Dict[str, Any]], path: str) -> int:
+    """Escribe las filas normalizadas a CSV en streaming. Devuelve el número de filas."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=INVOICE_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def export_parquet(rows: Iterable[Dict[str, Any]], path: str, batch_size: int = PAGE_SIZE) -> int:
+    """Escribe las filas normalizadas a Parquet por lotes (requiere pyarrow)."""
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado; usa export_csv")
+
+    schema = pa.schema([(field, pa.string()) for field in INVOICE_FIELDS])
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append({k: None if row.get(k) is None else str(row.get(k)) for k in INVOICE_FIELDS})
+            if len(batch) >= batch_size:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
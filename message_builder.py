@@ -0,0 +1,85 @@
+import pandas as pd
+
+from tenants import TENANTS, role_keys
+
+# Nombre de cada centro en el mensaje, en el orden del registro (tenants.toml)
+MOTORES = {tenant.name: tenant.motor for tenant in TENANTS}
+
+
+def format_fecha(fecha):
+    """Convierte la fecha a formato dd/mm/yyyy HH:MM"""
+    try:
+        return pd.to_datetime(fecha).strftime("%d/%m/%Y %H:%M")
+    except:
+        return str(fecha)
+
+
+def first_value(value, columns, default=None):
+    """Valor de la primera fila en la primera de `columns` que exista (DataFrame o lista de dicts)."""
+    if isinstance(value, pd.DataFrame):
+        if value.empty:
+            return default
+        for column in columns:
+            if column in value.columns:
+                return value.iloc[0][column]
+    elif isinstance(value, list) and len(value) > 0 and isinstance(value[0], dict):
+        for column in columns:
+            if column in value[0]:
+                return value[0][column]
+    return default
+
+
+def build_whatsapp_message(states, powerbi_data):
+    """
+    Arma el mensaje de WhatsApp a partir del estado de cada motor
+    ({"ok", "data", "jobs", "invoices"} por nombre) y los datos de Power BI.
+    """
+    mensaje = (
+        "Buen día, se realiza informe de facturación electrónica, al momento no contamos con facturación pendiente.\n\n"
+        "Se realiza de igual forma revisión de motores FE:\n\n"
+    )
+    for name, display_name in MOTORES.items():
+        state = states.get(name)
+        if state and state["ok"]:
+            # Columnas según los roles del centro en el registro
+            pendientes = first_value(state["data"], role_keys(name, "pending_count"), 0) or 0
+
+            # Facturas hoy
+            total_hoy = state["invoices"]["total_facturas"] if state["invoices"] else 0
+
+            # Fecha jobs
+            fecha_jobs = "Sin fecha"
+            fecha = first_value(state["jobs"], role_keys(name, "job_date"))
+            if fecha is not None:
+                fecha_jobs = format_fecha(fecha)
+
+            mensaje += (
+                f"* {display_name} {'con ' + str(pendientes) + ' facturas pendientes' if int(pendientes) else 'sin facturas pendientes'}, "
+                f"con {total_hoy} facturas del día de hoy, con sus Jobs actualizados ({fecha_jobs})\n\n"
+            )
+
+    # Añadir los datos de Power BI al mensaje
+    mensaje += f"\nFacturas sin CUFE: (BI actualizado: {powerbi_data['fecha_analizada']})\n\nParqueaderos: {powerbi_data['parqueaderos']:,}\nPeajes: {powerbi_data['peajes']:,}"
+
+    # Añadir los servicios al mensaje
+    if powerbi_data.get('servicios'):
+        mensaje += f"\n\nTransacciones Sin Factura por servicio: (BI actualizado: {powerbi_data['fecha_analizada']})\n\n"
+
+        # Calcular total de servicios
+        total_servicios = 0
+        for servicio, cantidad in powerbi_data['servicios'].items():
+            try:
+                total_servicios += int(cantidad.replace(',', ''))
+            except:
+                pass
+
+            mensaje += f"{servicio}: {cantidad}\n"
+
+    # Añadir la tabla de consumo de consecutivos al mensaje
+    if powerbi_data.get('tabla_asociados'):
+        mensaje += f"\n\nSe realiza revisión de consumo de consecutivos:\n\n"
+
+        for item in powerbi_data['tabla_asociados']:
+            mensaje += f"Asociado {item['asociado']}, {item['peaje']} al {item['porcentaje']}\n"
+
+    return mensaje
@@ -0,0 +1,67 @@
+"""
+Tabla paginada para las pestañas de los centros.
+
+Solo se pide a la API la página visible ($top/$skip), y solo si no sale de las filas ya
+scrapeadas (ver scrape_results.fetch_page); solo esa página se dibuja, con
+st.dataframe (grilla virtualizada) en vez de st.table (HTML estático con todas las filas).
+El orden se resuelve en el servidor con $orderby; la búsqueda también cuando el centro
+declara pending_search en tenants.toml, y si no, filtra la página visible.
+"""
+import math
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+import streamlit as st
+
+# Opciones de filas por página; 10 coincide con el $top del scraping general
+PAGE_SIZES = (10, 25, 50, 100)
+ROW_HEIGHT = 35
+
+# fetch(top, skip, sort, search) -> (total, filas)
+FetchPage = Callable[[int, int, Optional[Tuple[str, bool]], Optional[str]], Tuple[int, List[dict]]]
+
+
+def paged_table(key: str, fetch: FetchPage, columns: Sequence[str], searchable: bool = False,
+                server_search: bool = False, empty_message: str = "⚠️ Sin datos") -> int:
+    """
+    Dibuja controles (orden, búsqueda, filas por página, página) y la página actual.
+    Cada widget usa `key` como prefijo, así que varias tablas conviven en la misma app.
+    Devuelve el total de filas que informa la API.
+    """
+    controles = st.columns([3, 1, 3, 2, 2]) if searchable else st.columns([3, 1, 2, 2])
+    orden = controles[0].selectbox("Ordenar por", ["(por defecto)", *columns], key=f"{key}_sort")
+    descendente = controles[1].toggle("Desc", key=f"{key}_desc")
+    search = None
+    if searchable:
+        search = controles[2].text_input("Buscar", key=f"{key}_search").strip() or None
+    page_size = controles[-2].selectbox("Filas", PAGE_SIZES, key=f"{key}_size")
+
+    sort = None if orden == "(por defecto)" else (orden, descendente)
+    # La página elegida se conserva entre reruns; se vuelve a la primera si cambia la consulta
+    consulta = (sort, search, page_size)
+    if st.session_state.get(f"{key}_query") != consulta:
+        st.session_state[f"{key}_query"] = consulta
+        st.session_state[f"{key}_page"] = 1
+    page = st.session_state.get(f"{key}_page", 1)
+
+    server_filter = search if server_search else None
+    total, rows = fetch(page_size, (page - 1) * page_size, sort, server_filter)
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        # La lista se achicó desde la última vez: se muestra la última página
+        page = st.session_state[f"{key}_page"] = pages
+        total, rows = fetch(page_size, (page - 1) * page_size, sort, server_filter)
+    controles[-1].number_input("Página", min_value=1, max_value=pages, step=1, key=f"{key}_page")
+
+    if search and not server_search:
+        texto = search.lower()
+        rows = [row for row in rows if any(texto in str(value).lower() for value in row.values())]
+
+    if not rows:
+        st.warning(empty_message)
+        return total
+    frame = pd.DataFrame(rows, columns=list(columns))
+    st.dataframe(frame, hide_index=True, use_container_width=True,
+                 height=ROW_HEIGHT * (len(frame) + 1) + 3)
+    st.caption(f"{total:,} filas · página {page} de {pages}")
+    return total
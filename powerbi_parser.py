@@ -0,0 +1,203 @@
+"""
+Parser del texto visible del reporte de Power BI (sin dependencias de Streamlit ni Selenium).
+
+Tokeniza las líneas una sola vez (minúsculas, número y porcentaje por línea con
+patrones precompilados) y luego resuelve tarjetas, fecha y tabla de asociados
+recorriendo esas listas en tiempo lineal. Los duplicados se descartan con sets.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+ASOCIADOS_CONOCIDOS = [
+    'UNION VIAL RIO PAMPLONITA',
+    'PACIFICO TRES',
+    'VIA 40 EXPRESS',
+    'AUTOPISTA MAGDALENA MEDIO',
+    'AUTOPISTAS DEL CAFÉ',
+    'AUTOPISTA VILLAVICENCIO YOPAL',
+    'RUTA DEL SOL',
+    'AUTOPISTA ALTO DE VINAS',
+    'AUTOPISTA CONCESION LA GUAJIRA'
+]
+
+ENCABEZADOS = {'ASOCIADO', 'PEAJE', 'PORCENTAJE', 'CONSECUTIVO'}
+TABLA_KEYWORDS = ('asociado', 'peaje', 'porcentaje', 'consecutivo', 'consumo')
+NO_ASOCIADO_KEYWORDS = ('peaje', 'porcentaje', 'scroll', 'select', 'row')
+NO_ASOCIADO_FALLBACK_KEYWORDS = ('peaje', 'porcentaje', 'scroll')
+
+# Una línea con palabra clave abre una ventana de [-2, +20) líneas donde buscar filas
+VENTANA_ANTES = 2
+VENTANA_DESPUES = 20
+# Líneas siguientes a "Parqueaderos"/"Peajes" donde puede aparecer el número
+LINEAS_VALOR = 5
+
+# Multi-patrón: todos los asociados conocidos en una sola alternancia
+ASOCIADOS_RE = re.compile("|".join(re.escape(a) for a in ASOCIADOS_CONOCIDOS))
+NUMERO_COMAS_RE = re.compile(r'\b\d{1,3}(?:,\d{3})+\b')
+NUMERO_RE = re.compile(r'\b\d+\b')
+PORCENTAJE_RE = re.compile(r'(\d{1,3})%')
+PORCENTAJE_INICIO_RE = re.compile(r'\d{1,3}%')
+FECHA_RE = re.compile(r'\b(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/(202[4-9])\b')
+PARQUEADEROS_RE = re.compile(r'[Pp]arqueaderos[^\d]*(\d{1,3}(?:,\d{3})*)')
+PEAJES_RE = re.compile(r'[Pp]eajes[^\d]*(\d{1,3}(?:,\d{3})*)')
+
+
+def extract_number_from_text(text):
+    """Extrae un número del texto, manejando formatos con comas"""
+    try:
+        # Buscar números con comas (formato: 1,234 o 12,345)
+        match = NUMERO_COMAS_RE.search(text)
+        if match:
+            return match.group(0)
+
+        # Buscar números simples
+        match = NUMERO_RE.search(text)
+        if match:
+            return match.group(0)
+
+        return None
+    except Exception:
+        return None
+
+
+def limpiar_tabla_asociados(tabla_asociados):
+    """Limpia y ordena la tabla de asociados, eliminando encabezados y duplicados"""
+    if not tabla_asociados:
+        return []
+
+    elementos_limpios = []
+    vistos = set()
+    for item in tabla_asociados:
+        asociado = item.get('asociado', '')
+        peaje = item.get('peaje', '')
+        porcentaje = item.get('porcentaje', '')
+
+        # Eliminar elementos que sean claramente encabezados
+        if asociado.upper() in ENCABEZADOS or peaje.upper() in ENCABEZADOS:
+            continue
+
+        # Verificar que tengamos datos válidos y que no sea duplicado
+        if (asociado and len(asociado) > 3 and
+                peaje and 'peaje' in peaje.lower() and
+                porcentaje and PORCENTAJE_INICIO_RE.match(porcentaje) and
+                (asociado, peaje) not in vistos):
+            vistos.add((asociado, peaje))
+            elementos_limpios.append(item)
+
+    return elementos_limpios
+
+
+def _formatear_fecha(match) -> str:
+    mes, dia, año = match.groups()
+    return f"{int(dia):02d}/{int(mes):02d}/{año}"
+
+
+def _valor_tras_clave(clave: str, lower: List[str], numeros: List[Optional[str]]) -> Optional[str]:
+    """Número en la primera línea con `clave` (o en las LINEAS_VALOR siguientes) que tenga uno."""
+    n = len(lower)
+    for i in range(n):
+        if clave in lower[i]:
+            for j in range(i, min(n, i + LINEAS_VALOR + 1)):
+                if numeros[j]:
+                    return numeros[j]
+    return None
+
+
+def parse_page_text(page_text: str) -> Tuple[Optional[str], Optional[str], Optional[str], Dict[str, Any], List[Dict[str, str]]]:
+    """
+    Devuelve (parqueaderos, peajes, fecha_analizada, servicios, tabla_asociados)
+    a partir del texto visible del reporte. Los valores no encontrados quedan en None.
+    """
+    # Tokenizar una sola vez
+    lines = [line.strip() for line in page_text.split('\n') if line.strip()]
+    n = len(lines)
+    lower = [line.lower() for line in lines]
+    numeros = [extract_number_from_text(line) for line in lines]
+    porcentajes = []
+    for line in lines:
+        match = PORCENTAJE_RE.search(line)
+        valor = int(match.group(1)) if match else None
+        porcentajes.append(valor if valor is not None and 1 <= valor <= 100 else None)
+    es_peaje = ['peaje' in line for line in lower]
+
+    # Tarjetas y fecha
+    parqueaderos = _valor_tras_clave('parqueaderos', lower, numeros)
+    peajes = _valor_tras_clave('peajes', lower, numeros)
+    fecha_analizada = None
+    for line in lines:
+        match = FECHA_RE.search(line)
+        if match:
+            fecha_analizada = _formatear_fecha(match)
+            break
+
+    # Tabla de asociados: unión de las ventanas alrededor de cada línea con palabra clave
+    # (arreglo de diferencias para marcar qué posiciones cubre alguna ventana)
+    cobertura = [0] * (n + 1)
+    for k in range(n):
+        if any(keyword in lower[k] for keyword in TABLA_KEYWORDS):
+            inicio = max(0, k - VENTANA_ANTES)
+            fin = min(n, k + VENTANA_DESPUES) - 2
+            if inicio < fin:
+                cobertura[inicio] += 1
+                cobertura[fin] -= 1
+
+    tabla_asociados = []
+    vistos = set()
+
+    def agregar(asociado, peaje, porcentaje_val):
+        if (asociado, peaje) in vistos:
+            return False
+        vistos.add((asociado, peaje))
+        tabla_asociados.append({
+            "asociado": asociado,
+            "peaje": peaje,
+            "porcentaje": f"{porcentaje_val}%"
+        })
+        return True
+
+    activo = 0
+    saltar_hasta = 0
+    for i in range(n):
+        activo += cobertura[i]
+        if activo <= 0 or i < saltar_hasta or i + 2 >= n:
+            continue
+        porcentaje_val = porcentajes[i + 2]
+        if porcentaje_val is None or not es_peaje[i + 1]:
+            continue
+        line1 = lines[i]
+        # PATRÓN 1: asociado conocido + peaje + porcentaje
+        # PATRÓN 2: texto largo (posible asociado) + peaje + porcentaje
+        if ASOCIADOS_RE.search(line1) or (
+            len(line1) > 8 and not any(keyword in lower[i] for keyword in NO_ASOCIADO_KEYWORDS)
+        ):
+            if agregar(line1, lines[i + 1], porcentaje_val):
+                saltar_hasta = i + 3  # Saltar las 3 líneas procesadas
+
+    # Si aún no encontramos suficientes, reconstruir desde cada porcentaje hacia atrás
+    if len(tabla_asociados) < 4:
+        for i in range(2, n):
+            porcentaje_val = porcentajes[i]
+            if porcentaje_val is None or not es_peaje[i - 1]:
+                continue
+            asociado = lines[i - 2]
+            if len(asociado) < 5 or any(keyword in lower[i - 2] for keyword in NO_ASOCIADO_FALLBACK_KEYWORDS):
+                continue
+            agregar(asociado, lines[i - 1], porcentaje_val)
+
+    # Búsqueda por patrones regex en todo el texto como fallback
+    if parqueaderos is None:
+        match = PARQUEADEROS_RE.search(page_text)
+        if match:
+            parqueaderos = match.group(1)
+
+    if peajes is None:
+        match = PEAJES_RE.search(page_text)
+        if match:
+            peajes = match.group(1)
+
+    if fecha_analizada is None:
+        match = FECHA_RE.search(page_text)
+        if match:
+            fecha_analizada = _formatear_fecha(match)
+
+    return parqueaderos, peajes, fecha_analizada, {}, tabla_asociados
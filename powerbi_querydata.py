@@ -0,0 +1,239 @@
+"""
+Extracción de valores del reporte de Power BI a partir de sus propias respuestas
+`querydata` (capturadas desde los logs de rendimiento/red de Chrome), en vez del
+texto renderizado.
+
+Las respuestas vienen en formato DSR: cada resultado trae un `descriptor.Select`
+con los nombres de las columnas/medidas y filas comprimidas en `dsr.DS[].PH[].DMn`
+(con "C" = valores, "R" = bitmask de repetidos, "Ø" = bitmask de nulos y
+"ValueDicts" para columnas diccionarizadas).
+"""
+import json
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+QUERYDATA_MARKER = "querydata"
+
+
+# ===========================
+# CAPTURA (logs de rendimiento de Chrome)
+# ===========================
+
+class QueryDataTracker:
+    """
+    Se alimenta con lotes de driver.get_log("performance") (cada lectura vacía el buffer)
+    y devuelve los requestId de respuestas querydata que ya terminaron de cargar.
+    El estado se guarda entre lotes porque responseReceived y loadingFinished
+    pueden llegar en lecturas distintas.
+    """
+
+    def __init__(self):
+        self._candidates = set()
+        self._finished = set()
+        self._returned = set()
+
+    def feed(self, log_entries: Iterable[Dict[str, Any]]) -> List[str]:
+        for entry in log_entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params", {})
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if QUERYDATA_MARKER in url.lower():
+                    self._candidates.add(params.get("requestId"))
+            elif method == "Network.loadingFinished":
+                self._finished.add(params.get("requestId"))
+
+        ready = (self._candidates & self._finished) - self._returned
+        self._returned |= ready
+        return sorted(ready)
+
+
+# ===========================
+# DECODIFICACIÓN DSR
+# ===========================
+
+def _decode_dm(items: List[Dict[str, Any]], names: Dict[str, str],
+               value_dicts: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    schema: List[Dict[str, Any]] = []
+    prev: List[Any] = []
+    for item in items:
+        if "S" in item:
+            schema = item["S"]
+        if "C" in item:
+            cols = [col.get("N") for col in schema]
+            values = iter(item["C"])
+            repeat = item.get("R", 0)
+            nulls = item.get("Ø", 0)
+            raw = []
+            for i in range(len(cols)):
+                if repeat >> i & 1:
+                    raw.append(prev[i] if i < len(prev) else None)
+                elif nulls >> i & 1:
+                    raw.append(None)
+                else:
+                    raw.append(next(values, None))
+        else:
+            cols = [col.get("N") for col in schema] or [k for k in item if k != "S"]
+            raw = [item.get(col) for col in cols]
+        prev = raw
+
+        resolved = list(raw)
+        for i, col in enumerate(schema[:len(resolved)]):
+            dictionary = value_dicts.get(col.get("DN")) if col.get("DN") else None
+            if dictionary is not None and isinstance(resolved[i], int) and 0 <= resolved[i] < len(dictionary):
+                resolved[i] = dictionary[resolved[i]]
+        rows.append({names.get(col, col): value for col, value in zip(cols, resolved)})
+    return rows
+
+
+def decode_result(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Decodifica `result.data` de un querydata a una lista de filas {nombre: valor}."""
+    names = {
+        select.get("Value"): select.get("Name") or select.get("Value")
+        for select in data.get("descriptor", {}).get("Select", [])
+    }
+    rows = []
+    for ds in data.get("dsr", {}).get("DS", []):
+        value_dicts = ds.get("ValueDicts", {})
+        for ph in ds.get("PH", []):
+            for key, items in ph.items():
+                if key.startswith("DM") and isinstance(items, list):
+                    rows.extend(_decode_dm(items, names, value_dicts))
+    return rows
+
+
+def column_formats(data: Dict[str, Any]) -> Dict[str, str]:
+    """Formato de cada columna según `descriptor.Select` ("0%", "#,0"...), si la respuesta lo trae."""
+    return {
+        select.get("Name") or select.get("Value"): select["Format"]
+        for select in data.get("descriptor", {}).get("Select", [])
+        if select.get("Format")
+    }
+
+
+def decode_tables(body: Any) -> List[Tuple[List[Dict[str, Any]], Dict[str, str]]]:
+    """Como decode_response, pero cada tabla viene con los formatos de sus columnas."""
+    if isinstance(body, (str, bytes)):
+        body = json.loads(body)
+    tables = []
+    for result in body.get("results", []):
+        data = result.get("result", {}).get("data")
+        if data:
+            tables.append((decode_result(data), column_formats(data)))
+    return tables
+
+
+def decode_response(body: Any) -> List[List[Dict[str, Any]]]:
+    """Un cuerpo querydata puede traer varios resultados; devuelve una tabla por resultado."""
+    return [rows for rows, _ in decode_tables(body)]
+
+
+# ===========================
+# MAPEO A LOS VALORES DEL MENSAJE
+# ===========================
+
+def _short(name: str) -> str:
+    """'Sum(Tabla.Parqueaderos)' -> 'parqueaderos'"""
+    name = name or ""
+    match = re.search(r"\.([^.()]+)\)?$", name)
+    return (match.group(1) if match else name).strip().lower()
+
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(round(float(str(value).replace(",", ""))))
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_fecha(value: Any) -> Optional[str]:
+    if isinstance(value, (int, float)) and value > 10**11:  # epoch en milisegundos
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).strftime("%d/%m/%Y")
+    if isinstance(value, str):
+        for fmt in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%m/%d/%Y"):
+            try:
+                return datetime.strptime(value[:19], fmt).strftime("%d/%m/%Y")
+            except ValueError:
+                continue
+    return None
+
+
+def is_fraction_column(values: List[Any], fmt: Optional[str] = None) -> bool:
+    """
+    ¿La columna guarda los porcentajes como fracción (0.87 = 87%)? Con formato en el
+    descriptor, si el formato lleva "%". Sin él, si todos los valores son numéricos, ninguno
+    pasa de 1 y alguno tiene decimales: junto a 87 o 64, un 1 es 1% y no 100%.
+    """
+    if fmt:
+        return "%" in fmt
+    presentes = [value for value in values if value is not None]
+    numeros = [value for value in presentes if isinstance(value, (int, float)) and not isinstance(value, bool)]
+    if not numeros or len(numeros) != len(presentes):
+        return False
+    return max(abs(value) for value in numeros) <= 1 and any(not float(value).is_integer() for value in numeros)
+
+
+def _as_porcentaje(value: Any, fraction: bool = False) -> Optional[str]:
+    """'87%', 87 u (en una columna de fracciones) 0.87 -> '87%'."""
+    try:
+        number = float(str(value).replace("%", ""))
+    except (TypeError, ValueError):
+        return None
+    if fraction and number <= 1:
+        number *= 100
+    number = int(round(number))
+    return f"{number}%" if 1 <= number <= 100 else None
+
+
+def extract_powerbi_values(bodies: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Recorre las respuestas querydata y arma los mismos datos que el parser de texto:
+    parqueaderos, peajes, fecha_analizada y tabla_asociados. Lo que no se encuentre queda en None / [].
+    """
+    values = {"parqueaderos": None, "peajes": None, "fecha_analizada": None, "tabla_asociados": []}
+    vistos = set()
+
+    for body in bodies:
+        try:
+            tables = decode_tables(body)
+        except (ValueError, AttributeError):
+            continue
+        for rows, formats in tables:
+            if not rows:
+                continue
+            columns = {_short(name): name for name in rows[0]}
+
+            # Tarjetas: una sola fila con medidas
+            if len(rows) == 1:
+                for short, name in columns.items():
+                    value = rows[0][name]
+                    if "parqueadero" in short and values["parqueaderos"] is None:
+                        values["parqueaderos"] = _as_int(value)
+                    elif "peaje" in short and values["peajes"] is None and _as_int(value) is not None:
+                        values["peajes"] = _as_int(value)
+                    elif "fecha" in short and values["fecha_analizada"] is None:
+                        values["fecha_analizada"] = _as_fecha(value)
+
+            # Tabla de consumo de consecutivos: asociado + peaje + porcentaje
+            asociado_col = next((n for s, n in columns.items() if "asociado" in s), None)
+            peaje_col = next((n for s, n in columns.items() if "peaje" in s), None)
+            porcentaje_col = next((n for s, n in columns.items() if "porcentaje" in s or "%" in s), None)
+            if asociado_col and peaje_col and porcentaje_col:
+                # Se escala por 100 solo si la columna entera es de fracciones
+                fraction = is_fraction_column([row.get(porcentaje_col) for row in rows],
+                                              formats.get(porcentaje_col))
+                for row in rows:
+                    asociado, peaje = row.get(asociado_col), row.get(peaje_col)
+                    porcentaje = _as_porcentaje(row.get(porcentaje_col), fraction)
+                    if asociado and peaje and porcentaje and (asociado, peaje) not in vistos:
+                        vistos.add((asociado, peaje))
+                        values["tabla_asociados"].append(
+                            {"asociado": str(asociado), "peaje": str(peaje), "porcentaje": porcentaje}
+                        )
+    return values
@@ -0,0 +1,163 @@
+"""
+Extracción de los datos de Power BI para el mensaje de WhatsApp.
+
+app.py importa este módulo solo cuando hace falta (al arrancar el worker en segundo
+plano o al generar el mensaje), así los reruns de Streamlit no pagan estos imports.
+Selenium nunca se importa aquí: vive en el proceso del PowerBIWorker.
+La extracción corre en hilos sin contexto de Streamlit: los fallos se levantan como
+PowerBIError y app.py los muestra con st.error en el botón del mensaje.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+import readiness
+from driver_pool import PowerBIWorker
+from powerbi_querydata import extract_powerbi_values
+from powerbi_parser import parse_page_text, limpiar_tabla_asociados
+from result_cache import SingleFlightCache
+from run_log import log
+from scrape_results import SCRAPE_CACHE_TTL
+
+# Tiempo máximo esperando a que el reporte esté listo (POWERBI_DEADLINE en el entorno)
+POWERBI_DEADLINE_SECONDS = readiness.DEADLINE
+
+# "querydata" (respuestas del reporte, con respaldo en texto) o "text" (solo texto renderizado)
+POWERBI_EXTRACTION = os.environ.get("POWERBI_EXTRACTION", "querydata")
+
+# Segundos que se reutiliza una extracción exitosa (POWERBI_CACHE_TTL en el entorno); por
+# defecto los mismos que el scraping de los centros, para que el mensaje no mezcle cifras
+# de Power BI más viejas que las de los centros
+POWERBI_CACHE_TTL = float(os.environ.get("POWERBI_CACHE_TTL") or SCRAPE_CACHE_TTL)
+
+# Compartido por todas las sesiones: una sola extracción en vuelo a la vez
+POWERBI_CACHE = SingleFlightCache(POWERBI_CACHE_TTL)
+_prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="powerbi")
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+class PowerBIError(Exception):
+    """No se pudieron extraer los datos del reporte; el mensaje ya viene listo para mostrar."""
+
+
+def get_powerbi_worker():
+    """Proceso aparte con Chromium caliente; uno por servidor, app.py lo arranca en segundo plano"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = PowerBIWorker()
+        return _worker
+
+def find_parqueaderos_peajes_values(page_text):
+    """
+    Buscar los valores de Parqueaderos y Peajes en el texto visible del Power BI
+    Y también extraer la fecha analizada, los servicios y la tabla de asociados
+    """
+    try:
+        parqueaderos, peajes, fecha_analizada, servicios_data, tabla_asociados = parse_page_text(page_text)
+
+        if fecha_analizada is None:
+            fecha_analizada = datetime.now().strftime('%d/%m/%Y')
+
+        return parqueaderos, peajes, fecha_analizada, servicios_data, tabla_asociados
+
+    except Exception as e:
+        log(f"Error en find_parqueaderos_peajes_values: {e}")
+        return None, None, None, {}, []
+
+def get_powerbi_querydata(url):
+    """
+    Extrae los valores desde las respuestas querydata capturadas por el worker.
+    Devuelve None si no aparecen Parqueaderos y Peajes (se usa el parser de texto).
+    """
+    try:
+        bodies, metrics = get_powerbi_worker().query_responses(url, POWERBI_DEADLINE_SECONDS)
+    except Exception as e:
+        log(f"Power BI querydata: error capturando las respuestas: {e}")
+        return None
+
+    valores = extract_powerbi_values(bodies)
+    if valores["parqueaderos"] is None or valores["peajes"] is None:
+        log(f"Power BI querydata: {metrics['responses']} respuestas en {metrics['elapsed']}s sin "
+            f"Parqueaderos/Peajes, se usa el texto del reporte")
+        return None
+
+    return {
+        "parqueaderos": valores["parqueaderos"],
+        "peajes": valores["peajes"],
+        "fecha_analizada": valores["fecha_analizada"] or datetime.now().strftime('%d/%m/%Y'),
+        "servicios": {},
+        "tabla_asociados": limpiar_tabla_asociados(valores["tabla_asociados"])
+    }
+
+def get_powerbi_data():
+    """
+    Obtiene los datos de facturas sin CUFE del reporte de Power BI usando Selenium.
+    Levanta PowerBIError si no se pueden extraer. "extraido_at" es la hora de la extracción.
+    """
+    try:
+        POWERBI_URL = "https://app.powerbi.com/view?r=eyJrIjoiMjUyNTBjMTItOWZlNy00YTY2LWIzMTQtNmM3OGU4ZWM1ZmQxIiwidCI6ImY5MTdlZDFiLWI0MDMtNDljNS1iODBiLWJhYWUzY2UwMzc1YSJ9"
+        
+        # Modo rápido: decodificar las respuestas querydata del propio reporte
+        if POWERBI_EXTRACTION == "querydata":
+            powerbi_data = get_powerbi_querydata(POWERBI_URL)
+            if powerbi_data is not None:
+                return {**powerbi_data, "extraido_at": datetime.now()}
+
+        # Navegar al reporte con un driver caliente del worker y esperar a que cargue
+        try:
+            page_text, ready_metrics = get_powerbi_worker().page_text(POWERBI_URL, POWERBI_DEADLINE_SECONDS)
+        except Exception as e:
+            raise PowerBIError(f"No se pudo obtener el reporte con Selenium: {e}") from e
+
+        readiness.record(ready_metrics)
+
+        # Buscar los valores de Parqueaderos, Peajes, Fecha, Servicios y Tabla de Asociados
+        parqueaderos, peajes, fecha_analizada, servicios_data, tabla_asociados = find_parqueaderos_peajes_values(page_text)
+        
+        if parqueaderos is None:
+            raise PowerBIError("No se pudo encontrar el valor de Parqueaderos")
+        if peajes is None:
+            raise PowerBIError("No se pudo encontrar el valor de Peajes")
+        
+        # Limpiar la tabla de asociados
+        tabla_asociados_limpia = limpiar_tabla_asociados(tabla_asociados)
+        
+        # Convertir a enteros
+        try:
+            parqueaderos_num = int(parqueaderos.replace(',', ''))
+            peajes_num = int(peajes.replace(',', ''))
+            
+            return {
+                "parqueaderos": parqueaderos_num,
+                "peajes": peajes_num,
+                "fecha_analizada": fecha_analizada,
+                "servicios": servicios_data,
+                "tabla_asociados": tabla_asociados_limpia,
+                "extraido_at": datetime.now(),
+            }
+        except ValueError as e:
+            raise PowerBIError(f"Error convirtiendo valores a números: {e}") from e
+
+    except PowerBIError:
+        raise
+    except Exception as e:
+        raise PowerBIError(f"Error crítico al obtener datos de Power BI: {str(e)}") from e
+
+def get_powerbi_data_cached():
+    """
+    get_powerbi_data a través de POWERBI_CACHE: dentro del TTL devuelve la última extracción
+    exitosa y, si ya hay una en curso (p. ej. lanzada junto con el scraping), la espera.
+    Los fallos (PowerBIError) no se cachean: llegan a quien esperaba y la próxima llamada reintenta.
+    """
+    return POWERBI_CACHE.get_or_fetch("powerbi", get_powerbi_data)
+
+def prefetch_powerbi_data() -> Future:
+    """
+    Lanza get_powerbi_data_cached en segundo plano y devuelve su Future (no bloquea).
+    Si falla, la excepción queda en el Future para mostrarla desde la sesión que lo lanzó.
+    """
+    return _prefetch_executor.submit(get_powerbi_data_cached)
@@ -0,0 +1,79 @@
+"""
+Proyecciones declarativas de los endpoints de GoPass.
+
+Cada vista (una tabla del dashboard, un exportador) declara las columnas que usa y de
+qué campo(s) de la API sale cada una. De esa declaración salen el $select y el $orderby
+de la consulta, el decodificador (solo esos campos) y la proyección de las filas, así
+que lo que viaja por la red y se decodifica depende de lo que se muestra y no del
+esquema completo del endpoint.
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    from decoders import EndpointDecoder
+
+FieldSpec = Union[str, Sequence[str]]
+
+
+@lru_cache(maxsize=None)
+def _decoder(endpoint: str, fields: Tuple[str, ...]) -> "EndpointDecoder":
+    # Un decodificador por (endpoint, campos): las vistas y centros con el mismo mapeo lo comparten.
+    # Import local: decoders importa columnar, que importa first_alias de este módulo
+    from decoders import EndpointDecoder
+
+    return EndpointDecoder(endpoint, fields)
+
+
+def first_alias(row: Dict[str, Any], sources: Tuple[str, ...]) -> Any:
+    """
+    Valor de la primera llave de `sources` con valor "verdadero" (o el de la primera si
+    ninguna lo tiene). Mismo criterio que normalize_invoice; lo usan también las tablas
+    de columnar.
+    """
+    for key in sources:
+        value = row.get(key)
+        if value:
+            return value
+    return row.get(sources[0])
+
+
+class Projection:
+    """
+    Columnas de una vista sobre un endpoint: {columna: (campo, alias, ...)}.
+    `select` son los campos que se piden en $select (por defecto todos los de `fields`);
+    `orderby` se pasa tal cual a $orderby ("idjob asc").
+    """
+
+    def __init__(self, endpoint: str, fields: Dict[str, FieldSpec], orderby: Optional[str] = None,
+                 select: Optional[Sequence[str]] = None):
+        self.endpoint = endpoint
+        self.fields = {column: (sources,) if isinstance(sources, str) else tuple(sources)
+                       for column, sources in fields.items()}
+        self.orderby = orderby
+        self.sources = tuple(dict.fromkeys(source for sources in self.fields.values() for source in sources))
+        self.select = tuple(select) if select is not None else self.sources
+
+    @property
+    def decoder(self) -> "EndpointDecoder":
+        return _decoder(self.endpoint, self.sources)
+
+    def orderby_for(self, column: str, descending: bool = False) -> str:
+        """$orderby para ordenar la vista por una de sus columnas (por su campo en la API)."""
+        return f"{self.fields[column][0]} {'desc' if descending else 'asc'}"
+
+    def query(self, orderby: Optional[str] = None) -> str:
+        """Parámetros $select/$orderby para agregar a la URL (empiezan con "&")."""
+        params = f"&$select={','.join(self.select)}" if self.select else ""
+        orderby = orderby or self.orderby
+        if orderby:
+            params += f"&$orderby={quote(orderby)}"
+        return params
+
+    def project(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Filas de la API -> filas con las columnas de la vista, en su orden."""
+        return [{column: first_alias(row, sources) for column, sources in self.fields.items()} for row in rows]
+
+    def __repr__(self):
+        return f"Projection({self.endpoint!r}, select={','.join(self.select)!r})"
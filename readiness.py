@@ -0,0 +1,114 @@
+"""
+Detección de "reporte listo" para Power BI basada en señales concretas en vez de sleeps fijos.
+
+Señales (todas deben cumplirse a la vez):
+- visuals:  hay contenedores de visuales en el DOM
+- cards:    las tarjetas de Parqueaderos y Peajes ya muestran un número
+- network:  no hubo recursos de red nuevos durante QUIET_PERIOD segundos
+- stable:   el texto del body no cambió entre dos sondeos consecutivos
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from statistics import median
+from typing import Any, Dict, Optional
+
+DEADLINE = float(os.environ.get("POWERBI_DEADLINE", 45))
+POLL_INTERVAL = 0.5
+QUIET_PERIOD = 1.5
+
+_VISUALS_JS = (
+    "return document.querySelectorAll("
+    "'visual-container, .visual-container, .visualContainer, visual-container-modern').length;"
+)
+_RESOURCES_JS = "return performance.getEntriesByType('resource').length;"
+_BODY_TEXT_JS = "return document.body ? document.body.innerText : '';"
+
+_CARD_RES = [
+    re.compile(r"[Pp]arqueaderos[^\d]*\d"),
+    re.compile(r"[Pp]eajes[^\d]*\d"),
+]
+
+
+def cards_populated(text: str) -> bool:
+    return all(pattern.search(text) for pattern in _CARD_RES)
+
+
+def wait_until_ready(driver, deadline: float = DEADLINE, poll_interval: float = POLL_INTERVAL,
+                     quiet_period: float = QUIET_PERIOD) -> Dict[str, Any]:
+    """
+    Sondea el reporte hasta que todas las señales se cumplan o se agote `deadline`.
+    Devuelve métricas: {"ready", "elapsed", "signals": {señal: segundos hasta cumplirse}}.
+    """
+    start = time.monotonic()
+    signals: Dict[str, Optional[float]] = {"visuals": None, "cards": None, "network": None, "stable": None}
+    last_resources = -1
+    last_resource_change = start
+    last_text = None
+    text = ""
+
+    while True:
+        now = time.monotonic()
+        elapsed = now - start
+        try:
+            visuals = driver.execute_script(_VISUALS_JS) or 0
+            resources = driver.execute_script(_RESOURCES_JS) or 0
+            text = driver.execute_script(_BODY_TEXT_JS) or ""
+        except Exception:
+            visuals, resources, text = 0, last_resources, last_text or ""
+
+        if resources != last_resources:
+            last_resources = resources
+            last_resource_change = now
+
+        current = {
+            "visuals": visuals > 0,
+            "cards": cards_populated(text),
+            "network": now - last_resource_change >= quiet_period,
+            "stable": text != "" and text == last_text,
+        }
+        for name, ok in current.items():
+            if ok and signals[name] is None:
+                signals[name] = round(elapsed, 3)
+            elif not ok:
+                signals[name] = None
+        last_text = text
+
+        if all(current.values()):
+            return {"ready": True, "elapsed": round(elapsed, 3), "signals": signals}
+        if elapsed >= deadline:
+            return {"ready": False, "elapsed": round(elapsed, 3), "signals": signals}
+        time.sleep(poll_interval)
+
+
+# ===========================
+# MÉTRICAS
+# ===========================
+
+_metrics = deque(maxlen=200)
+_metrics_lock = threading.Lock()
+
+
+def record(metrics: Dict[str, Any]) -> None:
+    """Guarda las métricas de una espera para el resumen de tiempos."""
+    with _metrics_lock:
+        _metrics.append(metrics)
+
+
+def summary() -> Dict[str, Any]:
+    """Resumen de time-to-ready de las últimas esperas registradas."""
+    with _metrics_lock:
+        samples = list(_metrics)
+    if not samples:
+        return {"count": 0}
+    tiempos = sorted(m["elapsed"] for m in samples)
+    p95 = tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))]
+    return {
+        "count": len(samples),
+        "timeouts": sum(1 for m in samples if not m["ready"]),
+        "p50": median(tiempos),
+        "p95": p95,
+        "last": samples[-1],
+    }
@@ -0,0 +1,267 @@
+"""
+Métricas por solicitud HTTP de los scrapers: latencia, bytes, status, timeouts y
+respuestas que no se pudieron decodificar como JSON, agrupadas por (centro, endpoint).
+Para getcustom también el tamaño de la última consulta completa y de la de solo conteo,
+y con eso los bytes que ahorra cada poll de solo conteo.
+
+Los scrapers atrapan todas las excepciones y devuelven [] / {}, así que estas
+métricas son la única forma de ver qué centro o endpoint está lento o fallando.
+Se consultan con summary() (panel de diagnóstico) o en formato Prometheus con
+prometheus_text() / start_metrics_server().
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from statistics import median
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from tenants import TENANTS
+
+# Endpoint /metrics opcional: sin METRICS_PORT (app) o DAEMON_METRICS_PORT (daemon) en el
+# entorno queda apagado. Escucha en METRICS_HOST, por defecto solo en la máquina local.
+METRICS_PORT = int(os.environ.get("METRICS_PORT") or 0)
+DAEMON_METRICS_PORT = int(os.environ.get("DAEMON_METRICS_PORT") or 0)
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+# Puerto del daemon con `--metrics-port` sin número (distinto del habitual de la app, 9464)
+DAEMON_METRICS_DEFAULT_PORT = 9465
+
+# Límites (segundos) de los buckets del histograma de latencia
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+# Subdominio de GoPass -> centro comercial
+TENANT_BY_HOST = {tenant.hostname: tenant.name for tenant in TENANTS}
+
+
+def label_for(url: str):
+    """(centro, endpoint) de una URL: el host identifica el centro y el último segmento el endpoint."""
+    parsed = urlparse(url)
+    tenant = TENANT_BY_HOST.get(parsed.hostname or "", parsed.netloc or "desconocido")
+    endpoint = parsed.path.rstrip("/").rsplit("/", 1)[-1] or "/"
+    return tenant, endpoint
+
+
+class _Series:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.total_bytes = 0
+        self.statuses = defaultdict(int)
+        self.timeouts = 0
+        self.errors = 0
+        self.json_errors = 0
+        self.recent = deque(maxlen=200)
+        # Bytes de la última respuesta por tipo de consulta ("full", "count")
+        self.last_bytes = {}
+
+
+class RequestMetrics:
+    """Registro de métricas en memoria, seguro entre hilos, compartido por todo el proceso."""
+
+    def __init__(self):
+        self._series: Dict[tuple, _Series] = defaultdict(_Series)
+        self._lock = threading.Lock()
+
+    def observe(self, tenant: str, endpoint: str, elapsed: float, status: Optional[int] = None,
+                size: int = 0, timeout: bool = False, error: bool = False) -> None:
+        with self._lock:
+            series = self._series[(tenant, endpoint)]
+            series.count += 1
+            series.total_seconds += elapsed
+            series.total_bytes += size
+            series.recent.append(elapsed)
+            for i, limit in enumerate(LATENCY_BUCKETS):
+                if elapsed <= limit:
+                    series.buckets[i] += 1
+            if status is not None:
+                series.statuses[status] += 1
+            if timeout:
+                series.timeouts += 1
+            elif error:
+                series.errors += 1
+
+    def record_payload(self, url: str, kind: str, size: int) -> None:
+        """Registra el tamaño de la última respuesta de `url` de un tipo ("full" o "count")."""
+        key = label_for(url)
+        with self._lock:
+            self._series[key].last_bytes[kind] = size
+
+    def bytes_saved_per_poll(self, tenant: str, endpoint: str = "getcustom") -> Optional[int]:
+        """Bytes que ahorra un poll de solo conteo frente a la consulta completa (si ambos se conocen)."""
+        with self._lock:
+            series = self._series.get((tenant, endpoint))
+            return _saved(series) if series else None
+
+    def json_error(self, tenant: str, endpoint: str) -> None:
+        with self._lock:
+            self._series[(tenant, endpoint)].json_errors += 1
+
+    def quantile(self, tenant: str, endpoint: str, q: float, min_samples: int = 1) -> Optional[float]:
+        """Cuantil `q` de las latencias recientes; None si hay menos de `min_samples` muestras."""
+        with self._lock:
+            series = self._series.get((tenant, endpoint))
+            tiempos = sorted(series.recent) if series else []
+        if len(tiempos) < max(1, min_samples):
+            return None
+        return tiempos[min(len(tiempos) - 1, int(round(q * (len(tiempos) - 1))))]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Una fila por (centro, endpoint), ordenadas por tiempo total descendente."""
+        with self._lock:
+            items = [(key, series, sorted(series.recent)) for key, series in self._series.items()]
+        rows = []
+        for (tenant, endpoint), series, tiempos in items:
+            p95 = tiempos[min(len(tiempos) - 1, int(round(0.95 * (len(tiempos) - 1))))] if tiempos else None
+            rows.append({
+                "centro": tenant,
+                "endpoint": endpoint,
+                "solicitudes": series.count,
+                "tiempo_total_s": round(series.total_seconds, 3),
+                "p50_ms": round(median(tiempos) * 1000, 1) if tiempos else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "bytes": series.total_bytes,
+                "status": ", ".join(f"{code}x{n}" for code, n in sorted(series.statuses.items())),
+                "timeouts": series.timeouts,
+                "errores": series.errors,
+                "json_invalido": series.json_errors,
+                "ahorro_conteo_bytes": _saved(series),
+            })
+        return sorted(rows, key=lambda row: row["tiempo_total_s"], reverse=True)
+
+    def prometheus_text(self) -> str:
+        """Exposición en formato de texto de Prometheus."""
+        with self._lock:
+            items = sorted(self._series.items())
+            lines = [
+                "# HELP gopass_request_duration_seconds Latencia de las solicitudes a GoPass",
+                "# TYPE gopass_request_duration_seconds histogram",
+            ]
+            for (tenant, endpoint), series in items:
+                labels = f'tenant="{tenant}",endpoint="{endpoint}"'
+                for limit, count in zip(LATENCY_BUCKETS, series.buckets):
+                    lines.append(f'gopass_request_duration_seconds_bucket{{{labels},le="{limit}"}} {count}')
+                lines.append(f'gopass_request_duration_seconds_bucket{{{labels},le="+Inf"}} {series.count}')
+                lines.append(f"gopass_request_duration_seconds_sum{{{labels}}} {series.total_seconds:.6f}")
+                lines.append(f"gopass_request_duration_seconds_count{{{labels}}} {series.count}")
+
+            counters = [
+                ("gopass_response_bytes_total", "Bytes recibidos en respuestas", lambda s: s.total_bytes),
+                ("gopass_request_timeouts_total", "Solicitudes que agotaron el timeout", lambda s: s.timeouts),
+                ("gopass_request_errors_total", "Errores de conexión u otros fallos de requests", lambda s: s.errors),
+                ("gopass_json_decode_errors_total", "Respuestas que no se pudieron decodificar como JSON",
+                 lambda s: s.json_errors),
+            ]
+            for name, help_text, value in counters:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (tenant, endpoint), series in items:
+                    lines.append(f'{name}{{tenant="{tenant}",endpoint="{endpoint}"}} {value(series)}')
+
+            lines += ["# HELP gopass_responses_total Respuestas por código de status",
+                      "# TYPE gopass_responses_total counter"]
+            for (tenant, endpoint), series in items:
+                for code, count in sorted(series.statuses.items()):
+                    lines.append(
+                        f'gopass_responses_total{{tenant="{tenant}",endpoint="{endpoint}",status="{code}"}} {count}'
+                    )
+
+            lines += ["# HELP gopass_last_response_bytes Bytes de la última respuesta por tipo de consulta",
+                      "# TYPE gopass_last_response_bytes gauge"]
+            for (tenant, endpoint), series in items:
+                for kind, size in sorted(series.last_bytes.items()):
+                    lines.append(
+                        f'gopass_last_response_bytes{{tenant="{tenant}",endpoint="{endpoint}",kind="{kind}"}} {size}'
+                    )
+            lines += ["# HELP gopass_count_poll_bytes_saved Bytes que ahorra un poll de solo conteo",
+                      "# TYPE gopass_count_poll_bytes_saved gauge"]
+            for (tenant, endpoint), series in items:
+                saved = _saved(series)
+                if saved is not None:
+                    lines.append(f'gopass_count_poll_bytes_saved{{tenant="{tenant}",endpoint="{endpoint}"}} {saved}')
+        return "\n".join(lines) + "\n"
+
+
+def _saved(series: _Series) -> Optional[int]:
+    sizes = series.last_bytes
+    if "full" not in sizes or "count" not in sizes:
+        return None
+    return sizes["full"] - sizes["count"]
+
+
+METRICS = RequestMetrics()
+
+
+class MeteredSession(requests.Session):
+    """
+    Session que registra cada envío en METRICS. Se mide en send() (no con un hook de
+    respuesta) para contar también los timeouts y errores de conexión, que no producen respuesta.
+    """
+
+    def send(self, request, **kwargs):
+        tenant, endpoint = label_for(request.url)
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.exceptions.Timeout:
+            METRICS.observe(tenant, endpoint, time.perf_counter() - start, timeout=True)
+            raise
+        except requests.exceptions.RequestException:
+            METRICS.observe(tenant, endpoint, time.perf_counter() - start, error=True)
+            raise
+
+        size = 0 if kwargs.get("stream") else len(response.content or b"")
+        METRICS.observe(tenant, endpoint, time.perf_counter() - start, response.status_code, size)
+        _track_json_errors(response, tenant, endpoint)
+        return response
+
+
+def _track_json_errors(response, tenant: str, endpoint: str) -> None:
+    decode = response.json
+
+    def json(**kwargs):
+        try:
+            return decode(**kwargs)
+        except ValueError:
+            METRICS.json_error(tenant, endpoint)
+            raise
+
+    response.json = json
+
+
+# ===========================
+# ENDPOINT PROMETHEUS
+# ===========================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Sirve /metrics en un hilo de fondo. Devuelve None si el puerto no está disponible."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"No se pudo abrir el endpoint de métricas en el puerto {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
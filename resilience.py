@@ -0,0 +1,240 @@
+"""
+Capa de resiliencia compartida por las sesiones de todos los scrapers.
+
+- Presupuesto total por corrida: start_run(session, segundos) fija un deadline; cada
+  intento usa como timeout el mínimo entre el suyo y lo que quede del presupuesto.
+- Reintentos con backoff exponencial y jitter, solo para GET/HEAD (idempotentes),
+  ante errores de conexión, timeouts y status 429/5xx.
+- Hedging: si un GET tarda más que el p95 observado para ese centro y endpoint, se
+  lanza una copia y se usa la primera respuesta que llegue.
+- Circuit breaker por centro: tras FAILURE_THRESHOLD fallos seguidos se falla al
+  instante durante RESET_TIMEOUT segundos y luego se deja pasar una solicitud de prueba.
+
+Los errores que genera esta capa heredan de las excepciones de requests, así que los
+`except Exception` de los scrapers los manejan igual que cualquier fallo de red.
+"""
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+import requests
+
+from request_metrics import METRICS, MeteredSession, label_for
+from tenants import TENANTS
+
+# Presupuesto por corrida de un centro (login + endpoints), en segundos
+RUN_DEADLINE = float(os.environ.get("SCRAPE_DEADLINE", 45))
+# Timeout (conexión, lectura) para llamadas que no indican uno
+DEFAULT_TIMEOUT = (5, 20)
+
+MAX_RETRIES = 2
+BACKOFF_BASE = 0.25
+BACKOFF_MAX = 4.0
+RETRY_METHODS = {"GET", "HEAD"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+HEDGE_ENABLED = True
+HEDGE_QUANTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.05
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+
+# GET en vuelo (original + copia) de los 3 endpoints de cada centro del registro
+HEDGE_WORKERS = max(32, 2 * 3 * len(TENANTS))
+
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """Se agotó el presupuesto de la corrida antes de poder enviar la solicitud."""
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """El circuito del centro está abierto: se falla sin contactar al servidor."""
+
+
+# ===========================
+# CIRCUIT BREAKER
+# ===========================
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        """True si la solicitud puede salir (cerrado, o la única prueba en semiabierto)."""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(tenant: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if tenant not in _breakers:
+            _breakers[tenant] = CircuitBreaker()
+        return _breakers[tenant]
+
+
+def breaker_states() -> Dict[str, str]:
+    """{centro: "closed" | "open" | "half-open"} para el panel de diagnóstico."""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {tenant: breaker.state for tenant, breaker in breakers.items()}
+
+
+# ===========================
+# DEADLINE POR CORRIDA
+# ===========================
+
+def start_run(session, budget: float = RUN_DEADLINE) -> None:
+    """Fija el deadline de la corrida actual en la sesión del scraper."""
+    session.deadline = time.monotonic() + budget
+
+
+def end_run(session) -> None:
+    session.deadline = None
+
+
+def _capped_timeout(timeout, remaining: Optional[float]):
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    if remaining is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+    return min(timeout, remaining)
+
+
+def _backoff(attempt: int) -> float:
+    """Backoff exponencial con jitter completo."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+# ===========================
+# SESIÓN
+# ===========================
+
+class ResilientSession(MeteredSession):
+    """MeteredSession con deadline, reintentos, hedging y circuit breaker (cada intento se mide)."""
+
+    deadline: Optional[float] = None
+
+    def _remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def send(self, request, **kwargs):
+        tenant, endpoint = label_for(request.url)
+        breaker = breaker_for(tenant)
+        idempotent = request.method in RETRY_METHODS
+        attempt = 0
+
+        while True:
+            remaining = self._remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"Presupuesto agotado antes de {request.method} {endpoint}")
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuito abierto para {tenant}")
+
+            kwargs["timeout"] = _capped_timeout(kwargs.get("timeout"), remaining)
+            try:
+                if idempotent and HEDGE_ENABLED:
+                    response = self._send_hedged(request, tenant, endpoint, **kwargs)
+                else:
+                    response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.failure()
+                if not self._should_retry(idempotent, attempt, e):
+                    raise
+            else:
+                if response.status_code >= 500:
+                    breaker.failure()
+                else:
+                    breaker.success()
+                if response.status_code not in RETRY_STATUSES or not self._should_retry(idempotent, attempt):
+                    return response
+                response.close()
+
+            delay = _backoff(attempt)
+            remaining = self._remaining()
+            if remaining is not None and delay >= remaining:
+                raise DeadlineExceeded(f"Sin presupuesto para reintentar {request.method} {endpoint}")
+            time.sleep(delay)
+            attempt += 1
+
+    def _should_retry(self, idempotent: bool, attempt: int, error: Exception = None) -> bool:
+        if not idempotent or attempt >= MAX_RETRIES:
+            return False
+        return not isinstance(error, (DeadlineExceeded, CircuitOpenError))
+
+    def _send_hedged(self, request, tenant: str, endpoint: str, **kwargs):
+        """Envía el GET y, si pasa del p95 sin respuesta, una copia; gana la primera en llegar."""
+        p95 = METRICS.quantile(tenant, endpoint, HEDGE_QUANTILE, HEDGE_MIN_SAMPLES)
+        remaining = self._remaining()
+        if p95 is None or (remaining is not None and remaining <= p95):
+            return super().send(request, **kwargs)
+
+        send = super().send
+        primary = _hedge_executor.submit(send, request, **kwargs)
+        done, _ = wait([primary], timeout=max(p95, HEDGE_MIN_DELAY))
+        if done:
+            return primary.result()
+
+        hedge = _hedge_executor.submit(send, request.copy(), **kwargs)
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.add_done_callback(_close_response)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+def _close_response(future) -> None:
+    if future.exception() is None:
+        future.result().close()
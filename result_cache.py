@@ -0,0 +1,126 @@
+"""
+Caché en memoria con TTL y coalescencia de solicitudes ("single-flight"), compartido
+por todo el proceso (y por lo tanto por todas las sesiones de Streamlit).
+
+Si varias sesiones piden la misma llave a la vez, solo una ejecuta `fetch` y las
+demás esperan ese mismo resultado en vez de repetir la consulta.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class SingleFlightCache:
+    def __init__(self, ttl: float, max_entries: Optional[int] = None):
+        self.ttl = ttl
+        # Con llaves muy variables (p. ej. páginas y búsquedas) se descartan las más viejas
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, ttl: Optional[float] = None) -> Optional[Any]:
+        """Valor cacheado si sigue vigente, o None."""
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+        return None
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], ttl: Optional[float] = None,
+                     cacheable: Callable[[Any], bool] = lambda value: True) -> Any:
+        """
+        Devuelve el valor vigente para `key` o lo obtiene con `fetch()`.
+        Las llamadas concurrentes para la misma llave comparten una sola ejecución de `fetch`.
+        Solo se guarda el resultado si `cacheable(valor)` es verdadero (p. ej. no cachear fallos).
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] < ttl:
+                return entry[1]
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+
+        if not leader:
+            return flight.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.set_exception(e)
+            raise
+
+        with self._lock:
+            if cacheable(value):
+                self._entries[key] = (time.monotonic(), value)
+                if self.max_entries and len(self._entries) > self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    self._entries.pop(oldest, None)
+            self._inflight.pop(key, None)
+        flight.set_result(value)
+        return value
+
+    def get_or_fetch_many(self, keys: List[Hashable], fetch_many: Callable[[List[Hashable]], Dict[Hashable, Any]],
+                          ttl: Optional[float] = None,
+                          cacheable: Callable[[Any], bool] = lambda value: True) -> Dict[Hashable, Any]:
+        """
+        Como get_or_fetch para varias llaves a la vez: las vigentes salen del caché, las que
+        ya está obteniendo otra llamada se esperan, y las demás se piden juntas en una sola
+        llamada `fetch_many(llaves)` -> {llave: valor}. Devuelve {llave: valor} en el orden de `keys`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        values, waiting, mine = {}, {}, {}
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry and now - entry[0] < ttl:
+                    values[key] = entry[1]
+                elif key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    mine[key] = self._inflight[key] = Future()
+
+        if mine:
+            try:
+                fetched = fetch_many(list(mine))
+                missing = [key for key in mine if key not in fetched]
+                if missing:
+                    raise KeyError(f"fetch_many no devolvió {missing}")
+            except BaseException as e:
+                with self._lock:
+                    for key in mine:
+                        self._inflight.pop(key, None)
+                for flight in mine.values():
+                    flight.set_exception(e)
+                raise
+            with self._lock:
+                for key in mine:
+                    if cacheable(fetched[key]):
+                        self._entries[key] = (time.monotonic(), fetched[key])
+                    self._inflight.pop(key, None)
+                while self.max_entries and len(self._entries) > self.max_entries:
+                    oldest = min(self._entries, key=lambda k: self._entries[k][0])
+                    self._entries.pop(oldest, None)
+            for key, flight in mine.items():
+                flight.set_result(fetched[key])
+                values[key] = fetched[key]
+
+        for key, flight in waiting.items():
+            values[key] = flight.result()
+        return {key: values[key] for key in dict.fromkeys(keys)}
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
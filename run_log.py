@@ -0,0 +1,6 @@
+"""Salida de los procesos de línea de comandos (daemon, backfill): una línea con hora por evento."""
+from datetime import datetime
+
+
+def log(msg):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {msg}", flush=True)
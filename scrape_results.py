@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from types import MappingProxyType
+
+import pandas as pd
+
+from async_engine import scrape_all, scrape_tenant, SCRAPE_SHARDS
+from columnar import ColumnarTable
+from history import record_run
+from resilience import start_run, end_run
+from result_cache import SingleFlightCache
+
+# Segundos que un resultado de scraping se reutiliza entre sesiones (SCRAPE_CACHE_TTL en el entorno)
+SCRAPE_CACHE_TTL = float(os.environ.get("SCRAPE_CACHE_TTL", 60))
+
+# Un solo caché por proceso: todas las sesiones de Streamlit leen los mismos resultados
+SCRAPE_CACHE = SingleFlightCache(SCRAPE_CACHE_TTL)
+
+# Páginas de las tablas paginadas (PAGE_CACHE_TTL en el entorno); cada rerun de Streamlit
+# vuelve a pedir la página visible de cada pestaña, así que se sirve de aquí
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 30))
+PAGE_CACHE = SingleFlightCache(PAGE_CACHE_TTL, max_entries=512)
+# Presupuesto de una página pedida a la API (PAGE_DEADLINE) y segundos que un centro que
+# falló no se vuelve a consultar para paginar (PAGE_FAILURE_TTL): mientras tanto se muestran
+# las filas locales y la pestaña no espera a un upstream lento
+PAGE_DEADLINE = float(os.environ.get("PAGE_DEADLINE", 8))
+PAGE_FAILURE_TTL = float(os.environ.get("PAGE_FAILURE_TTL", 30))
+
+# Un scraper (sesión HTTP + token) por centro y usuario para paginar, con su lock: el
+# deadline vive en la sesión, así que sus páginas se piden de a una
+_page_scrapers = {}
+_page_failures = {}
+_page_lock = threading.Lock()
+
+
+def to_frame(value):
+    """DataFrame, ColumnarTable o lista de dicts -> DataFrame (vacío si no se puede convertir)"""
+    if isinstance(value, pd.DataFrame):
+        return value
+    if isinstance(value, ColumnarTable):
+        return value.to_pandas()
+    if not value:
+        return pd.DataFrame()
+    try:
+        return pd.DataFrame(value)
+    except Exception:
+        try:
+            return pd.DataFrame([value])
+        except Exception:
+            return pd.DataFrame()
+
+
+def build_result(name, raw):
+    """Convierte los datos crudos de un scraper a los DataFrames que muestra la UI"""
+    ok = raw["ok"]
+    result = {"ok": ok, "data": None, "jobs": None, "invoices": None, "totals": {}}
+    if ok:
+        # Obtenemos datos según cada scraper y los pasamos a DataFrame para que la UI los muestre
+        result["data"] = to_frame(raw["data"])
+
+        jobs = raw["jobs"]
+        # Convertimos jobs a DataFrame si es lista o tabla columnar
+        # (las columnas y sus nombres ya vienen del registro de centros, tenants.toml)
+        if isinstance(jobs, (list, ColumnarTable)):
+            jobs = to_frame(jobs)
+
+        result["jobs"] = jobs
+        result["invoices"] = raw["invoices"]
+        # totalItems de pendientes y jobs (snapshots viejos no los traen)
+        result["totals"] = dict(raw.get("totals") or {})
+    return result
+
+def run_scraper(name, scraper_class, username, password):
+    """Login y luego los tres endpoints en paralelo para un solo centro comercial"""
+    raw = scrape_tenant(scraper_class(), username, password)
+    return name, build_result(name, raw)
+
+def _freeze(name, raw):
+    result = build_result(name, raw)
+    result["updated_at"] = time.time()
+    # Solo el líder del single-flight llega aquí: una fila de historial por scraping real
+    record_run(name, result, result["updated_at"])
+    # Solo lectura: el mismo objeto se comparte entre todas las sesiones
+    return MappingProxyType(result)
+
+
+def scrape_all_cached(tenants, ttl=None, shards=None):
+    """
+    Igual que scrape_all (async_engine) para los centros dados, pero a través de SCRAPE_CACHE:
+    dentro del TTL se devuelve el resultado ya obtenido, y si otra sesión está scrapeando
+    el mismo centro se espera ese resultado en vez de repetir la consulta. Los que faltan
+    se scrapean juntos en una sola llamada a scrape_all, repartidos en `shards` procesos
+    (por defecto SCRAPE_SHARDS).
+    tenants: lista de (nombre, clase_scraper, usuario, contraseña).
+    Devuelve {nombre: resultado de solo lectura con "updated_at"}. Los fallos no se cachean.
+    """
+    targets = {(name, username): (name, scraper_class, username, password)
+               for name, scraper_class, username, password in tenants}
+
+    def fetch_many(keys):
+        raws = scrape_all([targets[key] for key in keys], shards=SCRAPE_SHARDS if shards is None else shards)
+        return {key: _freeze(key[0], raws[key[0]]) for key in keys}
+
+    resultados = SCRAPE_CACHE.get_or_fetch_many(list(targets), fetch_many, ttl=ttl,
+                                                cacheable=lambda result: result["ok"])
+    return {name: result for (name, _), result in resultados.items()}
+
+
+def refresh_if_stale(target, state, max_age, force=False, now=None):
+    """
+    Re-consulta un solo centro (target = (nombre, clase_scraper, usuario, contraseña)) si su
+    estado tiene más de `max_age` segundos, o siempre con force=True. Pasa por SCRAPE_CACHE,
+    así que varias sesiones con la misma pestaña abierta comparten la consulta.
+    Devuelve el resultado nuevo, o None si el estado sigue vigente.
+    """
+    now = time.time() if now is None else now
+    if not force and (not max_age or now - state.get("updated_at", 0) < max_age):
+        return None
+    name = target[0]
+    return scrape_all_cached([target], ttl=0 if force else None)[name]
+
+
+def _records(rows):
+    if rows is None:
+        return []
+    if isinstance(rows, list):
+        return rows
+    return to_frame(rows).to_dict(orient="records")
+
+
+def local_page(rows, total, top, skip=0, sort=None, search=None):
+    """
+    Página armada con las filas que ya hay en memoria (último scraping o snapshot del daemon).
+    `rows` son las primeras filas en el orden por defecto y `total` el totalItems que informó
+    la API (None si no se conoce). Sin orden ni búsqueda sirve mientras la página quepa en
+    esas filas; si están todas (total <= filas) también ordena y filtra aquí.
+    Devuelve (total, filas), o None si hace falta pedirla a la API.
+    """
+    rows = _records(rows)
+    complete = total is not None and total <= len(rows)
+    if sort is None and search is None and (complete or (total is not None and skip + top <= len(rows))):
+        return total, rows[skip:skip + top]
+    if not complete:
+        return None
+    if search is not None:
+        rows = _matching(rows, search)
+    if sort is not None:
+        column, descending = sort
+        # Los nulos al final en ambos sentidos, como el $orderby de la API
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        rows = sorted(present, key=lambda row: row[column], reverse=descending) + missing
+    return len(rows), rows[skip:skip + top]
+
+
+def _matching(rows, search):
+    texto = search.lower()
+    return [row for row in rows if any(texto in str(value).lower() for value in row.values())]
+
+
+def _page_scraper(name, scraper_class, username):
+    with _page_lock:
+        entry = _page_scrapers.get((name, username))
+        if entry is None:
+            entry = _page_scrapers[(name, username)] = (scraper_class(), threading.Lock())
+        return entry
+
+
+def fetch_page_cached(name, scraper_class, username, password, table, top, skip=0, sort=None, search=None):
+    """
+    Una página de "pending" o "jobs" de un centro (ver GoPassScraper.get_pending_page),
+    compartida entre sesiones por PAGE_CACHE. Devuelve (total, filas), o None si el login o la
+    consulta fallan ((0, []) es una página vacía, p. ej. una búsqueda sin resultados).
+    Reutiliza la sesión y el token del centro, corre bajo PAGE_DEADLINE y, si falla, el centro
+    no se vuelve a consultar durante PAGE_FAILURE_TTL segundos.
+    """
+    with _page_lock:
+        failed_at = _page_failures.get(name)
+    if failed_at is not None and time.monotonic() - failed_at < PAGE_FAILURE_TTL:
+        return None
+
+    def fetch():
+        scraper, lock = _page_scraper(name, scraper_class, username)
+        with lock:
+            start_run(scraper.session, PAGE_DEADLINE)
+            try:
+                # El token sale de token_cache si sigue vigente: no hay un login por página
+                if not scraper.login(username, password):
+                    return None
+                if table == "pending":
+                    return scraper.get_pending_page(top, skip, sort, search)
+                return scraper.get_jobs_page(top, skip, sort)
+            finally:
+                end_run(scraper.session)
+
+    def cacheable(page):
+        with _page_lock:
+            if page is None:
+                _page_failures[name] = time.monotonic()
+            else:
+                _page_failures.pop(name, None)
+        return page is not None
+
+    key = (name, username, table, top, skip, sort, search or None)
+    return PAGE_CACHE.get_or_fetch(key, fetch, cacheable=cacheable)
+
+
+def fetch_page(name, scraper_class, username, password, table, top, skip=0, sort=None, search=None,
+               local_rows=None, local_total=None):
+    """
+    Página para las tablas de las pestañas: primero desde las filas locales (ver local_page)
+    y solo lo que no alcanzan se pide a la API con fetch_page_cached. Si la API no responde
+    se muestran las filas locales de esa posición (en el orden por defecto y, con búsqueda,
+    solo las que coinciden, igual que local_page).
+    """
+    page = local_page(local_rows, local_total, top, skip, sort, search)
+    if page is not None:
+        return page
+    page = fetch_page_cached(name, scraper_class, username, password, table, top, skip, sort, search)
+    if page is not None:
+        return page
+    local_rows = _records(local_rows)
+    if search is not None:
+        local_rows = _matching(local_rows, search)
+        return len(local_rows), local_rows[skip:skip + top]
+    if not local_rows:
+        return 0, []
+    return local_total or len(local_rows), local_rows[skip:skip + top]
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+# Carpeta donde el daemon publica el último resultado de cada centro comercial
+SNAPSHOT_DIR = os.environ.get("FACTURAS_SNAPSHOT_DIR", "snapshots")
+
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Los resultados pueden traer DataFrames (build_result) o tablas columnares; se guardan
+    como lista de registros con None en los nulos.
+    """
+    # Sin importar pandas: el dashboard solo lee snapshots y no debe cargarlo por eso
+    if hasattr(value, "to_records") and hasattr(value, "num_rows"):
+        return value.to_records()
+    if hasattr(value, "to_dict") and hasattr(value, "columns"):
+        value = value.astype(object).where(value.notna(), None)
+        return value.to_dict(orient="records")
+    return value
+
+
+def publish_snapshot(name: str, result: Dict[str, Any], snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """
+    Escribe el resultado crudo de un centro comercial de forma atómica
+    (archivo temporal + os.replace) para que el dashboard nunca lea uno a medias.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    payload = {
+        "name": name,
+        "updated_at": time.time(),
+        "result": {key: to_jsonable(value) for key, value in result.items()},
+    }
+    path = os.path.join(snapshot_dir, f"{name}.json")
+    fd, tmp_path = tempfile.mkstemp(dir=snapshot_dir, prefix=f".{name}.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, default=str)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(name: str, snapshot_dir: str = SNAPSHOT_DIR,
+                  max_age: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Lee el último snapshot publicado; None si no existe o es más viejo que max_age (segundos)."""
+    path = os.path.join(snapshot_dir, f"{name}.json")
+    try:
+        with open(path, encoding="utf-8") as fh:
+            payload = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if max_age is not None and time.time() - payload.get("updated_at", 0) > max_age:
+        return None
+    return payload
@@ -0,0 +1,253 @@
+"""
+Servidor HTTP local que imita la API de GoPass, para benchmarks sin credenciales ni red.
+
+- Rutas con prefijo de centro (/andino/api/..., /arkadia/api/...) responden con los
+  fixtures de fixtures/gopass/<centro>/<endpoint>.json (sintéticos, ver fixtures/README.md).
+- Rutas sin prefijo responden con payloads sintéticos: getcustom genera `invoice_rows` filas
+  por cada día del rango `between` de additionalQuery (o desde el `transdate >=` de la
+  sincronización incremental); las de `missing` (índices) todavía no existen, ni en el conteo.
+- Como la API real, `$select` limita los campos de cada fila. pendingEmit sintético trae
+  `pending_rows` comercios y respeta $top/$skip/$orderby y el `ilike` de additionalQuery.
+- `max_top` limita $top como hacen algunos servidores (las páginas llegan más cortas).
+- `valid_token`: login entrega ese token y los GET con otro Bearer responden 401 (token vencido).
+- `server.hits` cuenta las solicitudes por endpoint (para verificar cuántas consultas llegaron).
+- `latency` agrega una espera fija a cada solicitud; `tail_ratio` de los GET tardan
+  además `tail_latency` segundos y `error_ratio` de los GET responden 503.
+"""
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GOPASS_FIXTURES_DIR = os.path.join(FIXTURES_DIR, "gopass")
+GOPASS_HOST_RE = re.compile(r"https://[a-z]+\.gopass\.com\.co")
+BETWEEN_RE = re.compile(r"between '(\d{4}-\d{2}-\d{2})[^']*' and '(\d{4}-\d{2}-\d{2})")
+SINCE_RE = re.compile(r"t\.transdate >= '([^']+)' and t\.transdate <= '(\d{4}-\d{2}-\d{2})")
+ILIKE_RE = re.compile(r"(\w+) ilike '%(.*)%'")
+
+# Día de la factura sintética 0; los idinvoice son únicos entre días
+STUB_EPOCH = date(2025, 1, 1)
+
+
+@lru_cache(maxsize=None)
+def load_fixture(tenant, endpoint):
+    """Payload fixture de un endpoint (pendingEmit, genc_jobsconfig, getcustom) de un centro."""
+    path = os.path.join(GOPASS_FIXTURES_DIR, tenant, f"{endpoint}.json")
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def fixture_tenants():
+    if not os.path.isdir(GOPASS_FIXTURES_DIR):
+        return set()
+    return set(os.listdir(GOPASS_FIXTURES_DIR))
+
+
+def fake_invoice(i, day=STUB_EPOCH):
+    """Fila de getcustom con la forma aproximada del payload real."""
+    return {
+        "idinvoice": 1_000_000 + i,
+        "idtransaction": 2_000_000 + i,
+        "idtransparking": 3_000_000 + i,
+        "transdate": f"{day} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "outdate": f"{day} {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "valorneto": 8403 + i % 50,
+        "valortotal": 10000 + i % 50,
+        "tercero": "CONSUMIDOR FINAL",
+        "invoicestatus": "EMITIDA",
+        "cufe": f"{i:064x}",
+        "id_unico": f"FE{i}",
+        "idcommerce": 1,
+        "plate": f"ABC{i % 1000:03d}",
+        "idserie": 7,
+    }
+
+
+@lru_cache(maxsize=8)
+def pending_rows(count):
+    """Comercios sintéticos de pendingEmit (el primero con la forma que tenía el stub)."""
+    if count == 1:
+        return [{"pending": 0, "idcommerce": 1, "name": "COMERCIO STUB"}]
+    return [{"pending": (i * 7) % 13, "idcommerce": i + 1, "name": f"COMERCIO {i:05d}", "idserietype": i % 4}
+            for i in range(count)]
+
+
+def select_fields(rows, query):
+    """Aplica $select (si viene) a las filas, como hace la API de GoPass."""
+    select = query.get("$select", [""])[0]
+    if not select:
+        return rows
+    fields = select.split(",")
+    return [{field: row[field] for field in fields if field in row} for row in rows]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Responde los endpoints de GoPass con fixtures o payloads sintéticos y latencia opcional."""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = -1  # headers y cuerpo en un solo envío
+    latency = 0.0
+    tail_ratio = 0.0
+    tail_latency = 0.0
+    error_ratio = 0.0
+    invoice_rows = 1  # totalItems del día simulado en getcustom
+    missing = frozenset()  # índices de facturas sintéticas que todavía no se emitieron
+    pending_rows = 1  # comercios en pendingEmit sintético
+    max_top = None  # tope de $top del servidor (None = sin tope)
+    valid_token = None  # None = no se valida el Bearer
+    tenants = frozenset()
+    hits = Counter()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.hits[urlparse(self.path).path.rstrip("/").rsplit("/", 1)[-1]] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._send_json({"tokens": {"access": {"token": self.valid_token or "stub-token"}}})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        endpoint = parts[-1]
+        self.hits[endpoint] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.tail_ratio and random.random() < self.tail_ratio:
+            time.sleep(self.tail_latency)
+        if self.error_ratio and random.random() < self.error_ratio:
+            return self._send_json({"message": "Service Unavailable"}, 503)
+        if self.valid_token and self.headers.get("Authorization") != f"Bearer {self.valid_token}":
+            return self._send_json({"message": "Unauthorized"}, 401)
+        query = parse_qs(url.query)
+        top = int(query.get("$top", ["10"])[0])
+        if self.max_top:
+            top = min(top, self.max_top)
+        skip = int(query.get("$skip", ["0"])[0])
+
+        if parts[0] in self.tenants:
+            try:
+                payload = load_fixture(parts[0], endpoint)
+            except OSError:
+                return self._send_json({"message": "Not found"}, 404)
+            data = payload.get("data", {})
+            rows = select_fields(data.get("rows", [])[skip:skip + top], query)
+            return self._send_json({"data": {**data, "rows": rows}})
+
+        if endpoint == "getcustom":
+            per_day = self.invoice_rows
+            additional = query.get("additionalQuery", [""])[0]
+            since = SINCE_RE.search(additional)
+            match = BETWEEN_RE.search(additional)
+            if since:
+                start = end = date.fromisoformat(since.group(2))
+            elif match:
+                start, end = (date.fromisoformat(value) for value in match.groups())
+            else:
+                start = end = STUB_EPOCH
+            total = per_day * max(1, (end - start).days + 1)
+            first = (start - STUB_EPOCH).days * per_day
+            if since or self.missing:
+                rows = [fake_invoice(first + i, start + timedelta(days=i // per_day))
+                        for i in range(total) if first + i not in self.missing]
+                if since:
+                    rows = [row for row in rows if row["transdate"] >= since.group(1)]
+                total = len(rows)
+                rows = rows[skip:skip + top]
+            else:
+                rows = [
+                    fake_invoice(first + i, start + timedelta(days=i // per_day))
+                    for i in range(skip, min(skip + top, total))
+                ]
+            return self._send_json({"data": {"totalItems": total, "rows": select_fields(rows, query)}})
+        if endpoint == "pendingEmit":
+            rows = pending_rows(self.pending_rows)
+            match = ILIKE_RE.search(query.get("additionalQuery", [""])[0])
+            if match:
+                column, texto = match.group(1), match.group(2).replace("''", "'").lower()
+                rows = [row for row in rows if texto in str(row.get(column, "")).lower()]
+            orderby = query.get("$orderby", [""])[0].split()
+            if orderby:
+                rows = sorted(rows, key=lambda row: row.get(orderby[0]) or 0,
+                              reverse=orderby[-1].lower() == "desc")
+            page = select_fields(rows[skip:skip + top], query)
+            return self._send_json({"data": {"totalItems": len(rows), "rows": page}})
+        elif endpoint == "genc_jobsconfig":
+            rows = [{"jobname": "JOB STUB", "updatedat": "2025-01-01T00:00:00"}]
+        else:
+            rows = []
+        self._send_json({"data": {"totalItems": len(rows), "rows": select_fields(rows, query)}})
+
+
+def start_stub_server(latency=0.0, invoice_rows=1, tail_ratio=0.0, tail_latency=0.0, error_ratio=0.0,
+                      pending_rows=1, max_top=None, valid_token=None, missing=()):
+    """Levanta el stub en un puerto libre y devuelve (server, base_url)."""
+    handler = type("Handler", (StubHandler,), {
+        "latency": latency,
+        "tail_ratio": tail_ratio,
+        "tail_latency": tail_latency,
+        "error_ratio": error_ratio,
+        "invoice_rows": invoice_rows,
+        "missing": frozenset(missing),
+        "pending_rows": pending_rows,
+        "max_top": max_top,
+        "valid_token": valid_token,
+        "tenants": frozenset(fixture_tenants()),
+        "hits": Counter(),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.hits = handler.hits
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}"
+
+
+def retarget(scraper, base_url):
+    """Redirige todas las URLs de GoPass de un scraper hacia el stub local."""
+    for attr, value in list(vars(scraper).items()):
+        if isinstance(value, str):
+            setattr(scraper, attr, GOPASS_HOST_RE.sub(base_url, value))
+    return scraper
+
+
+def stub_class(scraper_class, base_url, tenant=None):
+    """
+    Subclase del scraper que apunta al stub (incluyendo URLs construidas dinámicamente).
+    Con `tenant` las solicitudes se responden con los fixtures sintéticos de ese centro.
+    """
+    target = f"{base_url}/{tenant}" if tenant else base_url
+
+    class Stubbed(scraper_class):
+        def __init__(self):
+            super().__init__()
+            retarget(self, target)
+
+        def _invoices_url_for_date(self, *args, **kwargs):
+            return GOPASS_HOST_RE.sub(target, super()._invoices_url_for_date(*args, **kwargs))
+
+    Stubbed.__name__ = scraper_class.__name__
+    return Stubbed
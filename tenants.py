@@ -0,0 +1,144 @@
+"""
+Registro de centros comerciales (tenants) leído de tenants.toml.
+
+Cada entrada declara el host de GoPass, la sección de credenciales en st.secrets,
+y qué columnas muestra el dashboard de pendientes y jobs y de qué campo de la API
+sale cada una (de ahí se arma el $select; ver projection.py). El scraper genérico (gopass_scraper.GoPassScraper),
+la app, el daemon, las métricas y el pool de conexiones se arman desde aquí.
+"""
+import os
+import tomllib
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlparse
+
+# Archivo del registro (FACTURAS_TENANTS en el entorno)
+TENANTS_PATH = os.environ.get(
+    "FACTURAS_TENANTS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tenants.toml")
+)
+
+# Credenciales de los procesos fuera de Streamlit (daemon, backfill): mismas secciones que st.secrets
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+# Cada cuántos segundos se re-consulta una pestaña abierta (TAB_REFRESH_SECONDS; 0 lo desactiva)
+TAB_REFRESH_SECONDS = float(os.environ.get("TAB_REFRESH_SECONDS", 300))
+
+FieldSpec = Union[str, Sequence[str]]
+
+# Roles que leen el mensaje, el historial y el daemon: (tabla, campos de la API que lo cumplen).
+# Si un centro no declara la columna de un rol en [tenants.roles], se usa la columna que sale
+# de alguno de esos campos.
+ROLE_FIELDS = {
+    "pending_name": ("pending", ("name",)),
+    "pending_count": ("pending", ("pending",)),
+    "job_name": ("jobs", ("jobname",)),
+    "job_date": ("jobs", ("laststartdate", "updatedat")),
+}
+
+
+def _fields(spec: Dict[str, FieldSpec]) -> Dict[str, Tuple[str, ...]]:
+    """{columna: "campo"} o {columna: ["alias1", "alias2"]} -> {columna: (alias, ...)}"""
+    return {column: (sources,) if isinstance(sources, str) else tuple(sources)
+            for column, sources in spec.items()}
+
+
+class TenantConfig:
+    """Un centro comercial del registro. Solo datos: se puede enviar a otros procesos."""
+
+    def __init__(self, name: str, host: str, secrets: str, display_name: Optional[str] = None,
+                 motor: Optional[str] = None, pending_orderby: str = "idserietype asc",
+                 jobs_orderby: str = "idjob asc", pending_search: Optional[str] = None,
+                 refresh_seconds: Optional[float] = None,
+                 invoice_fields: Optional[Dict[str, FieldSpec]] = None,
+                 pending_fields: Optional[Dict[str, FieldSpec]] = None,
+                 jobs_fields: Optional[Dict[str, FieldSpec]] = None,
+                 roles: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.host = host.rstrip("/")
+        self.secrets = secrets
+        self.display_name = display_name or name
+        self.motor = motor or f"Motor {self.display_name}"
+        self.pending_orderby = pending_orderby
+        self.jobs_orderby = jobs_orderby
+        self.pending_search = pending_search
+        self.refresh_seconds = TAB_REFRESH_SECONDS if refresh_seconds is None else float(refresh_seconds)
+        self.pending_fields = _fields(pending_fields or {
+            "comercio": "name", "total_pendientes": "pending", "id_comercio": "idcommerce",
+        })
+        # Nombres de campo de getcustom de este motor (ver invoices.invoice_select); vacío = sin $select
+        self.invoice_fields = _fields(invoice_fields or {})
+        self.jobs_fields = _fields(jobs_fields or {"nombre_job": "jobname", "ultima_actualizacion": "updatedat"})
+        self.roles = self._resolve_roles(roles or {})
+
+    def _resolve_roles(self, declared: Dict[str, str]) -> Dict[str, str]:
+        """{rol: columna} con las columnas declaradas o deducidas; error si un rol queda sin columna."""
+        desconocidos = sorted(set(declared) - set(ROLE_FIELDS))
+        if desconocidos:
+            raise ValueError(f"{self.name}: roles desconocidos {desconocidos} (opciones: {', '.join(ROLE_FIELDS)})")
+        tables = {"pending": self.pending_fields, "jobs": self.jobs_fields}
+        roles = {}
+        for role, (table, api_fields) in ROLE_FIELDS.items():
+            columns = tables[table]
+            column = declared.get(role) or next(
+                (column for column, sources in columns.items() if set(sources) & set(api_fields)), None)
+            if column not in columns:
+                raise ValueError(f"{self.name}: el rol {role} necesita una columna de {table}_fields "
+                                 f"(declárala en [tenants.roles]; columnas: {', '.join(columns)})")
+            roles[role] = column
+        return roles
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.host}/api"
+
+    @property
+    def hostname(self) -> str:
+        return urlparse(self.host).hostname or ""
+
+    def __repr__(self):
+        return f"TenantConfig({self.name!r}, {self.host!r})"
+
+
+def load_tenants(path: str = TENANTS_PATH) -> List[TenantConfig]:
+    """Lee el registro; los nombres repetidos son un error de configuración."""
+    with open(path, "rb") as fh:
+        entries = tomllib.load(fh).get("tenants", [])
+    tenants = [TenantConfig(**entry) for entry in entries]
+    names = [tenant.name for tenant in tenants]
+    duplicados = sorted({name for name in names if names.count(name) > 1})
+    if duplicados:
+        raise ValueError(f"Centros repetidos en {path}: {', '.join(duplicados)}")
+    return tenants
+
+
+TENANTS = load_tenants()
+_BY_NAME = {tenant.name: tenant for tenant in TENANTS}
+
+
+def get_tenant(name: str) -> TenantConfig:
+    return _BY_NAME[name]
+
+
+def tenant_names() -> List[str]:
+    return [tenant.name for tenant in TENANTS]
+
+
+def load_credentials(path: str = SECRETS_PATH) -> Dict:
+    """Lee secrets.toml para los procesos que no corren dentro de Streamlit."""
+    with open(path, "rb") as fh:
+        return tomllib.load(fh)
+
+
+def role_keys(name: str, role: str) -> Tuple[str, ...]:
+    """
+    Dónde buscar un rol en las filas de un centro: su columna en el registro y, detrás,
+    los campos crudos de la API (resultados sin proyectar o centros fuera del registro).
+    """
+    tenant = _BY_NAME.get(name)
+    columns = (tenant.roles[role],) if tenant else ()
+    return tuple(dict.fromkeys(columns + ROLE_FIELDS[role][1]))
+
+
+def credentials(tenant: TenantConfig, secrets) -> Tuple[str, str]:
+    """(usuario, contraseña) del centro desde st.secrets o un dict con las mismas secciones."""
+    section = secrets[tenant.secrets]
+    return section["USERNAME"], section["PASSWORD"]
@@ -0,0 +1,103 @@
+"""
+Benchmarks de pytest-benchmark contra el stub local y los fixtures sintéticos de fixtures/.
+
+    python -m pytest tests/benchmarks --benchmark-autosave             # guarda .benchmarks/
+    python -m pytest tests/benchmarks --benchmark-compare              # compara con la última guardada
+"""
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from message_builder import build_whatsapp_message
+from powerbi_parser import limpiar_tabla_asociados, parse_page_text
+from scrape_results import build_result, run_scraper
+from scraper import FacturaParkScraper
+from scraper_arkadia import FacturaArkadiaScraper
+from scraper_bulevar import FacturaBulevarScraper
+from scraper_fontanar import FacturaFontanarScraper
+from stub_server import FIXTURES_DIR, stub_class
+
+TENANTS = [
+    ("andino", FacturaParkScraper),
+    ("bulevar", FacturaBulevarScraper),
+    ("fontanar", FacturaFontanarScraper),
+    ("arkadia", FacturaArkadiaScraper),
+]
+
+
+def load_powerbi_text():
+    with open(os.path.join(FIXTURES_DIR, "powerbi_page.txt"), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def scale_powerbi_text(text, factor):
+    """Repite las filas de la tabla de asociados `factor` veces con nombres únicos."""
+    lines = text.split("\n")
+    inicio = lines.index("Porcentaje") + 1
+    fin = next(i for i, line in enumerate(lines) if line.startswith("Scroll"))
+    filas = lines[inicio:fin]
+    escaladas = []
+    for k in range(factor):
+        for j in range(0, len(filas), 3):
+            asociado, peaje, porcentaje = filas[j:j + 3]
+            escaladas += [f"{asociado} {k}", f"{peaje} {k}", porcentaje]
+    return "\n".join(lines[:inicio] + escaladas + lines[fin:])
+
+
+@pytest.fixture(scope="module")
+def raws():
+    """Respuestas crudas de los 4 centros (sus fixtures), para armar resultados y mensaje."""
+    from stub_server import start_stub_server
+
+    server, base_url = start_stub_server()
+    try:
+        resultados = {}
+        for name, cls in TENANTS:
+            scraper = stub_class(cls, base_url, tenant=name)()
+            scraper.login("u", "p")
+            resultados[name] = {
+                "ok": True,
+                "data": scraper.get_pending_invoices(),
+                "jobs": scraper.get_jobs_config(),
+                "invoices": scraper.get_invoices(),
+            }
+        return resultados
+    finally:
+        server.shutdown()
+
+
+@pytest.mark.parametrize("name, cls", TENANTS, ids=[name for name, _ in TENANTS])
+def test_run_scraper(benchmark, make_stub, name, cls):
+    # 20 ms por solicitud, como un upstream cercano
+    _, base_url = make_stub(latency=0.02)
+    stubbed = stub_class(cls, base_url, tenant=name)
+    _, result = benchmark(run_scraper, name, stubbed, "u", "p")
+    assert result["ok"] and len(result["data"])
+
+
+@pytest.mark.parametrize("factor", [1, 100], ids=["x1", "x100"])
+def test_parser(benchmark, factor):
+    text = scale_powerbi_text(load_powerbi_text(), factor)
+    tabla = benchmark(lambda: limpiar_tabla_asociados(parse_page_text(text)[4]))
+    assert len(tabla) >= factor
+
+
+def test_build_result(benchmark, raws):
+    states = benchmark(lambda: {name: build_result(name, raw) for name, raw in raws.items()})
+    assert all(state["ok"] for state in states.values())
+
+
+def test_build_whatsapp_message(benchmark, raws):
+    parqueaderos, peajes, fecha, servicios, tabla = parse_page_text(load_powerbi_text())
+    powerbi_data = {
+        "parqueaderos": int(parqueaderos.replace(",", "")),
+        "peajes": int(peajes.replace(",", "")),
+        "fecha_analizada": fecha,
+        "servicios": servicios,
+        "tabla_asociados": limpiar_tabla_asociados(tabla),
+    }
+    states = {name: build_result(name, raw) for name, raw in raws.items()}
+    texto = benchmark(build_whatsapp_message, states, powerbi_data)
+    assert texto
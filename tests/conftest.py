@@ -0,0 +1,36 @@
+"""
+Configuración común de las pruebas: todo corre contra stub_server.py, sin credenciales ni red.
+Las bases SQLite (historial, sync) van a un directorio temporal para no tocar las reales.
+"""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="facturas_tests_")
+os.environ.setdefault("FACTURAS_HISTORY_DB", os.path.join(_TMP, "historial.db"))
+os.environ.setdefault("FACTURAS_SYNC_DB", os.path.join(_TMP, "sync.db"))
+os.environ.setdefault("FACTURAS_SNAPSHOT_DIR", os.path.join(_TMP, "snapshots"))
+
+import pytest
+
+from stub_server import start_stub_server
+
+
+@pytest.fixture
+def make_stub():
+    """Levanta stubs con las opciones de start_stub_server; devuelve (server, base_url)."""
+    servers = []
+
+    def start(**options):
+        server, base_url = start_stub_server(**options)
+        servers.append(server)
+        return server, base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def stub(make_stub):
+    """Stub de GoPass con las opciones por defecto; devuelve la URL base."""
+    return make_stub()[1]
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import async_engine
+from async_engine import scrape_all, scrape_tenant, scrape_tenant_async, shard
+from gopass_scraper import GoPassScraper, scraper_for
+from tenants import TenantConfig
+
+FIXTURES = ("andino", "bulevar", "fontanar", "arkadia")
+
+
+def _targets(base_url, names=FIXTURES):
+    # Host con prefijo de centro: el stub responde con sus fixtures sintéticos
+    return [(name, scraper_for(TenantConfig(name, f"{base_url}/{name}", name)), "u", "p") for name in names]
+
+
+def test_scrape_all_contra_los_fixtures(make_stub):
+    _, base_url = make_stub()
+    resultados = scrape_all(_targets(base_url), shards=1)
+    assert list(resultados) == list(FIXTURES)
+    for name, result in resultados.items():
+        assert result["ok"], name
+        assert result["data"] and result["jobs"], name
+        assert result["invoices"]["total_facturas"] and result["invoices"]["factura_reciente"]["idinvoice"], name
+        assert result["totals"]["pending"] >= len(result["data"]), name
+
+
+def test_scrape_all_solo_conteo(make_stub):
+    server, base_url = make_stub()
+    resultados = scrape_all(_targets(base_url, ["andino"]), count_only=True, shards=1)
+    assert resultados["andino"]["invoices"]["factura_reciente"] == {}
+    assert resultados["andino"]["invoices"]["total_facturas"] > 0
+    assert server.hits["getcustom"] == 1
+
+
+def test_scrape_all_incremental_solo_suma_las_facturas_nuevas(make_stub):
+    _, base_url = make_stub()
+    primera = scrape_all(_targets(base_url, ["andino"]), incremental=True, shards=1)["andino"]["invoices"]
+    segunda = scrape_all(_targets(base_url, ["andino"]), incremental=True, shards=1)["andino"]["invoices"]
+    # El fixture informa más facturas que filas: total_facturas es el de la API, locales lo guardado
+    assert primera["nuevas"] == primera["locales"] > 0 and primera["total_facturas"] >= primera["locales"]
+    assert segunda["nuevas"] == 0 and segunda["total_facturas"] == primera["total_facturas"]
+    assert segunda["factura_reciente"] == primera["factura_reciente"]
+
+
+def test_scrape_tenant_incremental(make_stub):
+    _, base_url = make_stub()
+    # Otro nombre de centro: la base de sincronización es la misma para toda la sesión de pruebas
+    scraper = GoPassScraper(TenantConfig("andino-tenant", f"{base_url}/andino", "andino-tenant"))
+    invoices = scrape_tenant(scraper, "u", "p", incremental=True)["invoices"]
+    assert invoices["nuevas"] == invoices["locales"] > 0
+
+
+def test_scrape_all_cierra_su_pool_de_hilos(make_stub, monkeypatch):
+    pools = []
+
+    class Pool(ThreadPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+
+    monkeypatch.setattr(async_engine, "ThreadPoolExecutor", Pool)
+    _, base_url = make_stub()
+    scrape_all(_targets(base_url, ["andino"]), shards=1)
+    assert len(pools) == 1 and pools[0]._shutdown
+
+
+def test_scrape_all_repartido_entre_procesos(make_stub):
+    _, base_url = make_stub()
+    un_proceso = scrape_all(_targets(base_url), shards=1)
+    repartido = scrape_all(_targets(base_url), shards=2)
+    assert list(repartido) == list(FIXTURES)
+    assert {name: result["invoices"] for name, result in repartido.items()} == \
+        {name: result["invoices"] for name, result in un_proceso.items()}
+
+
+def test_scrape_tenant_respeta_el_deadline(make_stub):
+    _, base_url = make_stub(latency=2.0)
+    scraper = GoPassScraper(TenantConfig("lento", base_url, "x"))
+    inicio = time.perf_counter()
+    result = asyncio.run(scrape_tenant_async(scraper, "u-lento", "p", deadline=0.5))
+    assert result == {"ok": False, "data": None, "jobs": None, "invoices": None}
+    assert time.perf_counter() - inicio < 1.5
+    assert scraper.session.deadline is None
+
+
+def test_shard_reparte_sin_grupos_vacios():
+    assert shard(list(range(5)), 2) == [[0, 2, 4], [1, 3]]
+    assert shard([1], 4) == [[1]]
@@ -0,0 +1,55 @@
+from datetime import date
+
+import backfill
+from gopass_scraper import GoPassScraper
+from incremental_sync import connect
+from tenants import TenantConfig
+
+START, END = date(2025, 1, 1), date(2025, 1, 6)
+
+
+def _completed(db_path, api_base):
+    conn = connect(db_path)
+    try:
+        return backfill.completed_days(conn, api_base)
+    finally:
+        conn.close()
+
+
+def _scraper(base_url):
+    return GoPassScraper(TenantConfig("andino", base_url, "Andino"))
+
+
+def test_backfill_marca_los_dias_cuando_llegan_todas(make_stub, tmp_path):
+    _, base_url = make_stub(invoice_rows=120)
+    db_path = str(tmp_path / "sync.db")
+    resumen = backfill.backfill_tenant("andino", _scraper(base_url), START, END, db_path, page_size=50, max_pages=3)
+    assert resumen["facturas"] == 6 * 120 and resumen["incompletas"] == 0
+    assert len(_completed(db_path, "andino")) == 6
+
+    repetido = backfill.backfill_tenant("andino", _scraper(base_url), START, END, db_path)
+    assert repetido["dias"] == 0 and repetido["omitidos"] == 6
+
+
+def test_backfill_deja_pendientes_los_dias_incompletos(make_stub, tmp_path, monkeypatch):
+    _, base_url = make_stub(invoice_rows=120)
+    db_path = str(tmp_path / "sync.db")
+    contar = backfill.count_invoices
+    # El conteo informa más facturas de las que entregan las páginas
+    monkeypatch.setattr(backfill, "count_invoices", lambda *args, **kwargs: contar(*args, **kwargs) + 1)
+    resumen = backfill.backfill_tenant("andino", _scraper(base_url), START, END, db_path, page_size=50, max_pages=3)
+    assert resumen["facturas"] == 6 * 120 and resumen["incompletas"] == resumen["consultas"]
+    assert _completed(db_path, "andino") == set()
+
+
+def test_fetch_chunk_sin_conteo_no_marca(make_stub, tmp_path):
+    _, base_url = make_stub(invoice_rows=10)
+    db_path = str(tmp_path / "sync.db")
+    conn = connect(db_path)
+    conn.executescript(backfill._CHECKPOINT_SCHEMA)
+    conn.close()
+    scraper = _scraper(base_url)
+    assert backfill.fetch_chunk(scraper.session, "andino", scraper.api_base, START, START, None, db_path=db_path) == 10
+    assert _completed(db_path, "andino") == set()
+    assert backfill.fetch_chunk(scraper.session, "andino", scraper.api_base, START, START, 10, db_path=db_path) == 10
+    assert _completed(db_path, "andino") == {"2025-01-01"}
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import threading
+
+import daemon
+import gopass_scraper
+from gopass_scraper import scraper_for
+from snapshots import load_snapshot
+from stub_server import STUB_EPOCH
+from tenants import TenantConfig
+
+
+def test_poll_once_scrapea_todos_los_centros_y_publica_snapshots(make_stub, tmp_path, monkeypatch):
+    _, base_url = make_stub()
+    corridas = []
+    scrape_all = daemon.scrape_all
+    monkeypatch.setattr(daemon, "scrape_all",
+                        lambda targets, shards, count_only=False, incremental=False:
+                        corridas.append(len(targets)) or scrape_all(targets, shards=shards))
+    # Fixtures de arkadia y fontanar: columnas distintas, mismos roles
+    targets = [(name, scraper_for(TenantConfig(name, f"{base_url}/{name}", name)), "u", "p")
+               for name in ("arkadia", "fontanar")]
+    intervals = {name: daemon.AdaptiveInterval(60, 900) for name, *_ in targets}
+    daemon.poll(targets, str(tmp_path), threading.Event(), intervals, once=True, shards=1)
+
+    assert corridas == [2]
+    for name, *_ in targets:
+        snapshot = load_snapshot(name, str(tmp_path))
+        assert snapshot["result"]["ok"] and snapshot["result"]["data"]
+        assert intervals[name].last_signature is not None
+
+
+def test_poll_round_solo_cuenta_facturas_mientras_el_total_no_cambia(make_stub, tmp_path, monkeypatch):
+    server, base_url = make_stub(invoice_rows=3)
+    # Día fijo del stub: los idinvoice del día no dependen de cuántas facturas tenga
+    monkeypatch.setattr(gopass_scraper, "today_bogota", lambda: STUB_EPOCH)
+    corridas = []
+    scrape_all = daemon.scrape_all
+    monkeypatch.setattr(daemon, "scrape_all", lambda targets, shards, count_only=False, incremental=False: corridas.append(
+        ([name for name, *_ in targets], count_only, incremental))
+        or scrape_all(targets, count_only=count_only, shards=shards, incremental=incremental))
+    targets = [("andino", scraper_for(TenantConfig("andino", base_url, "Andino")), "u", "p")]
+    intervals = {"andino": daemon.AdaptiveInterval(60, 900)}
+    last = {}
+
+    daemon.poll_round(targets, str(tmp_path), intervals, last, shards=1)
+    reciente = last["andino"]["invoices"]["factura_reciente"]
+    assert reciente and corridas == [(["andino"], False, True)]
+    assert last["andino"]["invoices"]["nuevas"] == 3
+
+    # Mismo total: solo el conteo, con la factura reciente de la vuelta anterior
+    daemon.poll_round(targets, str(tmp_path), intervals, last, shards=1)
+    assert corridas[1:] == [(["andino"], True, False)]
+    assert load_snapshot("andino", str(tmp_path))["result"]["invoices"]["factura_reciente"] == reciente
+
+    # Cambió el total: se vuelve a scrapear completo en la misma vuelta
+    server.RequestHandlerClass.invoice_rows = 5
+    daemon.poll_round(targets, str(tmp_path), intervals, last, shards=1)
+    assert corridas[2:] == [(["andino"], True, False), (["andino"], False, True)]
+    # La vuelta completa solo trae las facturas nuevas desde la marca de agua
+    assert last["andino"]["invoices"]["total_facturas"] == 5
+    assert last["andino"]["invoices"]["nuevas"] == 2
+
+
+def test_activity_signature_suma_la_columna_de_pendientes():
+    result = {"invoices": {"total_facturas": 5}, "data": [{"pending": 2}, {"pending": "3"}, {"pending": None}]}
+    assert daemon.activity_signature(result, "arkadia") == (5, 5)
+
+
+def test_daemon_no_carga_pandas():
+    codigo = "import sys, daemon, backfill; print('pandas' in sys.modules)"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(daemon.__file__))
+    assert salida.stdout.strip() == "False"
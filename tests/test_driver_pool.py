@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from driver_pool import PowerBIWorker
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "killpg"), reason="grupos de procesos solo en POSIX")
+
+
+def test_worker_corre_en_su_propio_grupo_y_close_lo_termina():
+    # Sin chromedriver el pool queda vacío, pero el proceso worker arranca igual
+    worker = PowerBIWorker()
+    try:
+        worker._conn.send(("desconocida", ()))
+        assert worker._conn.poll(30)
+        ok, _ = worker._conn.recv()
+        assert not ok
+        pid = worker._process.pid
+        assert os.getpgid(pid) == pid
+    finally:
+        worker.close()
+    assert not worker._process.is_alive()
+    with pytest.raises(ProcessLookupError):
+        os.killpg(pid, 0)
+
+
+def test_restart_reemplaza_un_worker_muerto():
+    worker = PowerBIWorker()
+    try:
+        anterior = worker._process
+        anterior.kill()
+        anterior.join(5)
+        with pytest.raises(RuntimeError):
+            worker.call("desconocida", timeout=30)
+        assert worker._process is not anterior and worker._process.is_alive()
+    finally:
+        worker.close()
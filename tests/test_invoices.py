@@ -0,0 +1,94 @@
+from datetime import date
+
+import pytest
+import requests
+
+from columnar import INVOICE_SCHEMA, build_table
+from gopass_scraper import GoPassScraper
+from incremental_sync import connect, normalize_transdate, sync_invoices
+from invoices import count_invoices, iter_invoice_pages, iter_invoices
+from stub_server import STUB_EPOCH
+from tenants import TenantConfig
+
+
+@pytest.mark.parametrize("max_top", [None, 120, 7])
+def test_iter_invoices_recorre_el_dia_completo_aunque_el_servidor_limite_top(make_stub, max_top):
+    _, base_url = make_stub(invoice_rows=1000, max_top=max_top)
+    with requests.Session() as session:
+        ids = [row["idinvoice"] for row in iter_invoices(session, base_url, STUB_EPOCH, page_size=500)]
+    assert len(ids) == 1000 and len(set(ids)) == 1000
+
+
+def test_iter_invoice_pages_avanza_por_las_filas_recibidas(make_stub):
+    server, base_url = make_stub(invoice_rows=1000, max_top=300)
+    with requests.Session() as session:
+        sizes = [len(rows) for rows in iter_invoice_pages(session, base_url, STUB_EPOCH, page_size=500)]
+    assert sizes == [300, 300, 300, 100]
+    assert server.hits["getcustom"] == 4
+
+
+def test_iter_invoice_pages_rango_de_dias(make_stub):
+    _, base_url = make_stub(invoice_rows=50)
+    with requests.Session() as session:
+        rows = [row for page in iter_invoice_pages(session, base_url, STUB_EPOCH, date(2025, 1, 3), page_size=40)
+                for row in page]
+        assert len(rows) == 150
+        assert count_invoices(session, base_url, STUB_EPOCH, end_date=date(2025, 1, 3)) == 150
+
+
+def test_sync_invoices_guarda_con_el_nombre_del_centro(make_stub, tmp_path):
+    _, base_url = make_stub(invoice_rows=30)
+    db_path = str(tmp_path / "sync.db")
+    scraper = GoPassScraper(TenantConfig("andino", base_url, "Andino"))
+    resultado = scraper.sync_invoices(db_path)
+    assert resultado["total_facturas"] == 30 and resultado["nuevas"] == 30
+    conn = connect(db_path)
+    try:
+        assert {row[0] for row in conn.execute("SELECT DISTINCT tenant FROM invoices")} == {"andino"}
+        assert {row[0] for row in conn.execute("SELECT tenant FROM watermarks")} == {"andino"}
+    finally:
+        conn.close()
+
+
+def test_sync_invoices_recupera_facturas_emitidas_tarde(make_stub, tmp_path):
+    # La factura 1 aparece después de la 4: su transdate queda por debajo de la marca de agua
+    server, base_url = make_stub(invoice_rows=5, missing={1})
+    db_path = str(tmp_path / "sync.db")
+    with requests.Session() as session:
+        primera = sync_invoices(session, "andino", base_url, STUB_EPOCH, db_path)
+        assert primera["total_facturas"] == primera["locales"] == 4
+
+        server.RequestHandlerClass.missing = frozenset()
+        server.hits.clear()
+        segunda = sync_invoices(session, "andino", base_url, STUB_EPOCH, db_path)
+        assert segunda["total_facturas"] == segunda["locales"] == 5 and segunda["nuevas"] == 1
+        # Incremental + conteo + el día completo de nuevo
+        assert server.hits["getcustom"] == 3
+
+        server.hits.clear()
+        tercera = sync_invoices(session, "andino", base_url, STUB_EPOCH, db_path)
+        assert tercera["total_facturas"] == 5 and tercera["nuevas"] == 0
+        assert server.hits["getcustom"] == 2
+
+
+def test_normalize_transdate_ordena_formatos_distintos():
+    assert normalize_transdate("2025-01-01T08:00:00") == "2025-01-01 08:00:00"
+    assert normalize_transdate("2025-01-01 08:00:00.250") == "2025-01-01 08:00:00"
+    assert normalize_transdate("2025-01-01T13:00:00Z") == "2025-01-01 08:00:00"
+    assert normalize_transdate("2025-01-01T08:00:00-05:00") == "2025-01-01 08:00:00"
+    assert normalize_transdate("2025-01-01T09:30:00") > normalize_transdate("2025-01-01 08:00:00Z")
+    assert normalize_transdate("sin fecha") == "sin fecha"
+
+
+def test_tabla_de_facturas_conserva_los_centavos():
+    rows = [{"idinvoice": 1, "valorneto": 8403.36, "valortotal": 10000},
+            {"id": 2, "netvalue": "1,260.5", "totalvalue": "1500"},
+            {"idinvoice": 3}]
+    tabla = build_table(INVOICE_SCHEMA, rows)
+    assert [(r["idinvoice"], r["valor_neto_factura"], r["valor_factura"]) for r in tabla.to_records()] == \
+        [(1, 8403.36, 10000), (2, 1260.5, 1500), (3, None, None)]
+    df = tabla.to_pandas()
+    assert str(df["valor_neto_factura"].dtype) == "Float64"
+    assert df["valor_neto_factura"].iloc[0] == 8403.36 and df["valor_factura"].isna().iloc[2]
+    # Camino rápido (todos enteros): también se guardan en centavos
+    assert build_table(INVOICE_SCHEMA, [{"idinvoice": 4, "valortotal": 7000}]).row(0)["valor_factura"] == 7000
@@ -0,0 +1,205 @@
+"""
+parse_page_text / limpiar_tabla_asociados contra el algoritmo original de app.py (copiado
+abajo como referencia, sin el driver, las esperas ni los print) sobre el texto del fixture
+y copias perturbadas de él.
+"""
+import os
+import random
+import re
+
+import pytest
+
+from powerbi_parser import limpiar_tabla_asociados, parse_page_text
+from stub_server import FIXTURES_DIR
+
+
+def _referencia_numero(text):
+    match = re.search(r'\b\d{1,3}(?:,\d{3})+\b', text)
+    if match:
+        return match.group(0)
+    match = re.search(r'\b\d+\b', text)
+    if match:
+        return match.group(0)
+    return None
+
+
+def _referencia_limpiar(tabla_asociados):
+    if not tabla_asociados:
+        return []
+    elementos_limpios = []
+    for item in tabla_asociados:
+        asociado = item.get('asociado', '')
+        peaje = item.get('peaje', '')
+        porcentaje = item.get('porcentaje', '')
+        if (asociado.upper() in ['ASOCIADO', 'PEAJE', 'PORCENTAJE', 'CONSECUTIVO'] or
+                peaje.upper() in ['ASOCIADO', 'PEAJE', 'PORCENTAJE', 'CONSECUTIVO']):
+            continue
+        if (asociado and len(asociado) > 3 and
+                peaje and 'peaje' in peaje.lower() and
+                porcentaje and re.match(r'\d{1,3}%', porcentaje)):
+            duplicado = any(elem['asociado'] == asociado and elem['peaje'] == peaje for elem in elementos_limpios)
+            if not duplicado:
+                elementos_limpios.append(item)
+    return elementos_limpios
+
+
+def _referencia(page_text):
+    lines = [line.strip() for line in page_text.split('\n') if line.strip()]
+    parqueaderos = None
+    peajes = None
+    fecha_analizada = None
+    tabla_asociados = []
+
+    for i, line in enumerate(lines):
+        line_clean = line.strip()
+        if 'parqueaderos' in line_clean.lower() and parqueaderos is None:
+            num = _referencia_numero(line_clean)
+            if num:
+                parqueaderos = num
+            else:
+                for offset in range(1, 6):
+                    if i + offset < len(lines):
+                        num = _referencia_numero(lines[i + offset].strip())
+                        if num:
+                            parqueaderos = num
+                            break
+        if 'peajes' in line_clean.lower() and peajes is None:
+            num = _referencia_numero(line_clean)
+            if num:
+                peajes = num
+            else:
+                for offset in range(1, 6):
+                    if i + offset < len(lines):
+                        num = _referencia_numero(lines[i + offset].strip())
+                        if num:
+                            peajes = num
+                            break
+        if fecha_analizada is None:
+            fecha_match = re.search(r'\b(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/(202[4-9])\b', line_clean)
+            if fecha_match:
+                mes, dia, año = fecha_match.groups()
+                fecha_analizada = f"{int(dia):02d}/{int(mes):02d}/{año}"
+
+    asociados_conocidos = [
+        'UNION VIAL RIO PAMPLONITA', 'PACIFICO TRES', 'VIA 40 EXPRESS', 'AUTOPISTA MAGDALENA MEDIO',
+        'AUTOPISTAS DEL CAFÉ', 'AUTOPISTA VILLAVICENCIO YOPAL', 'RUTA DEL SOL', 'AUTOPISTA ALTO DE VINAS',
+        'AUTOPISTA CONCESION LA GUAJIRA',
+    ]
+    secciones_tabla = [i for i, line in enumerate(lines)
+                       if any(k in line.lower() for k in ['asociado', 'peaje', 'porcentaje', 'consecutivo', 'consumo'])]
+    for seccion_idx in secciones_tabla:
+        start_idx = max(0, seccion_idx - 2)
+        end_idx = min(len(lines), seccion_idx + 20)
+        i = start_idx
+        while i < end_idx - 2:
+            line1 = lines[i]
+            line2 = lines[i + 1] if i + 1 < len(lines) else ""
+            line3 = lines[i + 2] if i + 2 < len(lines) else ""
+            es_asociado_conocido = any(asociado in line1 for asociado in asociados_conocidos)
+            es_peaje = 'peaje' in line2.lower()
+            porcentaje_match = re.search(r'(\d{1,3})%', line3)
+            if es_asociado_conocido and es_peaje and porcentaje_match:
+                porcentaje_val = int(porcentaje_match.group(1))
+                if 1 <= porcentaje_val <= 100:
+                    duplicado = any(item['asociado'] == line1 and item['peaje'] == line2 for item in tabla_asociados)
+                    if not duplicado:
+                        tabla_asociados.append({"asociado": line1, "peaje": line2, "porcentaje": f"{porcentaje_val}%"})
+                        i += 3
+                        continue
+            if (len(line1) > 8 and
+                    not any(k in line1.lower() for k in ['peaje', 'porcentaje', 'scroll', 'select', 'row']) and
+                    'peaje' in line2.lower() and porcentaje_match):
+                porcentaje_val = int(porcentaje_match.group(1))
+                if 1 <= porcentaje_val <= 100:
+                    duplicado = any(item['asociado'] == line1 and item['peaje'] == line2 for item in tabla_asociados)
+                    if not duplicado:
+                        tabla_asociados.append({"asociado": line1, "peaje": line2, "porcentaje": f"{porcentaje_val}%"})
+                        i += 3
+                        continue
+            i += 1
+
+    if len(tabla_asociados) < 4:
+        porcentajes_encontrados = []
+        for i, line in enumerate(lines):
+            porcentaje_match = re.search(r'(\d{1,3})%', line)
+            if porcentaje_match:
+                porcentaje_val = int(porcentaje_match.group(1))
+                if 1 <= porcentaje_val <= 100:
+                    porcentajes_encontrados.append((i, porcentaje_val))
+        for idx_porcentaje, porcentaje_val in porcentajes_encontrados:
+            peaje_encontrado = None
+            if idx_porcentaje - 1 >= 0 and 'peaje' in lines[idx_porcentaje - 1].lower():
+                peaje_encontrado = lines[idx_porcentaje - 1]
+            asociado_encontrado = None
+            if peaje_encontrado and idx_porcentaje - 2 >= 0:
+                asociado_encontrado = lines[idx_porcentaje - 2]
+                if (len(asociado_encontrado) < 5 or
+                        any(k in asociado_encontrado.lower() for k in ['peaje', 'porcentaje', 'scroll'])):
+                    asociado_encontrado = None
+            if asociado_encontrado and peaje_encontrado:
+                duplicado = any(item['asociado'] == asociado_encontrado and item['peaje'] == peaje_encontrado
+                                for item in tabla_asociados)
+                if not duplicado:
+                    tabla_asociados.append({"asociado": asociado_encontrado, "peaje": peaje_encontrado,
+                                            "porcentaje": f"{porcentaje_val}%"})
+
+    if parqueaderos is None:
+        match = re.search(r'[Pp]arqueaderos[^\d]*(\d{1,3}(?:,\d{3})*)', page_text)
+        if match:
+            parqueaderos = match.group(1)
+    if peajes is None:
+        match = re.search(r'[Pp]eajes[^\d]*(\d{1,3}(?:,\d{3})*)', page_text)
+        if match:
+            peajes = match.group(1)
+    if fecha_analizada is None:
+        fecha_match = re.search(r'\b(0?[1-9]|1[0-2])/(0?[1-9]|[12][0-9]|3[01])/(202[4-9])\b', page_text)
+        if fecha_match:
+            mes, dia, año = fecha_match.groups()
+            fecha_analizada = f"{int(dia):02d}/{int(mes):02d}/{año}"
+    return parqueaderos, peajes, fecha_analizada, {}, tabla_asociados
+
+
+def _fixture():
+    with open(os.path.join(FIXTURES_DIR, "powerbi_page.txt"), encoding="utf-8") as fh:
+        return fh.read()
+
+
+# Líneas que aparecen en reportes reales o rompen casos límite de la tabla
+RUIDO = ["", "   ", "Consumo de consecutivos", "Asociado", "Peaje", "Porcentaje", "PEAJE NUEVO", "0%",
+         "150%", "100%", "1%", "Scroll left", "Select Row", "10/16/2025", "13/01/2025", "Parqueaderos",
+         "Peajes", "2,345", "7", "OTRO CONCESIONARIO", "AB", "VIA 40 EXPRESS NORTE", "peaje interno 45%"]
+
+
+def _perturbar(text, rng):
+    lines = text.split("\n")
+    for _ in range(rng.randint(1, 8)):
+        op = rng.random()
+        i = rng.randrange(len(lines) + 1)
+        if op < 0.35:
+            lines.insert(i, rng.choice(RUIDO))
+        elif op < 0.55 and lines:
+            del lines[min(i, len(lines) - 1)]
+        elif op < 0.75 and lines:
+            lines.insert(i, lines[rng.randrange(len(lines))])
+        elif len(lines) > 3:
+            # Intercambiar dos bloques de 3 líneas (filas de la tabla)
+            j = rng.randrange(len(lines) - 3)
+            k = rng.randrange(len(lines) - 3)
+            lines[j:j + 3], lines[k:k + 3] = lines[k:k + 3], lines[j:j + 3]
+    return "\n".join(lines)
+
+
+def test_fixture_igual_que_el_algoritmo_original():
+    text = _fixture()
+    esperado = _referencia(text)
+    assert parse_page_text(text) == esperado
+    assert limpiar_tabla_asociados(esperado[4]) == _referencia_limpiar(esperado[4])
+    assert len(esperado[4]) == 9
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_copias_perturbadas_igual_que_el_algoritmo_original(seed):
+    text = _perturbar(_fixture(), random.Random(seed))
+    esperado = _referencia(text)
+    assert parse_page_text(text) == esperado
+    assert limpiar_tabla_asociados(esperado[4]) == _referencia_limpiar(esperado[4])
@@ -0,0 +1,57 @@
+import json
+import os
+
+from powerbi_parser import limpiar_tabla_asociados, parse_page_text
+from powerbi_querydata import _as_porcentaje, extract_powerbi_values, is_fraction_column
+from stub_server import FIXTURES_DIR
+
+
+def _fixture(*path):
+    with open(os.path.join(FIXTURES_DIR, *path), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def _tabla(filas, formato=None):
+    """Cuerpo querydata sintético con la tabla de consumo de consecutivos."""
+    porcentaje = {"Kind": 2, "Value": "M0", "Name": "Sum(Tabla.Porcentaje)"}
+    if formato:
+        porcentaje["Format"] = formato
+    return {"results": [{"result": {"data": {
+        "descriptor": {"Select": [{"Kind": 1, "Value": "G0", "Name": "Tabla.Asociado"},
+                                  {"Kind": 1, "Value": "G1", "Name": "Tabla.Peaje"}, porcentaje]},
+        "dsr": {"DS": [{"PH": [{"DM0": [{"G0": a, "G1": p, "M0": v} for a, p, v in filas]}]}]},
+    }}}]}
+
+
+def test_querydata_equivale_al_parser_de_texto():
+    # Mismo reporte en los dos formatos (fixtures sintéticos: powerbi_page.txt y su DSR)
+    parqueaderos, peajes, fecha, _, tabla = parse_page_text(_fixture("powerbi_page.txt"))
+    valores = extract_powerbi_values(json.loads(_fixture("powerbi", "querydata_sample.json")))
+    assert valores["parqueaderos"] == int(parqueaderos.replace(",", ""))
+    assert valores["peajes"] == int(peajes.replace(",", ""))
+    assert valores["fecha_analizada"] == fecha
+    assert limpiar_tabla_asociados(valores["tabla_asociados"]) == limpiar_tabla_asociados(tabla)
+
+
+def test_un_porciento_no_se_vuelve_cien():
+    filas = [("PACIFICO TRES", "PEAJE IRRA", 64), ("RUTA DEL SOL", "PEAJE CAIMANERA", 1)]
+    tabla = extract_powerbi_values([_tabla(filas)])["tabla_asociados"]
+    assert [fila["porcentaje"] for fila in tabla] == ["64%", "1%"]
+    assert extract_powerbi_values([_tabla(filas, "0")])["tabla_asociados"][1]["porcentaje"] == "1%"
+
+
+def test_columna_de_fracciones_se_escala():
+    filas = [("PACIFICO TRES", "PEAJE IRRA", 0.64), ("RUTA DEL SOL", "PEAJE CAIMANERA", 0.01),
+             ("VIA 40 EXPRESS", "PEAJE CHUSACA", 1.0)]
+    for formato in (None, "0%"):
+        tabla = extract_powerbi_values([_tabla(filas, formato)])["tabla_asociados"]
+        assert [fila["porcentaje"] for fila in tabla] == ["64%", "1%", "100%"]
+
+
+def test_is_fraction_column_y_as_porcentaje():
+    assert is_fraction_column([0.5, None, 1])
+    assert not is_fraction_column([1, 1, 0])
+    assert not is_fraction_column(["87%", 0.5])
+    assert is_fraction_column([1], "0.0 %") and not is_fraction_column([0.5], "#,0")
+    assert _as_porcentaje("87%") == "87%" and _as_porcentaje(1) == "1%" and _as_porcentaje(1, fraction=True) == "100%"
+    assert _as_porcentaje(0.004, fraction=True) is None and _as_porcentaje("n/a") is None
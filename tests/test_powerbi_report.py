@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import powerbi_report
+from scrape_results import SCRAPE_CACHE_TTL
+from stub_server import FIXTURES_DIR
+
+
+class _Worker:
+    def __init__(self, text=None, error=None):
+        self.text = text
+        self.error = error
+
+    def query_responses(self, url, deadline):
+        return [], {"responses": 0, "elapsed": 0.0}
+
+    def page_text(self, url, deadline):
+        if self.error:
+            raise self.error
+        return self.text, {"ready": True, "elapsed": 0.1, "signals": []}
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    def use(**options):
+        monkeypatch.setattr(powerbi_report, "get_powerbi_worker", lambda: _Worker(**options))
+    powerbi_report.POWERBI_CACHE.clear()
+    yield use
+    powerbi_report.POWERBI_CACHE.clear()
+
+
+def test_el_fallo_en_segundo_plano_queda_en_el_future(worker):
+    worker(error=TimeoutError("sin respuesta"))
+    future = powerbi_report.prefetch_powerbi_data()
+    assert isinstance(future.exception(timeout=5), powerbi_report.PowerBIError)
+    assert "sin respuesta" in str(future.exception())
+    # El fallo no se cachea: el botón del mensaje reintenta
+    with open(os.path.join(FIXTURES_DIR, "powerbi_page.txt"), encoding="utf-8") as fh:
+        worker(text=fh.read())
+    datos = powerbi_report.get_powerbi_data_cached()
+    assert datos["parqueaderos"] == 1248 and datos["peajes"] == 23517
+    assert datos["extraido_at"] is not None
+
+
+def test_texto_sin_valores_levanta_powerbi_error(worker):
+    worker(text="Microsoft Power BI\nsin datos")
+    with pytest.raises(powerbi_report.PowerBIError):
+        powerbi_report.get_powerbi_data()
+
+
+def test_ttl_por_defecto_igual_al_del_scraping():
+    if not os.environ.get("POWERBI_CACHE_TTL"):
+        assert powerbi_report.POWERBI_CACHE_TTL == SCRAPE_CACHE_TTL
@@ -0,0 +1,55 @@
+from datetime import date
+
+import pytest
+
+from gopass_scraper import GoPassScraper
+from invoices import invoice_select
+from projection import Projection
+from tenants import TenantConfig
+
+
+def test_query_orderby_y_project():
+    view = Projection("genc_jobsconfig", {"nombre": "jobname", "fecha": ["laststartdate", "updatedat"]}, "idjob asc")
+    assert view.select == ("jobname", "laststartdate", "updatedat")
+    assert view.query() == "&$select=jobname,laststartdate,updatedat&$orderby=idjob%20asc"
+    assert view.query(view.orderby_for("fecha", descending=True)).endswith("$orderby=laststartdate%20desc")
+    filas = view.project([{"jobname": "A", "laststartdate": None, "updatedat": "2025-01-01"}])
+    assert filas == [{"nombre": "A", "fecha": "2025-01-01"}]
+
+
+def _fontanar(base_url, **kwargs):
+    # El fixture de Fontanar usa los nombres alternos netvalue / totalvalue / nombretercero
+    return GoPassScraper(TenantConfig("fontanar", f"{base_url}/fontanar", "Fontanar", **kwargs))
+
+
+def test_getcustom_sin_invoice_fields_no_manda_select(stub):
+    scraper = _fontanar(stub)
+    assert scraper.invoice_select is None
+    assert "$select" not in scraper._invoices_url_for_date(date(2025, 10, 16))
+    factura = scraper.get_invoices()["factura_reciente"]
+    assert factura["valor_neto_factura"] and factura["valor_factura"] and factura["nombretercero"]
+
+
+def test_getcustom_con_nombres_alternos_declarados(stub):
+    scraper = _fontanar(stub, invoice_fields={
+        "valor_neto_factura": "netvalue", "valor_factura": "totalvalue", "nombretercero": "nombretercero",
+    })
+    assert "netvalue" in scraper.invoice_select and "valorneto" not in scraper.invoice_select
+    factura = scraper.get_invoices()["factura_reciente"]
+    assert factura["valor_neto_factura"] and factura["valor_factura"] and factura["nombretercero"]
+    assert factura["idinvoice"] and factura["cufe"]
+
+
+def test_select_con_nombres_por_defecto_pierde_los_alias(stub):
+    # Por esto no se manda $select sin declaración: con los primeros alias el motor alterno
+    # devuelve las filas sin valores
+    scraper = _fontanar(stub, invoice_fields={"idinvoice": "idinvoice"})
+    factura = scraper.get_invoices()["factura_reciente"]
+    assert factura["valor_neto_factura"] is None and factura["valor_factura"] is None
+
+
+def test_invoice_select_rechaza_campos_desconocidos():
+    with pytest.raises(ValueError):
+        invoice_select({"valor_factura": "valor_total_x"})
+    with pytest.raises(ValueError):
+        invoice_select({"no_existe": "idinvoice"})
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+import urllib.request
+from urllib.parse import urlparse
+
+import request_metrics
+from gopass_scraper import GoPassScraper
+from request_metrics import METRICS, label_for, start_metrics_server
+from tenants import TenantConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_endpoint_apagado_sin_metrics_port():
+    env = {key: value for key, value in os.environ.items() if key not in ("METRICS_PORT", "DAEMON_METRICS_PORT")}
+    codigo = ("import request_metrics as m; "
+              "print(m.METRICS_PORT, m.DAEMON_METRICS_PORT, m.METRICS_HOST, m.DAEMON_METRICS_DEFAULT_PORT)")
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                            cwd=ROOT, env=env)
+    assert salida.stdout.split() == ["0", "0", "127.0.0.1", "9465"]
+
+
+def test_servidor_de_metricas_escucha_solo_en_local():
+    server = start_metrics_server(0)
+    try:
+        host, port = server.server_address
+        assert host == "127.0.0.1"
+        METRICS.observe("andino", "genc_jobsconfig", 0.01, status=200, size=10)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as respuesta:
+            assert b'tenant="andino"' in respuesta.read()
+    finally:
+        server.shutdown()
+
+
+def test_label_for_usa_el_registro():
+    assert label_for("https://facturafontanar.gopass.com.co/api/trns_invoices/pendingEmit?$top=10") == \
+        ("fontanar", "pendingEmit")
+    assert request_metrics.TENANT_BY_HOST["facturaelectronica.gopass.com.co"] == "arkadia"
+
+
+def test_ahorro_por_poll_de_solo_conteo(make_stub):
+    _, base_url = make_stub(invoice_rows=200)
+    scraper = GoPassScraper(TenantConfig("ahorro", base_url, "x"))
+    scraper.get_invoices()
+    scraper.get_invoice_count()
+    tenant = urlparse(base_url).netloc
+    saved = METRICS.bytes_saved_per_poll(tenant)
+    assert saved and saved > 0
+    fila = next(row for row in METRICS.summary() if row["centro"] == tenant and row["endpoint"] == "getcustom")
+    assert fila["ahorro_conteo_bytes"] == saved
+    texto = METRICS.prometheus_text()
+    assert f'gopass_count_poll_bytes_saved{{tenant="{tenant}",endpoint="getcustom"}} {saved}' in texto
+    assert f'gopass_last_response_bytes{{tenant="{tenant}",endpoint="getcustom",kind="count"}}' in texto
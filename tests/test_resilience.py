@@ -0,0 +1,89 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import resilience
+from http_pool import new_session
+from request_metrics import METRICS, label_for
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, start_run
+
+
+def test_circuit_breaker_abre_y_deja_pasar_una_prueba():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.1)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.12)
+    assert breaker.state == "half-open"
+    assert breaker.allow() and not breaker.allow()  # una sola solicitud de prueba
+    breaker.success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_503_reintenta_y_abre_el_circuito(make_stub, monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.001)
+    server, base_url = make_stub(error_ratio=1.0)
+    session = new_session()
+    url = f"{base_url}/api/genc_jobsconfig"
+    response = session.get(url)
+    assert response.status_code == 503 and server.hits["genc_jobsconfig"] == 1 + resilience.MAX_RETRIES
+    # Tras FAILURE_THRESHOLD fallos seguidos el circuito se abre y ya no se contacta al servidor
+    with pytest.raises(CircuitOpenError):
+        session.get(url)
+    assert server.hits["genc_jobsconfig"] == resilience.FAILURE_THRESHOLD
+    with pytest.raises(CircuitOpenError):
+        session.get(url)
+    assert server.hits["genc_jobsconfig"] == resilience.FAILURE_THRESHOLD
+
+
+def test_deadline_corta_la_corrida(make_stub):
+    _, base_url = make_stub(latency=1.0)
+    session = new_session()
+    start_run(session, 0.2)
+    inicio = time.perf_counter()
+    with pytest.raises((DeadlineExceeded, resilience.requests.exceptions.Timeout)):
+        session.get(f"{base_url}/api/genc_jobsconfig")
+    assert time.perf_counter() - inicio < 0.9
+
+
+class _LentaLaPrimera(BaseHTTPRequestHandler):
+    """La primera solicitud tarda 2 s; las demás responden al instante."""
+    protocol_version = "HTTP/1.1"
+    llegadas = 0
+    lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.lock:
+            type(self).llegadas += 1
+            primera = self.llegadas == 1
+        if primera:
+            time.sleep(2)
+        body = b'{"data": {"totalItems": 0, "rows": []}}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def test_hedging_usa_la_copia_si_la_original_pasa_del_p95():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LentaLaPrimera)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/genc_jobsconfig"
+        tenant, endpoint = label_for(url)
+        for _ in range(resilience.HEDGE_MIN_SAMPLES):
+            METRICS.observe(tenant, endpoint, 0.05, status=200)
+        inicio = time.perf_counter()
+        response = new_session().get(url, timeout=5)
+        assert response.status_code == 200
+        assert time.perf_counter() - inicio < 1.0
+        assert _LentaLaPrimera.llegadas == 2
+    finally:
+        server.shutdown()
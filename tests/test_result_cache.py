@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from result_cache import SingleFlightCache
+
+
+def test_get_or_fetch_coalesce_llamadas_concurrentes():
+    cache = SingleFlightCache(60)
+    llamadas = []
+
+    def fetch():
+        llamadas.append(1)
+        time.sleep(0.1)
+        return "valor"
+
+    resultados = []
+    hilos = [threading.Thread(target=lambda: resultados.append(cache.get_or_fetch("k", fetch))) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert resultados == ["valor"] * 5 and len(llamadas) == 1
+
+
+def test_get_or_fetch_many_pide_solo_lo_que_falta():
+    cache = SingleFlightCache(60)
+    pedidas = []
+
+    def fetch_many(keys):
+        pedidas.append(keys)
+        return {key: key.upper() for key in keys}
+
+    assert cache.get_or_fetch_many(["a", "b"], fetch_many) == {"a": "A", "b": "B"}
+    assert cache.get_or_fetch_many(["b", "c", "a"], fetch_many) == {"b": "B", "c": "C", "a": "A"}
+    assert pedidas == [["a", "b"], ["c"]]
+
+
+def test_get_or_fetch_many_espera_lo_que_otro_ya_pide_y_no_cachea_fallos():
+    cache = SingleFlightCache(60)
+    liberar = threading.Event()
+    pedidas = []
+
+    def lento(keys):
+        pedidas.append(keys)
+        liberar.wait(2)
+        return {key: None if key == "malo" else key for key in keys}
+
+    primero = threading.Thread(target=lambda: cache.get_or_fetch_many(["a", "malo"], lento,
+                                                                       cacheable=lambda v: v is not None))
+    primero.start()
+    time.sleep(0.05)
+    threading.Timer(0.1, liberar.set).start()
+    assert cache.get_or_fetch_many(["a", "b"], lento) == {"a": "a", "b": "b"}
+    primero.join()
+    assert pedidas == [["a", "malo"], ["b"]]
+    assert cache.get("malo") is None and cache.get("a") == "a"
+
+
+def test_get_or_fetch_many_propaga_errores_y_libera_las_llaves():
+    cache = SingleFlightCache(60)
+    with pytest.raises(RuntimeError):
+        cache.get_or_fetch_many(["a"], lambda keys: (_ for _ in ()).throw(RuntimeError("caído")))
+    assert cache.get_or_fetch_many(["a"], lambda keys: {"a": 1}) == {"a": 1}
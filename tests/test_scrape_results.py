@@ -0,0 +1,118 @@
+import time
+
+import pandas as pd
+
+import scrape_results
+from gopass_scraper import scraper_for
+from scrape_results import PAGE_CACHE, build_result, fetch_page, local_page, run_scraper
+from tenants import TenantConfig
+
+FILAS = [{"comercio": f"C{i}", "total_pendientes": i} for i in range(10)]
+
+
+def _tenant(base_url, name="stubpages"):
+    return TenantConfig(name, base_url, name.title())
+
+
+def test_local_page_sirve_lo_que_cabe_en_las_filas_scrapeadas():
+    assert local_page(FILAS, 120, 5, 5) == (120, FILAS[5:10])
+    assert local_page(pd.DataFrame(FILAS), 120, 10) == (120, FILAS)
+    # Más allá de las filas locales, con orden o sin total hace falta la API
+    assert local_page(FILAS, 120, 10, 10) is None
+    assert local_page(FILAS, 120, 5, 0, sort=("comercio", False)) is None
+    assert local_page(FILAS, None, 5) is None
+
+
+def test_local_page_ordena_y_filtra_si_estan_todas():
+    total, rows = local_page(FILAS, 10, 3, 0, sort=("total_pendientes", True))
+    assert total == 10 and [row["total_pendientes"] for row in rows] == [9, 8, 7]
+    assert local_page(FILAS, 10, 10, search="c3") == (1, [FILAS[3]])
+    assert local_page([], 0, 10) == (0, [])
+
+
+def test_fetch_page_solo_consulta_la_api_fuera_de_las_filas_locales(make_stub):
+    server, base_url = make_stub(pending_rows=50)
+    PAGE_CACHE.clear()
+    tenant = _tenant(base_url)
+    _, result = run_scraper(tenant.name, scraper_for(tenant), "u", "p")
+    assert result["totals"]["pending"] == 50 and len(result["data"]) == 10
+    server.hits.clear()
+
+    args = (tenant.name, scraper_for(tenant), "u", "p", "pending")
+    total, rows = fetch_page(*args, 10, 0, local_rows=result["data"], local_total=50)
+    assert total == 50 and len(rows) == 10 and server.hits["pendingEmit"] == 0
+
+    total, rows = fetch_page(*args, 10, 20, local_rows=result["data"], local_total=50)
+    assert total == 50 and len(rows) == 10 and server.hits["pendingEmit"] == 1
+    fetch_page(*args, 10, 30, local_rows=result["data"], local_total=50)
+    # Una sola sesión (con su token) para todas las páginas del centro
+    assert [key for key in scrape_results._page_scrapers if key[0] == tenant.name] == [(tenant.name, "u")]
+
+
+def test_fetch_page_cachea_el_fallo_y_usa_las_filas_locales(monkeypatch):
+    PAGE_CACHE.clear()
+    tenant = _tenant("http://127.0.0.1:9", name="caido")
+    monkeypatch.setattr(scrape_results, "PAGE_DEADLINE", 2)
+    args = (tenant.name, scraper_for(tenant), "u", "p", "pending", 10)
+    assert fetch_page(*args, 10, local_rows=FILAS, local_total=None) == (10, [])
+    inicio = time.perf_counter()
+    # Dentro de PAGE_FAILURE_TTL no se vuelve a consultar el centro
+    assert fetch_page(*args, 0, sort=("comercio", False), local_rows=FILAS) == (10, FILAS)
+    assert time.perf_counter() - inicio < 0.05
+
+
+def test_busqueda_sin_resultados_no_es_un_fallo(make_stub):
+    server, base_url = make_stub(pending_rows=50)
+    PAGE_CACHE.clear()
+    tenant = TenantConfig("busqueda", base_url, "Busqueda", pending_search="name")
+    args = (tenant.name, scraper_for(tenant), "u", "p", "pending", 10, 0)
+    # Las filas locales no coinciden con la búsqueda: no se muestran como si coincidieran
+    assert fetch_page(*args, search="no existe", local_rows=FILAS, local_total=50) == (0, [])
+    assert tenant.name not in scrape_results._page_failures
+    total, rows = fetch_page(*args, search="COMERCIO 0001", local_rows=FILAS, local_total=50)
+    assert total == 10 and all(row["comercio"].startswith("COMERCIO 0001") for row in rows)
+    assert server.hits["pendingEmit"] == 2
+
+
+def test_fallo_con_busqueda_filtra_las_filas_locales(monkeypatch):
+    PAGE_CACHE.clear()
+    tenant = _tenant("http://127.0.0.1:9", name="caido_busqueda")
+    monkeypatch.setattr(scrape_results, "PAGE_DEADLINE", 2)
+    args = (tenant.name, scraper_for(tenant), "u", "p", "pending", 10, 0)
+    assert fetch_page(*args, search="c3", local_rows=FILAS, local_total=50) == (1, [FILAS[3]])
+    assert tenant.name in scrape_results._page_failures
+
+
+def test_build_result_conserva_los_totales():
+    raw = {"ok": True, "data": FILAS, "jobs": [], "invoices": {}, "totals": {"pending": 10, "jobs": 0}}
+    assert build_result("x", raw)["totals"] == {"pending": 10, "jobs": 0}
+    del raw["totals"]
+    assert build_result("x", raw)["totals"] == {}
+
+
+def _targets(base_url, names):
+    return [(name, scraper_for(_tenant(base_url, name)), "u", "p") for name in names]
+
+
+def test_scrape_all_cached_scrapea_los_faltantes_en_una_sola_corrida(make_stub, monkeypatch):
+    _, base_url = make_stub()
+    scrape_results.SCRAPE_CACHE.clear()
+    corridas = []
+    scrape_all = scrape_results.scrape_all
+    monkeypatch.setattr(scrape_results, "scrape_all",
+                        lambda targets, shards: corridas.append(([t[0] for t in targets], shards))
+                        or scrape_all(targets, shards=shards))
+
+    resultados = scrape_results.scrape_all_cached(_targets(base_url, ["uno", "dos"]), shards=1)
+    assert list(resultados) == ["uno", "dos"] and all(r["ok"] for r in resultados.values())
+    # Dentro del TTL solo se scrapea el centro que falta
+    resultados = scrape_results.scrape_all_cached(_targets(base_url, ["uno", "dos", "tres"]), shards=1)
+    assert list(resultados) == ["uno", "dos", "tres"]
+    assert corridas == [(["uno", "dos"], 1), (["tres"], 1)]
+
+
+def test_scrape_all_cached_repartido_en_procesos(make_stub):
+    _, base_url = make_stub()
+    scrape_results.SCRAPE_CACHE.clear()
+    resultados = scrape_results.scrape_all_cached(_targets(base_url, ["p1", "p2", "p3"]), shards=2)
+    assert list(resultados) == ["p1", "p2", "p3"] and all(r["ok"] for r in resultados.values())
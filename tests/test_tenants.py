@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+
+from stub_server import load_fixture
+
+import history
+from message_builder import build_whatsapp_message
+from tenants import TENANTS, TenantConfig, get_tenant, role_keys
+
+POWERBI = {"fecha_analizada": "16/10/2025", "parqueaderos": 0, "peajes": 0}
+
+
+def test_roles_deducidos_de_los_campos_de_la_api():
+    arkadia = get_tenant("arkadia")
+    assert arkadia.roles == {"pending_name": "name", "pending_count": "pending",
+                             "job_name": "NOMBRE", "job_date": "FECHA DE ACTUALIZACIÓN"}
+    assert get_tenant("fontanar").roles["job_date"] == "ultima_actualizacion"
+    assert all(set(tenant.roles) == {"pending_name", "pending_count", "job_name", "job_date"} for tenant in TENANTS)
+
+
+def test_roles_declarados_y_errores():
+    tenant = TenantConfig("nuevo", "https://x", "x",
+                          pending_fields={"Local": "store", "Por emitir": "queued"},
+                          jobs_fields={"Proceso": "jobname", "Corrió": "lastrun"},
+                          roles={"pending_name": "Local", "pending_count": "Por emitir", "job_date": "Corrió"})
+    assert tenant.roles == {"pending_name": "Local", "pending_count": "Por emitir",
+                            "job_name": "Proceso", "job_date": "Corrió"}
+    # Sin declarar el rol y sin un campo conocido el registro no carga (antes reportaba 0 en silencio)
+    with pytest.raises(ValueError, match="pending_count"):
+        TenantConfig("nuevo", "https://x", "x", pending_fields={"Local": "name", "Por emitir": "queued"})
+    with pytest.raises(ValueError, match="desconocidos"):
+        TenantConfig("nuevo", "https://x", "x", roles={"pendientes": "total_pendientes"})
+
+
+def test_role_keys_agrega_los_campos_crudos():
+    assert role_keys("arkadia", "job_date") == ("FECHA DE ACTUALIZACIÓN", "laststartdate", "updatedat")
+    assert role_keys("fuera_del_registro", "pending_count") == ("pending",)
+
+
+def test_mensaje_e_historial_leen_las_columnas_de_cada_centro(tmp_path):
+    state = {"ok": True, "invoices": {"total_facturas": 7},
+             "data": [{"name": "LOCAL 1", "pending": 3, "idcommerce": 1}],
+             "jobs": [{"NOMBRE": "emitir", "FECHA DE ACTUALIZACIÓN": "2025-10-16T08:30:00"}]}
+    mensaje = build_whatsapp_message({"arkadia": state}, POWERBI)
+    assert "Motor Arkadia con 3 facturas pendientes" in mensaje and "(16/10/2025 08:30)" in mensaje
+
+    db_path = str(tmp_path / "historial.db")
+    assert history.record_run("arkadia", state, ts=1_760_000_000, db_path=db_path)
+    conn = history.connect(db_path)
+    try:
+        assert conn.execute("SELECT pendientes FROM runs").fetchone()[0] == 3
+        assert tuple(conn.execute("SELECT job, actualizado FROM jobs").fetchone()) == ("emitir", "2025-10-16T08:30:00")
+    finally:
+        conn.close()
+
+
+def test_historial_guarda_las_dos_fechas_crudas_de_los_jobs(tmp_path):
+    state = {"ok": True, "invoices": {"total_facturas": 7}, "data": [],
+             "jobs": [{"jobname": "emitir", "laststartdate": "2025-10-16T08:30:00", "updatedat": "2025-10-16T08:35:00"},
+                      {"jobname": "anular", "updatedat": "2025-10-15T22:00:00"}]}
+    db_path = str(tmp_path / "historial.db")
+    conn = sqlite3.connect(db_path)
+    # Historial con el esquema anterior (sin columnas crudas): connect lo migra
+    conn.execute("CREATE TABLE jobs (tenant TEXT NOT NULL, ts REAL NOT NULL, job TEXT, actualizado TEXT)")
+    conn.close()
+    assert history.record_run("arkadia", state, ts=1_760_000_000, db_path=db_path)
+    assert [(row["job"], row["actualizado"], row["updatedat"], row["laststartdate"])
+            for row in history.jobs_between("arkadia", 0, 2_000_000_000, db_path=db_path)] == [
+        ("emitir", "2025-10-16T08:30:00", "2025-10-16T08:35:00", "2025-10-16T08:30:00"),
+        ("anular", "2025-10-15T22:00:00", "2025-10-15T22:00:00", None),
+    ]
+
+
+@pytest.mark.parametrize("tenant", TENANTS, ids=lambda tenant: tenant.name)
+def test_los_fixtures_traen_los_campos_que_pide_el_registro(tenant):
+    for row in load_fixture(tenant.name, "pendingEmit")["data"]["rows"]:
+        for column, sources in tenant.pending_fields.items():
+            sources = (sources,) if isinstance(sources, str) else sources
+            assert any(source in row for source in sources), (column, row)
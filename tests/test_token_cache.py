@@ -0,0 +1,57 @@
+import base64
+import json
+import time
+
+from gopass_scraper import GoPassScraper
+from tenants import TenantConfig
+from token_cache import TOKEN_CACHE, TokenCache, jwt_expiry
+
+
+def _jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"e30.{payload}.firma"
+
+
+def test_jwt_expiry_y_margen_de_renovacion():
+    assert jwt_expiry(_jwt(1_900_000_000)) == 1_900_000_000
+    assert jwt_expiry("no-es-jwt") is None
+    cache = TokenCache(refresh_margin=120)
+    cache.put(("a",), _jwt(time.time() + 60))
+    assert cache.get(("a",)) is None  # vence dentro del margen: se renueva
+    cache.put(("b",), _jwt(time.time() + 3600))
+    assert cache.get(("b",)) is not None
+
+
+def test_login_reutiliza_el_token_cacheado(make_stub):
+    server, base_url = make_stub(valid_token="vigente")
+    tenant = TenantConfig("token_reuso", base_url, "x")
+    assert GoPassScraper(tenant).login("u", "p") and GoPassScraper(tenant).login("u", "p")
+    assert server.hits["login"] == 1
+
+
+def test_401_vuelve_a_hacer_login_y_repite_la_solicitud(make_stub):
+    server, base_url = make_stub(valid_token="nuevo")
+    scraper = GoPassScraper(TenantConfig("token_401", base_url, "x"))
+    # Token vencido en el caché (el servidor ya no lo acepta)
+    assert scraper.login("u", "p")
+    TOKEN_CACHE._tokens = {key: ("viejo", time.time() + 3600) if key[0] == scraper.login_endpoint else value
+                           for key, value in TOKEN_CACHE._tokens.items()}
+    assert scraper.login("u", "p")
+    assert scraper.session.headers["Authorization"] == "Bearer viejo"
+    server.hits.clear()
+
+    assert scraper.get_jobs_config()
+    assert server.hits["login"] == 1 and server.hits["genc_jobsconfig"] == 2
+    assert scraper.session.headers["Authorization"] == "Bearer nuevo"
+    # La siguiente solicitud ya sale con el token nuevo
+    assert scraper.get_pending_invoices() and server.hits["pendingEmit"] == 1
+
+
+def test_401_repite_una_sola_vez(make_stub):
+    server, base_url = make_stub(valid_token="nuevo")
+    scraper = GoPassScraper(TenantConfig("token_sin_login", base_url, "x"))
+    scraper._request_token = lambda username, password: "invalido"
+    assert scraper.login("u", "p")
+    # El token nuevo también es rechazado: un reintento y no un bucle
+    assert scraper.get_jobs_config() == []
+    assert server.hits["genc_jobsconfig"] == 2
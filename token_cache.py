@@ -0,0 +1,115 @@
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+# Renovar el token este número de segundos antes de que expire
+REFRESH_MARGIN = 120
+# Vida asumida cuando el JWT no trae "exp"
+DEFAULT_TTL = 30 * 60
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Lee el claim "exp" (epoch en segundos) del payload de un JWT sin validar la firma."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+
+class TokenCache:
+    """
+    Cache de tokens Bearer por (centro comercial, usuario), compartido por todo el proceso.
+    Sobrevive a los reruns y a las sesiones de Streamlit porque vive a nivel de módulo.
+    """
+
+    def __init__(self, refresh_margin: float = REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def lock_for(self, key: Tuple[str, str, str]) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[str]:
+        entry = self._tokens.get(key)
+        if not entry:
+            return None
+        token, expires_at = entry
+        if time.time() >= expires_at - self.refresh_margin:
+            return None
+        return token
+
+    def put(self, key: Tuple[str, str, str], token: str) -> None:
+        expires_at = jwt_expiry(token) or time.time() + DEFAULT_TTL
+        self._tokens[key] = (token, expires_at)
+
+    def invalidate(self, key: Tuple[str, str, str], token: Optional[str] = None) -> None:
+        """Elimina el token; si se indica `token`, solo si sigue siendo el vigente."""
+        entry = self._tokens.get(key)
+        if entry and (token is None or entry[0] == token):
+            self._tokens.pop(key, None)
+
+
+TOKEN_CACHE = TokenCache()
+
+
+def _set_bearer(session, token: str) -> None:
+    session.headers.update({"Authorization": f"Bearer {token}"})
+
+
+def authenticate(session, login_url: str, username: str, password: str,
+                 request_token: Callable[[str, str], Optional[str]]) -> bool:
+    """
+    Autentica la sesión reutilizando el token cacheado si sigue vigente.
+    `request_token(username, password)` hace el login real y devuelve el token (o None).
+    Además instala un hook que, ante un 401, vuelve a hacer login y reintenta una vez.
+    """
+    # La contraseña (hasheada) forma parte de la llave: un password distinto no reutiliza el token
+    key = (login_url, username, hashlib.sha256(password.encode("utf-8")).hexdigest())
+
+    def current_token() -> Optional[str]:
+        token = TOKEN_CACHE.get(key)
+        if token:
+            return token
+        with TOKEN_CACHE.lock_for(key):
+            # Otro hilo pudo haberlo renovado mientras esperábamos
+            token = TOKEN_CACHE.get(key)
+            if not token:
+                token = request_token(username, password)
+                if token:
+                    TOKEN_CACHE.put(key, token)
+            return token
+
+    def reauth_on_401(response, *args, **kwargs):
+        request = response.request
+        if response.status_code != 401 or request.url == login_url or getattr(request, "_reauth", False):
+            return response
+        stale = (request.headers.get("Authorization") or "").replace("Bearer ", "", 1)
+        TOKEN_CACHE.invalidate(key, stale)
+        token = current_token()
+        if not token:
+            return response
+        _set_bearer(session, token)
+        retry = request.copy()
+        retry.headers["Authorization"] = f"Bearer {token}"
+        retry._reauth = True
+        response.close()
+        return session.send(retry, **kwargs)
+
+    token = current_token()
+    if not token:
+        return False
+    _set_bearer(session, token)
+    # Reemplaza un hook previo (p. ej. si se vuelve a llamar login con otro usuario)
+    session.hooks["response"] = [
+        h for h in session.hooks["response"] if getattr(h, "__name__", "") != "reauth_on_401"
+    ] + [reauth_on_401]
+    return True